@@ -0,0 +1,79 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Compare the round-trip YAML loader with the read-only one over real stack files.
+
+Usage: python scripts/yaml_parse_benchmark.py [<dir> ...] [--rounds N]
+
+Every stack.yml, composefile*.yml, container.yml, spec and lock file beneath the
+directories given (default: the repo base dir) is parsed N times by each loader.
+Whether the read-only loader has libyaml's parser depends on ruamel.yaml.clib being
+installed, which is reported.
+"""
+
+import argparse
+import time
+
+from pathlib import Path
+
+from stack.config.util import get_dev_root_path
+from stack.util import get_yaml, get_yaml_reader
+
+PATTERNS = ["stack.yml", "composefile*.yml", "container.yml", "wrapper.yml", "spec.yml", "deployment.yml",
+            "stack.lock", "container.lock"]
+
+
+def _files(dirs):
+    found = set()
+    for d in dirs:
+        for pattern in PATTERNS:
+            found.update(p for p in Path(d).rglob(pattern) if ".git" not in p.parts)
+    return sorted(found)
+
+
+def _time(load, contents, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for content in contents:
+            load(content)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dirs", nargs="*")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    files = _files(args.dirs or [get_dev_root_path()])
+    if not files:
+        print("No stack files found.")
+        return
+    contents = [f.read_text() for f in files]
+    size = sum(len(c) for c in contents)
+
+    reader = get_yaml_reader()
+    round_trip = _time(lambda c: get_yaml().load(c), contents, args.rounds)
+    read_only = _time(reader.load, contents, args.rounds)
+    parses = len(contents) * args.rounds
+    print(f"{len(files)} files, {size / 1000:.1f} kB, {args.rounds} rounds")
+    print(f"round-trip (get_yaml):        {round_trip:.3f}s  {round_trip / parses * 1000:.3f} ms/file")
+    print(f"read-only (get_yaml_reader):  {read_only:.3f}s  {read_only / parses * 1000:.3f} ms/file"
+          f"  ({'libyaml' if reader.Parser.__module__ != 'ruamel.yaml.parser' else 'pure Python'} parser)")
+    print(f"speedup: {round_trip / read_only:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,11 +20,14 @@
 # STACK_REPO_BASE_DIR defaults to ~/.config/stack/repos
 
 import click
+import functools
 import hashlib
 import os
+import subprocess
+import threading
+import time
 
 from pathlib import Path
-from python_on_whales import DockerClient
 
 from stack.build.build_types import BuildContext
 from stack.build.build_util import (
@@ -34,13 +37,16 @@ from stack.build.build_util import (
     container_exists_remotely,
     get_containers_in_scope,
     local_container_arch,
+    parse_platforms,
     read_container_locks,
     read_stack_locks,
     recipe_repo_version,
     same_repo_ref,
     write_stack_locks,
 )
+from stack.build.image_inventory import local_image_size, local_images, remove_image, tag_image
 from stack.build.publish import publish_image
+from stack.build.timings import BuildTimings
 from stack.build.wrappers import (
     fetch_default_wrapper_repos,
     fetch_wrapper_repo,
@@ -52,12 +58,21 @@ from stack.constants import container_lock_file_name
 from stack.deploy.stack import get_parsed_stack_config, resolve_stack
 from stack.log import log_info, log_debug, log_warn, output_main
 from stack.opts import opts
-from stack.repos.repo_util import image_registry_for_repo, fs_path_for_repo, process_repo, get_container_tag_for_repo
+from stack.repos.repo_util import (
+    fs_path_for_repo,
+    get_container_tag_for_repo,
+    image_registry_for_repo,
+    process_repo,
+    repo_lock,
+)
+from stack.scheduler import TaskScheduler
 from stack.util import include_exclude_check, stack_is_external, error_exit, get_yaml
 from stack.util import run_shell_command
 from stack import constants
 
-docker = DockerClient()
+# Held while writing a stack.lock or container.lock: containers built concurrently may
+# share one, and each write is a read-modify-write of the whole file.
+_lock_file_lock = threading.Lock()
 
 BUILD_POLICIES = [
     "as-needed",
@@ -95,6 +110,84 @@ def make_container_build_env(dev_root_path: str, default_container_base_dir: str
     return container_build_env
 
 
+def parse_build_cache(build_cache: str):
+    """(kind, location) for a --build-cache setting: registry or local, where, or None for no cache.
+
+    "registry" alone leaves the location to be derived per container, from its image registry."""
+    if not build_cache or build_cache == "none":
+        return None, None
+    kind, _, location = str(build_cache).partition(":")
+    if kind not in ["registry", "local"] or (kind == "local" and not location):
+        error_exit(f"--build-cache must be registry, registry:<registry> or local:<directory>, not {build_cache}")
+    if kind == "local":
+        location = os.path.abspath(os.path.expanduser(location))
+    return kind, location or None
+
+
+@functools.cache
+def builder_exports_cache() -> bool:
+    """Whether the active docker builder can export a build cache (--cache-to).
+
+    docker's default builder, of the `docker` driver, refuses to unless docker keeps its
+    images in the containerd image store.  Asked once per run, and warned about once; when
+    it cannot be asked (podman, no buildx), the build is left to say for itself."""
+    try:
+        inspect = subprocess.run(["docker", "buildx", "inspect"], capture_output=True, text=True, timeout=30)
+        if inspect.returncode != 0:
+            return True
+        driver = next((line.split(":", 1)[1].strip() for line in inspect.stdout.splitlines()
+                       if line.startswith("Driver:")), None)
+        if driver != "docker":
+            return True
+        info = subprocess.run(["docker", "info", "--format", "{{json .DriverStatus}}"],
+                              capture_output=True, text=True, timeout=30)
+        if "io.containerd.snapshotter" in info.stdout:
+            return True
+    except (OSError, subprocess.TimeoutExpired) as e:
+        log_debug(f"Could not ask docker about its builder: {e}")
+        return True
+    log_warn("WARN: the active docker builder cannot export a build cache, so it is read but not written;"
+             " see 'Build cache' in docs/commands/prepare.md.")
+    return False
+
+
+def build_cache_env(build_cache: str, image_registry, write: bool):
+    """The settings process_container() turns into each image's cache arguments."""
+    kind, location = parse_build_cache(build_cache)
+    if kind == "registry":
+        location = location or image_registry
+    if not kind or not location:
+        return {}
+    env = {"STACK_BUILD_CACHE": f"{kind}:{location}"}
+    # A registry cache is only written by a run that publishes, which has the credentials to.
+    if (kind == "local" or write) and builder_exports_cache():
+        env["STACK_BUILD_CACHE_WRITE"] = "true"
+    return env
+
+
+def _build_cache_args(image_name: str, build_envs) -> dict:
+    # Per image, so that a wrapper's base image and the image wrapping it do not share a cache.
+    kind, _, location = build_envs.get("STACK_BUILD_CACHE", "").partition(":")
+    if not kind:
+        return {}
+    write = build_envs.get("STACK_BUILD_CACHE_WRITE") == "true"
+    if kind == "registry":
+        ref = f"{location}/{image_name}:buildcache"
+        args = {"STACK_BUILD_CACHE_REF": ref, "STACK_BUILD_CACHE_FROM": f"type=registry,ref={ref}",
+                "STACK_BUILD_CACHE_REPO": f"{location}/{image_name}-buildcache"}
+        if write:
+            args["STACK_BUILD_CACHE_TO"] = f"type=registry,ref={ref},mode=max"
+    else:
+        cache_dir = os.path.join(location, image_name.replace("/", "-"))
+        args = {"STACK_BUILD_CACHE_REF": cache_dir}
+        # An empty cache is not an error to buildx, but a missing directory is to some versions.
+        if os.path.isdir(cache_dir):
+            args["STACK_BUILD_CACHE_FROM"] = f"type=local,src={cache_dir}"
+        if write:
+            args["STACK_BUILD_CACHE_TO"] = f"type=local,dest={cache_dir},mode=max"
+    return args
+
+
 def process_container(build_context: BuildContext) -> bool:
 
     building_container = build_context.container
@@ -175,6 +268,7 @@ def process_container(build_context: BuildContext) -> bool:
         build_envs["STACK_BUILD_DIR"] = repo_dir_or_build_dir
 
     build_envs["STACK_IMAGE_NAME"] = building_container.name
+    build_envs.update(_build_cache_args(building_container.name, build_envs))
 
     build_envs["STACK_REPO_STACK_DIR"] = str(stack.repo_path) if stack.repo_path else ""
     build_envs["STACK_REPO_CONTAINER_DIR"] = (str(build_context.container.repo_path) if building_container.repo_path
@@ -211,26 +305,32 @@ def prepare_wrapper_base_container(wrapper, build_context: BuildContext) -> bool
     store or pulled from the wrapper repo's image registry when possible; otherwise the
     base container is built locally."""
     force_rebuild = build_context.container_build_env.get("STACK_FORCE_REBUILD") == "true"
+    platforms = [p for p in build_context.container_build_env.get("STACK_BUILD_PLATFORMS", "").split(",") if p]
     stack_tag = f"{wrapper.base_container}:stack"
 
     wrapper_repo_ref, wrapper_hash, wrapper_repo_dirty = wrapper_repo_info(wrapper)
     hash_tag = f"{wrapper.base_container}:{wrapper_hash}" if wrapper_hash else None
 
     if hash_tag and not wrapper_repo_dirty and not force_rebuild:
-        if container_exists_locally(hash_tag):
+        # As for any container, with --platforms only a registry can show the image is there for all of them.
+        if not platforms and container_exists_locally(hash_tag):
             log_info(f"Base container {hash_tag} exists locally.")
-            docker.image.tag(hash_tag, stack_tag)
+            tag_image(hash_tag, stack_tag)
             return True
         if wrapper_repo_ref:
             registries = [r for r in [image_registry_for_repo(wrapper_repo_ref)] if r]
-            exists_remotely, registry = container_exists_remotely(hash_tag, registries)
+            exists_remotely, registry = container_exists_remotely(hash_tag, registries, platforms=platforms)
             if exists_remotely:
                 pull_tag = f"{registry}/{hash_tag}" if registry else hash_tag
                 log_info(f"Base container {pull_tag} exists remotely.")
-                run_shell_command(f"docker pull {pull_tag}", quiet=opts.o.quiet or opts.o.quiet_build)
+                # The wrapped image is built FROM it for every platform, so every platform is needed locally.
+                for pull_platform in platforms or [None]:
+                    platform_arg = f"--platform {pull_platform} " if pull_platform else ""
+                    run_shell_command(f"docker pull {platform_arg}{pull_tag}", quiet=opts.o.quiet or opts.o.quiet_build)
+                local_images().invalidate()
                 if registry:
-                    docker.image.tag(pull_tag, hash_tag)
-                docker.image.tag(hash_tag, stack_tag)
+                    tag_image(pull_tag, hash_tag)
+                tag_image(hash_tag, stack_tag)
                 return True
 
     wrapper_build_script = str(wrapper.build_script_path()) if wrapper.build_script_path().exists() else None
@@ -242,9 +342,10 @@ def prepare_wrapper_base_container(wrapper, build_context: BuildContext) -> bool
         build_context.dev_root_path,
     )
     ok = process_container(base_context)
+    local_images().invalidate()
     if ok and hash_tag and not wrapper_repo_dirty:
         # Tag the local build with the hash so subsequent builds skip this step.
-        docker.image.tag(stack_tag, hash_tag)
+        tag_image(stack_tag, hash_tag)
     return ok
 
 
@@ -306,7 +407,11 @@ def _process_wrapped_container(build_context: BuildContext) -> bool:
     building_container = build_context.container
     stack = build_context.stack
 
-    wrapper = _resolve_wrapper_for_container(building_container, build_context.notes.get("wrapper_pin") or {})
+    # Under `prepare` the wrapper was resolved, and its base image prepared, by a task of its own.
+    wrapper = build_context.notes.get("resolved_wrapper")
+    base_ready = wrapper is not None
+    if not wrapper:
+        wrapper = _resolve_wrapper_for_container(building_container, build_context.notes.get("wrapper_pin") or {})
 
     log_info(f"Building {building_container.name} using wrapper: {wrapper.name}")
 
@@ -320,7 +425,7 @@ def _process_wrapped_container(build_context: BuildContext) -> bool:
         "dirty": wrapper_repo_dirty,
     }
 
-    if not prepare_wrapper_base_container(wrapper, build_context):
+    if not base_ready and not prepare_wrapper_base_container(wrapper, build_context):
         return False
 
     wrapper_build_script = str(wrapper.build_script_path()) if wrapper.build_script_path().exists() else None
@@ -366,7 +471,7 @@ def _write_missing_pins(identity, payload_version, wrapper_used):
         return
 
     if identity.stack_dir:
-        locks = read_stack_locks(identity.stack_dir)
+        locks = read_stack_locks(identity.stack_dir, for_update=True)
         if payload_pin_needed:
             locks["containers"][identity.container_spec.name] = {"ref": identity.payload_ref.split("@")[0], "hash": payload_version}
             log_info(f"Locking {identity.container_spec.name} payload to {payload_version}")
@@ -375,7 +480,7 @@ def _write_missing_pins(identity, payload_version, wrapper_used):
             log_info(f"Locking wrapper {wrapper_used['name']} to {wrapper_used['hash']}")
         write_stack_locks(identity.stack_dir, locks)
     elif identity.container_lock_dir:
-        locks = read_container_locks(identity.container_lock_dir)
+        locks = read_container_locks(identity.container_lock_dir, for_update=True)
         if payload_pin_needed:
             locks["hash"] = payload_version
             log_info(f"Locking {identity.container_spec.name} payload to {payload_version}")
@@ -388,7 +493,352 @@ def _write_missing_pins(identity, payload_version, wrapper_used):
             get_yaml().dump(locks, output_file)
 
 
-def build_containers(parent_stack,  # noqa: C901
+class _PrepareRun:
+    """Settings and shared state for one build_containers() call, common to every container."""
+
+    def __init__(self, build_policy, image_registry, publish_images, extra_build_args, git_ssh, git_pull,
+                 dont_pull_repo_fs_paths, target_arch, dont_pull_images, dev_root_path, default_container_base_dir,
+                 total, build_cache=None, timings=None, platforms=None):
+        self.build_policy = build_policy
+        self.image_registry = image_registry
+        self.publish_images = publish_images
+        self.extra_build_args = extra_build_args
+        self.git_ssh = git_ssh
+        self.git_pull = git_pull
+        self.dont_pull_repo_fs_paths = dont_pull_repo_fs_paths
+        self.target_arch = target_arch
+        self.dont_pull_images = dont_pull_images
+        self.dev_root_path = dev_root_path
+        self.default_container_base_dir = default_container_base_dir
+        self.total = total
+        self.build_cache = build_cache
+        self.timings = timings or BuildTimings()
+        self.platforms = platforms or []
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def next_position(self):
+        with self._lock:
+            self.started += 1
+            return self.started
+
+    def ensure_repo(self, fs_path, fetch_ref, subject):
+        """Clone (or, with --git-pull, pull) a repo at most once per run.
+
+        Serialized per checkout: two containers built from the same repo must not clone
+        it into the same directory at the same time."""
+        with self.timings.phase(subject, "fetch"), repo_lock(fs_path):
+            if not os.path.exists(fs_path) or (self.git_pull and fs_path not in self.dont_pull_repo_fs_paths):
+                process_repo(self.git_pull, False, self.git_ssh, self.dev_root_path, [], fetch_ref)
+                self.dont_pull_repo_fs_paths.append(fs_path)
+                return True
+        return False
+
+
+class _ContainerJob:
+    """One container's way through prepare: fetch, identify, check, then pull or build, tag and publish.
+
+    The work is split where the scheduler needs it split: resolve() decides what has to be
+    done and does it when that is only a pull; a build is a separate task, so that it can
+    wait on the wrapper base image it needs without holding a worker while it does."""
+
+    def __init__(self, run: _PrepareRun, stack, stack_container, index):
+        self.run = run
+        self.stack = stack
+        self.stack_container = stack_container
+        self.index = index
+        self.identity = None
+        self.container_spec = None
+        self.container_tag = None
+        self.stack_local_tag = None
+        self.stack_legacy_tag = None
+        self.image_registry_to_pull_this_container = run.image_registry
+        self.image_registry_to_push_this_container = run.image_registry
+        self.needs_built = True
+        self.needs_pulled = False
+        self.was_built = False
+        self.was_pulled = False
+        self.status = None
+        self.push_started = None
+        self.push_finished = None
+        self.push_size = None
+
+    def _phase(self, phase):
+        return self.run.timings.phase(self.stack_container.name, phase)
+
+    @property
+    def key(self):
+        return f"container:{self.index}:{self.stack_container.name}"
+
+    @property
+    def publish_key(self):
+        return f"publish:{self.index}:{self.stack_container.name}"
+
+    @property
+    def build_key(self):
+        return f"build:{self.index}:{self.stack_container.name}"
+
+    def resolve(self, scheduler: TaskScheduler):
+        run = self.run
+        stack = self.stack
+        stack_container = self.stack_container
+
+        log_info(f"Preparing {stack_container.name} ({run.next_position()} of {run.total})", bold=True)
+
+        # No container ref means use the stack repo.
+        if (not stack_container.ref or stack_container.ref == ".") and stack.get_repo_ref():
+            stack_container.ref = stack.get_repo_ref()
+
+        if stack_container.ref and not (
+            stack.repo_is_local_checkout() and same_repo_ref(stack_container.ref, stack.get_repo_ref())
+        ):
+            run.ensure_repo(fs_path_for_repo(stack_container.ref, run.dev_root_path), stack_container.ref,
+                            stack_container.name)
+
+        # The image is identified by the recipe repo's commit hash, with locks in the
+        # recipe repo pinning the other build inputs (see ImageIdentity).
+        with self._phase("identity"):
+            identity = compute_image_identity(stack, stack_container, run.dev_root_path)
+        self.identity = identity
+        self.container_spec = container_spec = identity.container_spec
+
+        self.container_tag = f"{container_spec.name}:{identity.tag_version}"[:128] if identity.tag_version else None
+        self.stack_local_tag = f"{container_spec.name}:stack"
+        self.stack_legacy_tag = f"{container_spec.name}:local"
+        image_registries_to_check = [r for r in [run.image_registry, image_registry_for_repo(identity.recipe_ref)] if r]
+
+        container_tag = self.container_tag
+        if container_tag:
+            with self._phase("local-check"):
+                # The local store cannot say which platforms an image holds: with --platforms,
+                # only a registry's manifest list can show the image is there for all of them.
+                exists_locally = container_exists_locally(container_tag) and not run.platforms
+            if exists_locally and run.build_policy in ["as-needed", "prebuilt", "prebuilt-local"]:
+                log_info(f"Container {container_tag} exists locally.")
+                self.needs_pulled = False
+                self.needs_built = False
+                # Tag the local copy to point at it.
+                with self._phase("tag"):
+                    tag_image(container_tag, self.stack_local_tag)
+            elif not identity.tag_version.startswith("stackdev-"):
+                # A stackdev version is never published, so don't look for it remotely.
+                if run.build_policy in ["as-needed", "prebuilt", "prebuilt-remote"]:
+                    with self._phase("remote-probe"):
+                        exists_remotely, self.image_registry_to_pull_this_container = container_exists_remotely(
+                            container_tag, image_registries_to_check, run.target_arch, run.platforms)
+                    if exists_remotely:
+                        if self.image_registry_to_pull_this_container:
+                            log_info(f"Container {self.image_registry_to_pull_this_container}/{container_tag} exists remotely.")
+                        else:
+                            log_info(f"Container {container_tag} exists remotely.")
+                        self.needs_pulled = not run.dont_pull_images
+                        self.needs_built = False
+        elif identity.unpinned:
+            log_info(f"Container {container_spec.name} has unpinned build inputs, so it must be built.")
+
+        if self.needs_pulled:
+            with self._phase("pull"):
+                self.pull()
+        elif self.needs_built:
+            if run.build_policy in ["prebuilt", "prebuilt-local", "prebuilt-remote"]:
+                error_exit(f"No prebuilt image available for: {container_spec.name}")
+            # The build is its own task, so that it can wait on a wrapper base image
+            # shared with other containers without occupying a worker meanwhile.
+            build_depends_on = [self.key]
+            if container_spec.wrapper:
+                build_depends_on.append(self._schedule_wrapper_base(scheduler))
+                run.timings.depends(stack_container.name, self._wrapper_base_key())
+            scheduler.add(self.build_key, functools.partial(self.build, scheduler), depends_on=build_depends_on,
+                          order=(self.index, 2))
+            return
+
+        self.finish(scheduler)
+
+    def _wrapper_base_key(self):
+        wrapper_pin = self.identity.wrapper_pin or {}
+        return (f"wrapper-base:{self.container_spec.wrapper}"
+                f"@{self.container_spec.wrapper_ref or wrapper_pin.get('ref') or ''}#{wrapper_pin.get('hash') or ''}")
+
+    def _schedule_wrapper_base(self, scheduler: TaskScheduler):
+        key = self._wrapper_base_key()
+        container_spec = self.container_spec
+        wrapper_pin = self.identity.wrapper_pin or {}
+        build_context = self._build_context()
+        timings = self.run.timings
+
+        def prepare_base():
+            wrapper = _resolve_wrapper_for_container(container_spec, wrapper_pin)
+            with timings.phase(key, "build"):
+                prepared = prepare_wrapper_base_container(wrapper, build_context)
+            if not prepared:
+                error_exit(f"container build failed for: base container {wrapper.base_container} of wrapper {wrapper.name}")
+            return wrapper
+
+        # Only the first container using this wrapper adds the task; the rest just depend on it.
+        scheduler.add(key, prepare_base, order=(self.index, 1))
+        return key
+
+    def _build_context(self):
+        run = self.run
+        container_build_env = make_container_build_env(
+            run.dev_root_path, run.default_container_base_dir, "build-force" == run.build_policy, run.extra_build_args
+        )
+        # Beside the images themselves: the registry they are published to, else the one they are looked for in.
+        cache_registry = run.image_registry or image_registry_for_repo(self.identity.recipe_ref)
+        container_build_env.update(build_cache_env(run.build_cache, cache_registry, run.publish_images))
+        if run.platforms:
+            container_build_env["STACK_BUILD_PLATFORMS"] = ",".join(run.platforms)
+        build_context = BuildContext(self.stack, self.container_spec, run.default_container_base_dir,
+                                     container_build_env, run.dev_root_path)
+        build_context.notes["wrapper_pin"] = self.identity.wrapper_pin
+        return build_context
+
+    def pull(self):
+        container_tag = self.container_tag
+        registry = self.image_registry_to_pull_this_container
+        # Pull the remote image
+        if registry:
+            run_shell_command(f"docker pull {registry}/{container_tag}", quiet=opts.o.quiet or opts.o.quiet_build)
+            local_images().invalidate()
+            # Tag the local copy to point at it.
+            tag_image(f"{registry}/{container_tag}", container_tag)
+        else:
+            run_shell_command(f"docker pull {container_tag}", quiet=opts.o.quiet or opts.o.quiet_build)
+            local_images().invalidate()
+        # Tag the local copy to point at it.
+        tag_image(container_tag, self.stack_local_tag)
+        self.was_pulled = True
+
+    def build(self, scheduler: TaskScheduler):
+        run = self.run
+        identity = self.identity
+        container_spec = self.container_spec
+
+        if self.container_tag:
+            log_info(f"Container {self.container_tag} needs to be built.")
+
+        # Make sure the payload source is present, at the pinned version when there is one.
+        payload_version = None
+        deviating_inputs = []
+        if identity.payload_ref:
+            if identity.payload_is_recipe:
+                # Colocated: the recipe tree is the payload source; it is already
+                # present and its state is already reflected in the identity.
+                target_fs_repo_path = identity.recipe_fs_path
+                log_info(f"Building {container_spec.name} from {target_fs_repo_path}")
+            else:
+                target_fs_repo_path = fs_path_for_repo(identity.payload_ref, run.dev_root_path)
+                fetch_ref = identity.payload_ref
+                if identity.payload_pin:
+                    fetch_ref = f"{identity.payload_ref.split('@')[0]}@{identity.payload_pin}"
+                if not run.ensure_repo(target_fs_repo_path, fetch_ref, self.stack_container.name):
+                    log_info(f"Building {container_spec.name} from {target_fs_repo_path}")
+            payload_version = get_container_tag_for_repo(target_fs_repo_path)
+            if not identity.payload_is_recipe:
+                if not identity.payload_pin:
+                    deviating_inputs.append(f"payload:{payload_version}")
+                elif payload_version != identity.payload_pin:
+                    log_warn(f"WARN: {identity.payload_ref} checkout {payload_version} "
+                             f"does not match locked hash {identity.payload_pin}.", bold=True)
+                    deviating_inputs.append(f"payload:{payload_version}")
+
+        build_context = self._build_context()
+        if container_spec.wrapper:
+            # Resolved, and its base image prepared, by the wrapper base task this one waited on.
+            build_context.notes["resolved_wrapper"] = scheduler.result(self._wrapper_base_key())
+
+        with self._phase("tag"):
+            for tag in [self.stack_legacy_tag, self.stack_local_tag, self.container_tag]:
+                if not tag:
+                    continue
+                try:
+                    remove_image(tag)
+                except Exception:
+                    pass
+
+        with self._phase("build"):
+            result = process_container(build_context)
+            local_images().invalidate()
+        if not result:
+            error_exit(f"container build failed for: {build_context.container}")
+
+        self.was_built = True
+        # Handle legacy build scripts
+        with self._phase("tag"):
+            if container_exists_locally(self.stack_legacy_tag) and not container_exists_locally(self.stack_local_tag):
+                tag_image(self.stack_legacy_tag, self.stack_local_tag)
+
+        wrapper_used = build_context.notes.get("wrapper")
+        if wrapper_used:
+            if not identity.wrapper_pin:
+                deviating_inputs.append(f"wrapper:{wrapper_used['hash']}{'-dirty' if wrapper_used['dirty'] else ''}")
+            elif wrapper_used["dirty"] or (
+                    wrapper_used["hash"] and wrapper_used["hash"] != identity.wrapper_pin.get("hash")):
+                log_warn(f"WARN: wrapper {wrapper_used['name']} at {wrapper_used['hash']} "
+                         f"does not match locked hash {identity.wrapper_pin.get('hash')}.", bold=True)
+                deviating_inputs.append(f"wrapper:{wrapper_used['hash']}{'-dirty' if wrapper_used['dirty'] else ''}")
+
+        # The actual inputs are known now, so settle the image identity.
+        if identity.recipe_fs_path and Path(identity.recipe_fs_path).exists():
+            built_version = recipe_repo_version(identity.recipe_fs_path, identity.lock_file_path)
+            if deviating_inputs:
+                # The content deviates from what the recipe commit pins, so the recipe
+                # hash must not name it: generate a dev version from the actual inputs.
+                built_version = "stackdev-" + hashlib.sha1(
+                    ":".join([built_version] + deviating_inputs).encode()).hexdigest()
+                log_warn(f"WARN: {container_spec.name} was built from unpinned or deviating inputs."
+                         f"  Using generated version: {built_version}", bold=True)
+            self.container_tag = f"{container_spec.name}:{built_version}"[:128]
+
+        with _lock_file_lock:
+            _write_missing_pins(identity, payload_version, wrapper_used)
+
+        self.finish(scheduler)
+
+    def finish(self, scheduler: TaskScheduler):
+        container_tag = self.container_tag
+        stack_local_tag = self.stack_local_tag
+        stack_legacy_tag = self.stack_legacy_tag
+
+        if container_tag:
+            with self._phase("tag"):
+                # We won't have a local copy with prebuilt-remote and --no-pull
+                if container_exists_locally(stack_local_tag) and self.was_built:
+                    # Point the local copy at the expected name.
+                    tag_image(stack_local_tag, container_tag)
+
+                # Now check the other way, we have the container_tag but not the local tags
+                if container_exists_locally(container_tag):
+                    if not container_exists_locally(stack_local_tag):
+                        tag_image(container_tag, stack_local_tag)
+                    if not container_exists_locally(stack_legacy_tag):
+                        tag_image(container_tag, stack_legacy_tag)
+
+        if self.run.publish_images and container_tag:
+            if not self.image_registry_to_push_this_container:
+                error_exit(f"No image registry specified to push {container_tag}")
+            container_version = container_tag.split(":")[-1]
+            if container_version.startswith("stackdev-"):
+                log_warn(f"WARN: not publishing {container_tag}: it was not built from committed, pinned inputs.", bold=True)
+            else:
+                # Pushed on the publish pool, so that the next container's build need not wait for it.
+                scheduler.add(self.publish_key, functools.partial(self.publish, container_version), order=(self.index, 3),
+                              pool="publish")
+
+        log_debug(f"Finished {self.container_spec.name}", bold=True)
+        self.status = "built" if self.was_built else "pulled" if self.was_pulled else "existing-image"
+
+    def publish(self, container_version):
+        log_info(f"Publishing {self.container_tag} to {self.image_registry_to_push_this_container}")
+        self.push_started = time.monotonic()
+        with self._phase("publish"):
+            publish_image(self.stack_local_tag, self.image_registry_to_push_this_container, container_version)
+        self.push_finished = time.monotonic()
+        self.push_size = local_image_size(self.stack_local_tag)
+        log_info(f"Published {self.container_tag} in {self.push_finished - self.push_started:.1f}s")
+
+
+def build_containers(parent_stack,
                      build_policy=get_config_setting("build-policy", BUILD_POLICIES[0]),
                      image_registry=get_config_setting("image-registry"),
                      publish_images=get_config_setting("publish-images", False),
@@ -399,232 +849,107 @@ def build_containers(parent_stack,  # noqa: C901
                      git_pull=False,
                      dont_pull_repo_fs_paths=None,
                      target_arch=None,
-                     dont_pull_images=False):
+                     dont_pull_images=False,
+                     jobs=get_config_setting("build-jobs", 1),
+                     publish_jobs=get_config_setting("publish-jobs", 1),
+                     build_cache=get_config_setting("build-cache"),
+                     timings=None,
+                     platforms=get_config_setting("platforms")):
+    """Build, pull or reuse the image of every container in the stack (and its required stacks).
+
+    With jobs > 1 the containers are prepared concurrently, by a pool of that many workers;
+    see TaskScheduler for how the wrapper base images are ordered before their users.
+    Images are published by a separate pool of publish_jobs workers, overlapping the builds.
+    build_cache, when set, gives the builds a layer cache (see parse_build_cache()).
+    Each container's phases are timed into timings, a BuildTimings, when one is given.
+    platforms, a comma-separated list such as linux/amd64,linux/arm64, has every image
+    built, checked for and published for all of them at once."""
     dev_root_path = get_dev_root_path()
     required_stacks = parent_stack.get_required_stacks_paths()
     if not dont_pull_repo_fs_paths:
         dont_pull_repo_fs_paths = []
 
-    all_containers_in_scope = []
-    finished_containers = {}
-    for stack in required_stacks:
-        stack = get_parsed_stack_config(stack)
-        containers_in_scope = [c for c in get_containers_in_scope(stack) if include_exclude_check(c.name, include, exclude)]
-        all_containers_in_scope.extend(containers_in_scope)
+    if build_policy not in BUILD_POLICIES:
+        error_exit(f"{build_policy} is not one of {BUILD_POLICIES}")
+
+    if target_arch and target_arch != local_container_arch():
+        if not dont_pull_images:
+            error_exit("--target-arch requires --dont-pull-images")
+        if build_policy != "prebuilt-remote":
+            error_exit("--target-arch requires --build-policy prebuilt-remote")
 
-    log_info(f"Found {len(all_containers_in_scope)} containers in {len(required_stacks)} stacks: "
-             f"{', '.join([c.name for c in all_containers_in_scope])}", bold=True)
+    parse_build_cache(build_cache)
 
+    platforms = parse_platforms(platforms)
+    if platforms:
+        if target_arch:
+            error_exit("--platforms and --target-arch cannot be used together")
+        if build_policy == "prebuilt-local":
+            error_exit("--platforms cannot be used with --build-policy prebuilt-local")
+        log_info(f"Building for {', '.join(platforms)}")
+
+    stacks_and_containers = []
     for stack in required_stacks:
         stack = get_parsed_stack_config(stack)
+        # check if we have any repos that specify the container targets / build info
+        containers_in_scope = [c for c in get_containers_in_scope(stack) if include_exclude_check(c.name, include, exclude)]
+        stacks_and_containers.extend((stack, c) for c in containers_in_scope)
 
-        if build_policy not in BUILD_POLICIES:
-            error_exit(f"{build_policy} is not one of {BUILD_POLICIES}")
+    log_info(f"Found {len(stacks_and_containers)} containers in {len(required_stacks)} stacks: "
+             f"{', '.join([c.name for _, c in stacks_and_containers])}", bold=True)
 
-        # See: https://stackoverflow.com/questions/25389095/python-get-path-of-root-project-structure
-        default_container_base_dir = Path(__file__).absolute().parent.parent.joinpath("data", "container-build")
+    log_debug(f"Dev Root is: {dev_root_path}")
 
-        log_debug("Dev Root is: {dev_root_path}")
+    # See: https://stackoverflow.com/questions/25389095/python-get-path-of-root-project-structure
+    default_container_base_dir = Path(__file__).absolute().parent.parent.joinpath("data", "container-build")
 
-        if not os.path.isdir(dev_root_path):
-            log_debug("Dev root directory doesn't exist, creating")
+    run = _PrepareRun(build_policy, image_registry, publish_images, extra_build_args, git_ssh, git_pull,
+                      dont_pull_repo_fs_paths, target_arch, dont_pull_images, dev_root_path, default_container_base_dir,
+                      len(stacks_and_containers), build_cache, timings, platforms)
 
-        if target_arch and target_arch != local_container_arch():
-            if not dont_pull_images:
-                error_exit("--target-arch requires --dont-pull-images")
-            if build_policy != "prebuilt-remote":
-                error_exit("--target-arch requires --build-policy prebuilt-remote")
+    scheduler = TaskScheduler(jobs, pools={"publish": publish_jobs}, thread_name_prefix="stack-build")
+    container_jobs = []
+    for index, (stack, stack_container) in enumerate(stacks_and_containers):
+        job = _ContainerJob(run, stack, stack_container, index)
+        container_jobs.append(job)
+        scheduler.add(job.key, functools.partial(job.resolve, scheduler), order=(index, 0))
 
-        # check if we have any repos that specify the container targets / build info
-        containers_in_scope = [c for c in get_containers_in_scope(stack) if include_exclude_check(c.name, include, exclude)]
-        for stack_container in containers_in_scope:
-
-            log_info(f"Preparing {stack_container.name} ({len(finished_containers)+1} of {len(all_containers_in_scope)})",
-                     bold=True)
-
-            # No container ref means use the stack repo.
-            if (not stack_container.ref or stack_container.ref == ".") and stack.get_repo_ref():
-                stack_container.ref = stack.get_repo_ref()
-
-            if stack_container.ref and not (
-                stack.repo_is_local_checkout() and same_repo_ref(stack_container.ref, stack.get_repo_ref())
-            ):
-                fs_path_for_container_specs = fs_path_for_repo(stack_container.ref, dev_root_path)
-                if not os.path.exists(fs_path_for_container_specs) or (
-                        git_pull and fs_path_for_container_specs not in dont_pull_repo_fs_paths):
-                    process_repo(git_pull, False, git_ssh, dev_root_path, [], stack_container.ref)
-                    dont_pull_repo_fs_paths.append(fs_path_for_container_specs)
-
-            # The image is identified by the recipe repo's commit hash, with locks in the
-            # recipe repo pinning the other build inputs (see ImageIdentity).
-            identity = compute_image_identity(stack, stack_container, dev_root_path)
-            container_spec = identity.container_spec
-
-            container_needs_built = True
-            container_was_built = False
-            container_was_pulled = False
-            container_needs_pulled = False
-            container_tag = f"{container_spec.name}:{identity.tag_version}"[:128] if identity.tag_version else None
-            stack_local_tag = f"{container_spec.name}:stack"
-            stack_legacy_tag = f"{container_spec.name}:local"
-            image_registry_to_pull_this_container = image_registry
-            image_registry_to_push_this_container = image_registry
-            image_registries_to_check = [r for r in [image_registry, image_registry_for_repo(identity.recipe_ref)] if r]
-
-            if container_tag:
-                exists_locally = container_exists_locally(container_tag)
-                if exists_locally and build_policy in ["as-needed", "prebuilt", "prebuilt-local"]:
-                    log_info(f"Container {container_tag} exists locally.")
-                    container_needs_pulled = False
-                    container_needs_built = False
-                    # Tag the local copy to point at it.
-                    docker.image.tag(container_tag, stack_local_tag)
-                elif not identity.tag_version.startswith("stackdev-"):
-                    # A stackdev version is never published, so don't look for it remotely.
-                    if build_policy in ["as-needed", "prebuilt", "prebuilt-remote"]:
-                        exists_remotely, image_registry_to_pull_this_container = container_exists_remotely(
-                            container_tag, image_registries_to_check, target_arch)
-                        if exists_remotely:
-                            if image_registry_to_pull_this_container:
-                                log_info(f"Container {image_registry_to_pull_this_container}/{container_tag} exists remotely.")
-                            else:
-                                log_info(f"Container {container_tag} exists remotely.")
-                            container_needs_pulled = not dont_pull_images
-                            container_needs_built = False
-            elif identity.unpinned:
-                log_info(f"Container {container_spec.name} has unpinned build inputs, so it must be built.")
-
-            if container_needs_pulled:
-                # Pull the remote image
-                if image_registry_to_pull_this_container:
-                    run_shell_command(f"docker pull {image_registry_to_pull_this_container}/{container_tag}",
-                                      quiet=opts.o.quiet or opts.o.quiet_build)
-                    # Tag the local copy to point at it.
-                    docker.image.tag(f"{image_registry_to_pull_this_container}/{container_tag}", container_tag)
-                else:
-                    run_shell_command(f"docker pull {container_tag}", quiet=opts.o.quiet or opts.o.quiet_build)
-                # Tag the local copy to point at it.
-                docker.image.tag(container_tag, stack_local_tag)
-                container_was_pulled = True
-            elif container_needs_built:
-                if build_policy in ["prebuilt", "prebuilt-local", "prebuilt-remote"]:
-                    error_exit(f"No prebuilt image available for: {container_spec.name}")
-
-                if container_tag:
-                    log_info(f"Container {container_tag} needs to be built.")
-
-                # Make sure the payload source is present, at the pinned version when there is one.
-                payload_version = None
-                deviating_inputs = []
-                if identity.payload_ref:
-                    if identity.payload_is_recipe:
-                        # Colocated: the recipe tree is the payload source; it is already
-                        # present and its state is already reflected in the identity.
-                        target_fs_repo_path = identity.recipe_fs_path
-                        log_info(f"Building {container_spec.name} from {target_fs_repo_path}")
-                    else:
-                        target_fs_repo_path = fs_path_for_repo(identity.payload_ref, dev_root_path)
-                        if not os.path.exists(target_fs_repo_path) or (
-                                git_pull and target_fs_repo_path not in dont_pull_repo_fs_paths):
-                            fetch_ref = identity.payload_ref
-                            if identity.payload_pin:
-                                fetch_ref = f"{identity.payload_ref.split('@')[0]}@{identity.payload_pin}"
-                            process_repo(git_pull, False, git_ssh, dev_root_path, [], fetch_ref)
-                            dont_pull_repo_fs_paths.append(target_fs_repo_path)
-                        else:
-                            log_info(f"Building {container_spec.name} from {target_fs_repo_path}")
-                    payload_version = get_container_tag_for_repo(target_fs_repo_path)
-                    if not identity.payload_is_recipe:
-                        if not identity.payload_pin:
-                            deviating_inputs.append(f"payload:{payload_version}")
-                        elif payload_version != identity.payload_pin:
-                            log_warn(f"WARN: {identity.payload_ref} checkout {payload_version} "
-                                     f"does not match locked hash {identity.payload_pin}.", bold=True)
-                            deviating_inputs.append(f"payload:{payload_version}")
-
-                container_build_env = make_container_build_env(
-                    dev_root_path, default_container_base_dir, "build-force" == build_policy, extra_build_args
-                )
-
-                build_context = BuildContext(stack, container_spec, default_container_base_dir, container_build_env, dev_root_path)
-                build_context.notes["wrapper_pin"] = identity.wrapper_pin
-
-                for tag in [stack_legacy_tag, stack_local_tag, container_tag]:
-                    if not tag:
-                        continue
-                    try:
-                        docker.image.remove(tag)
-                    except Exception:
-                        pass
-
-                result = process_container(build_context)
-                if not result:
-                    error_exit(f"container build failed for: {build_context.container}")
-
-                container_was_built = True
-                # Handle legacy build scripts
-                if container_exists_locally(stack_legacy_tag) and not container_exists_locally(stack_local_tag):
-                    docker.image.tag(stack_legacy_tag, stack_local_tag)
-
-                wrapper_used = build_context.notes.get("wrapper")
-                if wrapper_used:
-                    if not identity.wrapper_pin:
-                        deviating_inputs.append(f"wrapper:{wrapper_used['hash']}{'-dirty' if wrapper_used['dirty'] else ''}")
-                    elif wrapper_used["dirty"] or (
-                            wrapper_used["hash"] and wrapper_used["hash"] != identity.wrapper_pin.get("hash")):
-                        log_warn(f"WARN: wrapper {wrapper_used['name']} at {wrapper_used['hash']} "
-                                 f"does not match locked hash {identity.wrapper_pin.get('hash')}.", bold=True)
-                        deviating_inputs.append(f"wrapper:{wrapper_used['hash']}{'-dirty' if wrapper_used['dirty'] else ''}")
-
-                # The actual inputs are known now, so settle the image identity.
-                if identity.recipe_fs_path and Path(identity.recipe_fs_path).exists():
-                    built_version = recipe_repo_version(identity.recipe_fs_path, identity.lock_file_path)
-                    if deviating_inputs:
-                        # The content deviates from what the recipe commit pins, so the recipe
-                        # hash must not name it: generate a dev version from the actual inputs.
-                        built_version = "stackdev-" + hashlib.sha1(
-                            ":".join([built_version] + deviating_inputs).encode()).hexdigest()
-                        log_warn(f"WARN: {container_spec.name} was built from unpinned or deviating inputs."
-                                 f"  Using generated version: {built_version}", bold=True)
-                    container_tag = f"{container_spec.name}:{built_version}"[:128]
-
-                _write_missing_pins(identity, payload_version, wrapper_used)
-
-            if container_tag:
-                # We won't have a local copy with prebuilt-remote and --no-pull
-                if container_exists_locally(stack_local_tag) and container_was_built:
-                    # Point the local copy at the expected name.
-                    docker.image.tag(stack_local_tag, container_tag)
+    if scheduler.jobs > 1:
+        log_info(f"Preparing up to {scheduler.jobs} containers at a time.")
+    scheduler.run()
 
-                # Now check the other way, we have the container_tag but not the local tags
-                if container_exists_locally(container_tag):
-                    if not container_exists_locally(stack_local_tag):
-                        docker.image.tag(container_tag, stack_local_tag)
-                    if not container_exists_locally(stack_legacy_tag):
-                        docker.image.tag(container_tag, stack_legacy_tag)
-
-            if publish_images and container_tag:
-                if not image_registry_to_push_this_container:
-                    error_exit(f"No image registry specified to push {container_tag}")
-                container_version = container_tag.split(":")[-1]
-                if container_version.startswith("stackdev-"):
-                    log_warn(f"WARN: not publishing {container_tag}: it was not built from committed, pinned inputs.", bold=True)
-                else:
-                    log_info(f"Publishing {container_tag} to {image_registry_to_push_this_container}")
-                    publish_image(stack_local_tag, image_registry_to_push_this_container, container_version)
-
-            log_debug(f"Finished {container_spec.name} ({len(finished_containers)+1} of {len(all_containers_in_scope)})", bold=True)
-            final_status = "built" if container_was_built else "pulled" if container_was_pulled else "existing-image"
-            finished_containers[container_spec.name] = final_status
+    finished_containers = {}
+    for job in container_jobs:
+        finished_containers[job.container_spec.name] = job.status
 
     log_info(f"Prepared {len(finished_containers)} containers:")
     max_name_len = 0
     for name in finished_containers.keys():
         max_name_len = max(max_name_len, len(name))
 
+    pushes = {job.container_spec.name: job for job in container_jobs if job.push_finished}
     padding = 8
     for name, status in finished_containers.items():
-        output_main(f"{name.ljust(max_name_len + padding)} {status}")
+        push_note = f"  {_push_summary(pushes[name])}" if name in pushes else ""
+        output_main(f"{name.ljust(max_name_len + padding)} {status}{push_note}")
+
+    if pushes:
+        jobs_pushed = pushes.values()
+        elapsed = max(j.push_finished for j in jobs_pushed) - min(j.push_started for j in jobs_pushed)
+        total_size = sum(j.push_size or 0 for j in jobs_pushed)
+        log_info(f"Published {len(pushes)} images, {_megabytes(total_size)} in {elapsed:.1f}s"
+                 f" ({_megabytes(total_size / elapsed if elapsed else 0)}/s)")
+
+
+def _megabytes(size):
+    return f"{size / 1000 / 1000:.1f} MB"
+
+
+def _push_summary(job: _ContainerJob):
+    elapsed = job.push_finished - job.push_started
+    if not job.push_size:
+        return f"pushed in {elapsed:.1f}s"
+    return f"pushed in {elapsed:.1f}s ({_megabytes(job.push_size)}, {_megabytes(job.push_size / elapsed if elapsed else 0)}/s)"
 
 
 @click.command()
@@ -640,15 +965,25 @@ def build_containers(parent_stack,  # noqa: C901
 @click.option("--image-registry", help="Specify the remote image registry (default: auto-detect per-container)",
               default=get_config_setting("image-registry"))
 @click.option("--target-arch", help="Specify a target architecture (only for use with --dont-pull-images)")
+@click.option("--jobs", type=int, default=get_config_setting("build-jobs", 1), help="Prepare up to this many containers at once")
+@click.option("--publish-jobs", type=int, default=get_config_setting("publish-jobs", 1),
+              help="Push up to this many images at once, alongside the builds")
+@click.option("--build-cache", default=get_config_setting("build-cache"),
+              help="Layer cache for builds: registry, registry:<registry> or local:<directory>")
+@click.option("--timings-out", type=click.Path(dir_okay=False),
+              help="Write each container's per-phase timings to this file (.json or .csv)")
+@click.option("--platforms", default=get_config_setting("platforms"),
+              help="Build and publish every image for these platforms, e.g. linux/amd64,linux/arm64")
 @click.pass_context
 def command(ctx, stack, include, exclude, git_ssh, build_policy, extra_build_args, dont_pull_images, publish_images,
-            image_registry, target_arch):
+            image_registry, target_arch, jobs, publish_jobs, build_cache, timings_out, platforms):
     """build stack containers"""
     from stack import validate
 
     stack = resolve_stack(stack)
     # Advisory for now: report integrity problems, but let the build proceed.
     validate.log_findings(stack)
+    timings = BuildTimings()
     build_containers(stack,
                      build_policy,
                      image_registry,
@@ -660,4 +995,12 @@ def command(ctx, stack, include, exclude, git_ssh, build_policy, extra_build_arg
                      False,
                      [],
                      target_arch,
-                     dont_pull_images)
+                     dont_pull_images,
+                     jobs,
+                     publish_jobs,
+                     build_cache,
+                     timings,
+                     platforms)
+    if timings_out:
+        timings.write(timings_out)
+        log_info(f"Wrote timings to {timings_out}")
@@ -14,24 +14,24 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
-import base64
 import hashlib
 import importlib.resources
 import git
 import json
-import os
 import platform
 import string
-import subprocess
 
 from pathlib import Path
-from python_on_whales import DockerClient
 
 import stack.deploy.stack as stack_util
 
 from stack import constants
+from stack.build import registry as registry_client
+from stack.build.identity_cache import cached_repo_version
+from stack.build.image_inventory import local_images
 from stack.log import log_debug, log_info, log_warn
-from stack.util import get_yaml, error_exit
+from stack.repos import repo_metadata
+from stack.util import get_yaml, error_exit, read_yaml_file
 
 
 class StackContainer:
@@ -112,7 +112,7 @@ class ContainerSpec:
         self.file_path = Path(file_path).as_posix()
         self.spec_dir = Path(self.file_path).parent
 
-        y = get_yaml().load(open(file_path, "r"))
+        y = read_yaml_file(file_path)
         if "container" not in y:
             error_exit(f"No 'container' section in {file_path}.")
         self.name = y["container"].get("name", self.name)
@@ -154,8 +154,7 @@ class ContainerSpec:
 
     def get_repo_url(self):
         if self.repo_path:
-            repo = git.Repo(self.repo_path)
-            return repo.remotes[0].url
+            return repo_metadata.remote_url(self.repo_path)
         return None
 
 
@@ -174,20 +173,22 @@ def default_content_root(stack_container, spec_ref=None):
     return stack_container.path
 
 
-def read_stack_locks(stack_dir) -> dict:
+def read_stack_locks(stack_dir, for_update=False) -> dict:
     """Read the stack.lock beside a stack.yml: the pinned versions of the stack's build inputs.
 
     Format: {containers: {<container-name>: {ref, hash}}, wrappers: {<wrapper-name>: {ref, hash}},
     images: {<external-image-reference>: <manifest digest>}} (see build/image_pins.py for images).
-    A legacy wrapper.lock is read as the wrappers section when no stack.lock exists."""
+    A legacy wrapper.lock is read as the wrappers section when no stack.lock exists.
+    for_update reads it round-trip, so that write_stack_locks() keeps its comments."""
+    read = _read_lock_for_update if for_update else read_yaml_file
     locks = None
     lock_file_path = Path(stack_dir).joinpath(constants.stack_lock_file_name)
     if lock_file_path.exists():
-        locks = get_yaml().load(open(lock_file_path, "r")) or {}
+        locks = read(lock_file_path) or {}
     else:
         legacy_lock_file_path = Path(stack_dir).joinpath(constants.wrapper_lock_file_name)
         if legacy_lock_file_path.exists():
-            locks = {"wrappers": get_yaml().load(open(legacy_lock_file_path, "r")) or {}}
+            locks = {"wrappers": read(legacy_lock_file_path) or {}}
     if locks is None:
         locks = {}
     locks.setdefault("containers", {})
@@ -198,21 +199,32 @@ def read_stack_locks(stack_dir) -> dict:
 
 def write_stack_locks(stack_dir, locks: dict):
     lock_file_path = Path(stack_dir).joinpath(constants.stack_lock_file_name)
+    # Drop the empty sections from a copy, keeping the mapping (and so its comments) as read.
+    output = locks.copy()
+    for section in [section for section, pins in locks.items() if not pins]:
+        del output[section]
     with open(lock_file_path, "w") as output_file:
-        get_yaml().dump({section: dict(pins) for section, pins in locks.items() if pins}, output_file)
+        get_yaml().dump(output, output_file)
     legacy_lock_file_path = Path(stack_dir).joinpath(constants.wrapper_lock_file_name)
     if legacy_lock_file_path.exists():
         log_info(f"{legacy_lock_file_path} has been superseded by {lock_file_path} and can be deleted.")
 
 
-def read_container_locks(container_spec_dir) -> dict:
-    """Read the container.lock beside a container.yml: {hash: <payload pin>, wrapper: {ref, hash}}."""
+def read_container_locks(container_spec_dir, for_update=False) -> dict:
+    """Read the container.lock beside a container.yml: {hash: <payload pin>, wrapper: {ref, hash}}.
+
+    for_update reads it round-trip, so that its comments survive it being written back."""
     lock_file_path = Path(container_spec_dir).joinpath(constants.container_lock_file_name)
     if lock_file_path.exists():
-        return get_yaml().load(open(lock_file_path, "r")) or {}
+        return (_read_lock_for_update if for_update else read_yaml_file)(lock_file_path) or {}
     return {}
 
 
+def _read_lock_for_update(lock_file_path):
+    with open(lock_file_path, "r") as f:
+        return get_yaml().load(f)
+
+
 def recipe_repo_version(recipe_fs_path, lock_file_path=None):
     """The version (image tag) named by the recipe repo checkout: its HEAD hash when clean,
     a stackdev- hash otherwise.
@@ -221,7 +233,15 @@ def recipe_repo_version(recipe_fs_path, lock_file_path=None):
     even though git does not count an untracked file as dirty: the pins it holds are not
     covered by the HEAD commit, so the HEAD hash alone would not reproduce the image.  The
     stackdev- hash is derived from the lock content, so it is stable across runs; committing
-    the lock file is what stabilizes the version to a plain commit hash."""
+    the lock file is what stabilizes the version to a plain commit hash.
+
+    Cached across runs on the state of the checkout and the lock file's content; see
+    build/identity_cache.py."""
+    return cached_repo_version("recipe", recipe_fs_path,
+                               lambda: _recipe_repo_version(recipe_fs_path, lock_file_path), lock_file_path)
+
+
+def _recipe_repo_version(recipe_fs_path, lock_file_path):
     # Deferred import to avoid a circular dependency.
     from stack.repos.repo_util import get_container_tag_for_repo
 
@@ -440,99 +460,59 @@ def get_containers_in_scope(stack):
 
 
 def container_exists_locally(tag):
-    docker = DockerClient()
-    try:
-        return docker.image.exists(tag)
-    except Exception as e:
-        if "image not known" in str(e):
-            return False
-        raise e
+    return local_images().exists(tag)
+
 
+def container_exists_remotely(tag, registries=None, arch=None, platforms=None):
+    """Whether tag is published, for arch -- or, given platforms, for every one of them.
 
-def container_exists_remotely(tag, registries=None, arch=None):
+    Each registry is asked once, the manifest (or manifest list) it returns listing every
+    platform the image was published for."""
     if not arch:
         arch = local_container_arch()
 
-    if not registries:
-        registries = [None]
-    else:
-        registries.append(None)
-
+    registries = _registries_to_check(registries)
+    # Every candidate is probed at once; the first, in order of preference, wins.
+    registry_client.probe_images([(tag, registry) for registry in registries])
     for registry in registries:
-        manifests = _docker_manifest_inspect(tag, registry)
-        for manifest in manifests:
-            platform = manifest.get("Descriptor", {}).get("platform", {})
-            if arch == platform.get("architecture") and "linux" == platform.get("os"):
+        if platforms:
+            if _has_platforms(tag, registry, platforms):
                 return True, registry
+        elif registry_client.image_exists(tag, registry, arch):
+            return True, registry
 
     return False, None
 
 
-def _is_loopback_registry(registry):
-    # A loopback registry speaks plain HTTP; docker treats it as implicitly insecure
-    # for push/pull, but `manifest inspect` has to be told explicitly.
-    if not registry:
-        return False
-    host = registry.split("/")[0].split(":")[0]
-    return host in ("localhost", "127.0.0.1", "::1")
-
-
-def _docker_manifest_inspect(tag, registry=None):
-    manifest = None
-    full_tag = tag
-    if registry:
-        full_tag = f"{registry}/{tag}"
-
-    log_debug(f"Checking for {full_tag}")
-
-    insecure_flag = "--insecure " if _is_loopback_registry(registry) else ""
-
-    # Basic docker command
-    manifest_cmd = ["docker", "manifest", "inspect"] + (["--insecure"] if insecure_flag else []) + ["--verbose", full_tag]
-
-    # podman does not properly support the manifest command, so we cheat by having podman run the docker-cli
-    docker_version = subprocess.run(["docker", "--version"], capture_output=True, text=True)
-    if "podman" in docker_version.stdout:
-        inspect_str = f"docker manifest inspect {insecure_flag}--verbose {full_tag}"
-        if registry:
-            username = None
-            password = None
-            registry_root = registry
-            if "/" in registry:
-                registry_root = registry.split("/")[0]
-            if os.path.exists(f"{os.environ['XDG_RUNTIME_DIR']}/containers/auth.json"):
-                auths = json.load(open(f"{os.environ['XDG_RUNTIME_DIR']}/containers/auth.json", "rt")).get("auths", {})
-                login_info = None
-                if registry in auths and "auth" in auths[registry]:
-                    login_info = auths[registry]["auth"]
-                elif registry_root in auths and "auth" in auths[registry_root]:
-                    login_info = auths[registry_root]["auth"]
-                if login_info:
-                    username, password = base64.standard_b64decode(login_info).decode().split(":", 2)
-
-            if username and password:
-                inspect_str = (f'docker login --username "{username}" --password "{password}"'
-                               f" {registry} >/dev/null && {inspect_str}")
-
-        manifest_cmd = ["podman", "run", "-q", "alpinelinux/docker-cli", "sh", "-c", inspect_str]
-
-    result = subprocess.run(manifest_cmd, capture_output=True, text=True)
-    if 0 == result.returncode:
-        manifest = json.loads(result.stdout)
-        if not isinstance(manifest, list):
-            manifest = [manifest]
-    elif any(marker in result.stderr.lower() for marker in ("unauthorized", "authentication required", "denied", "401 ")):
-        # Debug, not a warning: registries are probed speculatively (the natural registry
-        # for the repo's git host, plus the default one), and for a stack whose images were
-        # never published every probe is denied. That is the ordinary case, and the caller
-        # already reports the outcome as "needs to be built" and "built". A registry returns
-        # the same denial for a private repo and one that does not exist, so this cannot
-        # distinguish "not published" from "no access" anyway. A user who requires a pull
-        # rather than a build should say so with --build-policy prebuilt, which fails hard.
-        log_debug(f"denied by {registry or 'the default registry'} for {full_tag}; "
-                  f"treating as not available remotely")
-
-    return manifest if manifest else []
+def _has_platforms(tag, registry, platforms):
+    published = registry_client.image_platforms(tag, registry)
+    # The variant (the v8 of linux/arm64/v8) is not part of the check.
+    return all(tuple(p.split("/")[:2]) in published for p in platforms)
+
+
+def parse_platforms(platforms):
+    """The os/arch[/variant] platforms in a comma-separated list, such as linux/amd64,linux/arm64."""
+    if not platforms:
+        return []
+    parsed = [p.strip() for p in platforms.split(",") if p.strip()]
+    for p in parsed:
+        if not 2 <= len(p.split("/")) <= 3 or not all(p.split("/")):
+            error_exit(f"{p} is not a platform of the form os/arch[/variant], such as linux/arm64")
+    return list(dict.fromkeys(parsed))
+
+
+def prefetch_remote_containers(probes):
+    """Probe the registries for many (tag, registries) pairs concurrently.
+
+    Later container_exists_remotely() calls for the same pairs are then answered from
+    the run's cache."""
+    registry_client.probe_images([(tag, registry) for tag, registries in probes
+                                  for registry in _registries_to_check(registries)])
+
+
+def _registries_to_check(registries):
+    # The default registry (Docker Hub) is always the last resort.
+    return list(registries or []) + [None]
 
 
 def local_container_arch():
@@ -0,0 +1,137 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""An on-disk cache of repo versions (image tags), keyed on the state of the checkout.
+
+An image's identity is its recipe repo's version: the HEAD hash when the checkout is
+clean, a stackdev- hash of the diff when it is not (see get_container_tag_for_repo()
+and recipe_repo_version()).  Working that out takes several git processes per repo --
+and a full `git diff` for a dirty one -- and `check` and `prepare` do it for every
+container on every run, though the answer only changes when the checkout does.
+
+So the answer is cached, under a key computed from the checkout without running git:
+
+  - HEAD, resolved through the ref files and packed-refs;
+  - the index file's size and mtime, which move with every `git add` and commit;
+  - the lstat() of every tracked file named in the index, which moves with every edit
+    (this is what makes an unstaged change a cache miss: an edit does not touch the
+    index, so HEAD and the index alone would go on naming the clean version);
+  - the digest of the lock file, when the version depends on one.
+
+Untracked files are not part of the key, which matches git's own is_dirty() -- they do
+not make a checkout dirty either.  A checkout that cannot be read this way (an index
+version or layout this does not understand, unmerged entries) is simply not cached.
+
+The cache lives beneath the dev root, and can be turned off with the `identity-cache`
+config setting.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from pathlib import Path
+
+from stack import constants
+from stack.config.util import get_config_setting, get_dev_root_path
+from stack.log import log_debug
+from stack.repos.git_state import repo_state_key
+
+
+CACHE_FILE_NAME = "image-identity.json"
+# Entries are cheap, but a long-lived dev root sees many commits; the oldest go first.
+MAX_ENTRIES = 2000
+
+_lock = threading.Lock()
+_cache = None
+
+
+def _file_digest(path):
+    if path and Path(path).exists():
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    return "-"
+
+
+def _cache_file_path():
+    return get_dev_root_path().joinpath(constants.cache_dir_name, CACHE_FILE_NAME)
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        cache_file = _cache_file_path()
+        if cache_file.exists():
+            try:
+                _cache = json.loads(cache_file.read_text())
+            except (OSError, ValueError):
+                log_debug(f"Ignoring unreadable identity cache {cache_file}")
+    return _cache
+
+
+def _save():
+    cache_file = _cache_file_path()
+    while len(_cache) > MAX_ENTRIES:
+        del _cache[next(iter(_cache))]
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so that concurrent runs never see a torn file.
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp_file.write_text(json.dumps(_cache))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        log_debug(f"Unable to write identity cache {cache_file}: {e}")
+
+
+def cache_enabled():
+    return bool(get_config_setting("identity-cache", True))
+
+
+def cached_repo_version(kind: str, repo_path, compute, lock_file_path=None):
+    """compute(), or the value it returned the last time the checkout was in this state.
+
+    `kind` separates the different versions computed for one repo (with and without a
+    lock file, say); lock_file_path, when given, is part of the key by content."""
+    if not cache_enabled() or not repo_path:
+        return compute()
+
+    def key_for(state):
+        return hashlib.sha1(f"{kind}\0{state}\0{lock_file_path}\0{_file_digest(lock_file_path)}".encode()).hexdigest()
+
+    state = repo_state_key(repo_path)
+    if state is None:
+        return compute()
+
+    key = key_for(state)
+    with _lock:
+        cache = _load()
+        if key in cache:
+            # Move it to the back of the line for eviction.
+            value = cache.pop(key)
+            cache[key] = value
+            log_debug(f"Identity cache hit for {kind} of {repo_path}: {value}")
+            return value
+
+    value = compute()
+    # git refreshes the index's stat data as it works out dirtiness, which changes the
+    # index's mtime: key the value on the state it leaves behind, the one the next run sees.
+    state_after = repo_state_key(repo_path)
+    if value is not None and state_after is not None:
+        with _lock:
+            cache = _load()
+            cache[key_for(state_after)] = value
+            _save()
+    return value
@@ -0,0 +1,172 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""A snapshot of the local image store, kept current through stack's own changes to it.
+
+`stack prepare` asks "does this tag exist locally?" several times per container -- the
+version tag, the :stack and legacy :local tags, before and after retagging -- and each
+answer used to be a `docker image exists` process.  Instead the store is listed once,
+with a single `docker image ls`, into tag -> ID and ID -> digest maps.
+
+Tags and removals made through tag_image() and remove_image() are applied to the
+snapshot as they are made.  Anything that changes the store behind its back -- a build,
+a pull -- calls invalidate(), and the next question lists the store again.
+"""
+
+import subprocess
+import threading
+
+from python_on_whales import DockerClient
+
+from stack.log import log_debug
+
+# Tab-separated, and with field names docker and podman both understand.
+LIST_FORMAT = "{{.ID}}\t{{.Repository}}\t{{.Tag}}\t{{.Digest}}"
+NONE = "<none>"
+
+_docker = DockerClient()
+
+
+def normalize_reference(ref: str):
+    """The form a reference is recorded under, so that equivalent spellings match.
+
+    docker lists Docker Hub images as `postgres` and `org/app`; podman as
+    `docker.io/library/postgres` and `docker.io/org/app`, and its own short-named
+    builds as `localhost/app`.  All of those name the same image to the CLI."""
+    if "@" not in ref and ":" not in ref.rsplit("/", 1)[-1]:
+        ref = f"{ref}:latest"
+    for prefix in ["docker.io/library/", "docker.io/", "localhost/"]:
+        if ref.startswith(prefix):
+            return ref[len(prefix):]
+    return ref
+
+
+class LocalImageInventory:
+    def __init__(self, lister=None):
+        self._lister = lister or _list_images
+        self._lock = threading.RLock()
+        self._tags = None
+        self._digests = {}
+
+    def _load(self):
+        if self._tags is None:
+            tags, digests = {}, {}
+            for image_id, repository, tag, digest in self._lister():
+                digests.setdefault(image_id, set())
+                if repository == NONE:
+                    continue
+                if tag != NONE:
+                    tags[normalize_reference(f"{repository}:{tag}")] = image_id
+                if digest and digest != NONE:
+                    digests[image_id].add(normalize_reference(f"{repository}@{digest}"))
+            log_debug(f"Listed {len(tags)} local image tags")
+            self._tags, self._digests = tags, digests
+        return self._tags
+
+    def image_id(self, ref: str):
+        """The ID of the local image `ref` (a tag, a digest reference or an ID) names, or None."""
+        with self._lock:
+            tags = self._load()
+            ref = normalize_reference(ref) if not ref.startswith("sha256:") else ref
+            if ref in tags:
+                return tags[ref]
+            if "@" in ref:
+                for image_id, digests in self._digests.items():
+                    if ref in digests:
+                        return image_id
+            if ref.startswith("sha256:") and ref in self._digests:
+                return ref
+            return None
+
+    def exists(self, ref: str):
+        return self.image_id(ref) is not None
+
+    def digests(self, ref: str):
+        """The `repository@digest` references recorded for the image `ref` names."""
+        with self._lock:
+            image_id = self.image_id(ref)
+            return sorted(self._digests.get(image_id, [])) if image_id else []
+
+    def tags(self, ref: str):
+        """Every tag on the image `ref` names."""
+        with self._lock:
+            image_id = self.image_id(ref)
+            return sorted(t for t, i in self._tags.items() if i == image_id) if image_id else []
+
+    def record_tag(self, source: str, target: str):
+        with self._lock:
+            if self._tags is None:
+                return
+            image_id = self.image_id(source)
+            if image_id is None:
+                # Tagged from something the snapshot does not know: it is out of date.
+                self.invalidate()
+            else:
+                self._tags[normalize_reference(target)] = image_id
+
+    def record_removal(self, ref: str):
+        with self._lock:
+            if self._tags is not None:
+                self._tags.pop(normalize_reference(ref), None)
+
+    def invalidate(self):
+        with self._lock:
+            self._tags = None
+            self._digests = {}
+
+
+def _list_images():
+    result = subprocess.run(["docker", "image", "ls", "--no-trunc", "--digests", "--format", LIST_FORMAT],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"unable to list local images: {result.stderr.strip()}")
+    rows = []
+    for line in result.stdout.splitlines():
+        fields = line.split("\t")
+        if len(fields) == 4:
+            rows.append(tuple(fields))
+    return rows
+
+
+_inventory = LocalImageInventory()
+
+
+def local_images() -> LocalImageInventory:
+    return _inventory
+
+
+def tag_image(source: str, target: str):
+    _docker.image.tag(source, target)
+    _inventory.record_tag(source, target)
+
+
+def remove_image(ref: str):
+    """Remove a tag, if it exists; the snapshot already knows when it does not."""
+    if not _inventory.exists(ref):
+        return
+    try:
+        _docker.image.remove(ref)
+    except Exception:
+        _inventory.invalidate()
+        raise
+    _inventory.record_removal(ref)
+
+
+def local_image_size(ref: str):
+    """The size in bytes of the local image `ref` names, or None."""
+    try:
+        return _docker.image.inspect(ref).size
+    except Exception:
+        return None
@@ -162,7 +162,7 @@ def lock_external_images(parent_stack: Stack, allow_pull=True):
         if not stack.file_path:
             continue
         stack_dir = stack.file_path.parent
-        locks = read_stack_locks(stack_dir)
+        locks = read_stack_locks(stack_dir, for_update=True)
         changed = False
         for image, unpinned in sorted(external_images_for_stack(stack).items()):
             if unpinned:
@@ -18,8 +18,10 @@ import click
 from stack import validate
 from stack.build.build_containers import BUILD_POLICIES, build_containers
 from stack.build.image_pins import lock_external_images
+from stack.build.timings import RUN, BuildTimings
 from stack.config.util import get_config_setting
 from stack.deploy.stack import resolve_stack
+from stack.log import log_info
 from stack.opts import opts
 from stack.repos.repo_util import clone_all_repos_for_stack
 from stack.util import error_exit
@@ -48,6 +50,16 @@ PREPARE_POLICIES = BUILD_POLICIES[:] + ["fetch-repos"]
 @click.option("--target-arch", help="Specify a target architecture (only for use with --dont-pull-images)")
 @click.option("--quiet-build", is_flag=True, default=False,
               help="Suppress container build and pull output, keeping the progress summary")
+@click.option("--jobs", type=int, default=get_config_setting("build-jobs", 1), help="Prepare up to this many containers at once")
+@click.option("--fetch-jobs", type=int, default=get_config_setting("fetch-jobs", 1), help="Fetch up to this many repos at once")
+@click.option("--publish-jobs", type=int, default=get_config_setting("publish-jobs", 1),
+              help="Push up to this many images at once, alongside the builds")
+@click.option("--build-cache", default=get_config_setting("build-cache"),
+              help="Layer cache for builds: registry, registry:<registry> or local:<directory>")
+@click.option("--timings-out", type=click.Path(dir_okay=False),
+              help="Write each container's per-phase timings to this file (.json or .csv)")
+@click.option("--platforms", default=get_config_setting("platforms"),
+              help="Build and publish every image for these platforms, e.g. linux/amd64,linux/arm64")
 @click.pass_context
 def command(
         ctx,
@@ -65,6 +77,12 @@ def command(
         image_registry,
         target_arch,
         quiet_build,
+        jobs,
+        fetch_jobs,
+        publish_jobs,
+        build_cache,
+        timings_out,
+        platforms,
 ):
     """build or download stack containers"""
 
@@ -76,19 +94,32 @@ def command(
     opts.o.quiet_build = quiet_build
 
     stack = resolve_stack(stack)
-    cloned_or_pulled_repos = clone_all_repos_for_stack(stack, include_repos, exclude_repos, git_pull, git_ssh)
+    timings = BuildTimings()
+    with timings.phase(RUN, "fetch"):
+        cloned_or_pulled_repos = clone_all_repos_for_stack(stack, include_repos, exclude_repos, git_pull, git_ssh,
+                                                           fetch_jobs)
 
     # Advisory for now: report integrity problems, but let the prepare proceed.
     validate.log_findings(stack)
 
     if build_policy == "fetch-repos":
+        _write_timings(timings, timings_out)
         return
 
     # Record a digest for each external image the stack's pod files name, so that
     # deployments pull exactly what was prepared (see build/image_pins.py).  Before
     # the build, because a stack may consist only of external images (docker-ingress
     # is one) and build_containers exits early on a stack with no containers.
-    lock_external_images(stack, allow_pull=not dont_pull_images)
+    with timings.phase(RUN, "external-images"):
+        lock_external_images(stack, allow_pull=not dont_pull_images)
 
     build_containers(stack, build_policy, image_registry, publish_images, include_containers, exclude_containers,
-                     extra_build_args, git_ssh, git_pull, cloned_or_pulled_repos, target_arch, dont_pull_images)
+                     extra_build_args, git_ssh, git_pull, cloned_or_pulled_repos, target_arch, dont_pull_images, jobs,
+                     publish_jobs, build_cache, timings, platforms)
+    _write_timings(timings, timings_out)
+
+
+def _write_timings(timings, timings_out):
+    if timings_out:
+        timings.write(timings_out)
+        log_info(f"Wrote timings to {timings_out}")
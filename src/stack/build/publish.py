@@ -17,6 +17,7 @@ from datetime import datetime
 from python_on_whales import DockerClient
 from python_on_whales.exceptions import DockerException
 
+from stack.build.image_inventory import tag_image
 from stack.log import log_debug
 from stack.util import error_exit
 
@@ -41,7 +42,7 @@ def publish_image(local_tag, registry, version=None):
     remote_tag = _publish_tag_for_image(local_tag, registry, version)
     # Tag the image thus
     log_debug(f"Tagging {local_tag} to {remote_tag}")
-    docker.image.tag(local_tag, remote_tag)
+    tag_image(local_tag, remote_tag)
     # Push it to the desired registry
     log_debug(f"Pushing image {remote_tag}")
     try:
@@ -0,0 +1,358 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""A minimal client for the registry (OCI distribution) HTTP API.
+
+Only what `stack prepare` and `stack check` need: is a given image published, and for
+which platforms.  This used to be `docker manifest inspect`, one process per registry
+per container (and on podman, a whole `docker-cli` container per probe).  Asking the
+registry directly costs a HEAD request on a kept-alive connection.
+
+Credentials are read from the same files `docker login` and `podman login` write:
+$REGISTRY_AUTH_FILE, the containers auth.json files, and ~/.docker/config.json --
+including its credential helpers.  Token auth follows the registry's challenge, and
+tokens are reused for the rest of the run.
+
+The answers are cached for the life of the process: a `prepare` asks about the same
+image once per registry candidate, and often once more for a wrapper base shared by
+several containers, and nothing it does in the meantime publishes it.
+"""
+
+import base64
+import json
+import os
+import re
+import subprocess
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from stack.log import log_debug
+
+
+DOCKER_HUB_HOST = "registry-1.docker.io"
+DOCKER_HUB_AUTH_KEYS = ["https://index.docker.io/v1/", "index.docker.io", "docker.io"]
+
+MANIFEST_TYPES = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+]
+INDEX_TYPES = MANIFEST_TYPES[:2]
+
+# Probes are network-bound and cheap for the registry; this bounds the connections
+# held open to any one registry as much as the threads.
+MAX_CONCURRENT_PROBES = 16
+TIMEOUT = (5, 30)
+
+_lock = threading.Lock()
+_sessions = {}
+_tokens = {}
+_helper_credentials = {}
+_platforms = {}
+_probe_locks = {}
+
+
+class ImageReference:
+    host: str
+    repository: str
+    tag: str
+    scheme: str
+
+    def __init__(self, host, repository, tag, scheme="https"):
+        self.host = host
+        self.repository = repository
+        self.tag = tag
+        self.scheme = scheme
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return f"{self.host}/{self.repository}:{self.tag}"
+
+
+def is_loopback_registry(registry):
+    # A loopback registry speaks plain HTTP; docker treats it as implicitly insecure.
+    if not registry:
+        return False
+    host = registry.split("/")[0]
+    if host.startswith("["):
+        host = host[1:].split("]")[0]
+    else:
+        host = host.split(":")[0]
+    return host in ("localhost", "127.0.0.1", "::1")
+
+
+def parse_reference(tag, registry=None) -> ImageReference:
+    """Where `tag` (name:version) lives in `registry` (host[/path], or None for Docker Hub)."""
+    full_tag = f"{registry}/{tag}" if registry else tag
+    name, _, version = full_tag.rpartition(":")
+    if not name or "/" in version:
+        name, version = full_tag, "latest"
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        host, repository = first, rest
+    else:
+        host, repository = DOCKER_HUB_HOST, name
+    if host in ("docker.io", "index.docker.io"):
+        host = DOCKER_HUB_HOST
+    if host == DOCKER_HUB_HOST and "/" not in repository:
+        repository = f"library/{repository}"
+
+    scheme = "http" if is_loopback_registry(host) else "https"
+    return ImageReference(host, repository, version, scheme)
+
+
+def _auth_files():
+    files = []
+    if os.environ.get("REGISTRY_AUTH_FILE"):
+        files.append(Path(os.environ["REGISTRY_AUTH_FILE"]))
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        files.append(Path(os.environ["XDG_RUNTIME_DIR"]).joinpath("containers", "auth.json"))
+    files.append(Path.home().joinpath(".config", "containers", "auth.json"))
+    docker_config_dir = os.environ.get("DOCKER_CONFIG")
+    files.append(Path(docker_config_dir).joinpath("config.json") if docker_config_dir
+                 else Path.home().joinpath(".docker", "config.json"))
+    return files
+
+
+def _auth_keys(ref: ImageReference):
+    # Most specific first: podman allows credentials per namespace or repository.
+    if ref.host == DOCKER_HUB_HOST:
+        return DOCKER_HUB_AUTH_KEYS
+    parts = ref.repository.split("/")
+    keys = [f"{ref.host}/{'/'.join(parts[:i])}" for i in range(len(parts), 0, -1)]
+    return keys + [ref.host, f"https://{ref.host}", f"http://{ref.host}", f"https://{ref.host}/v1/"]
+
+
+def _credential_helper(helper, server):
+    key = (helper, server)
+    with _lock:
+        if key in _helper_credentials:
+            return _helper_credentials[key]
+    credentials = None
+    try:
+        result = subprocess.run([f"docker-credential-{helper}", "get"], input=server,
+                                capture_output=True, text=True, timeout=30)
+        if result.returncode == 0:
+            secret = json.loads(result.stdout)
+            if secret.get("Username") and secret.get("Secret"):
+                credentials = (secret["Username"], secret["Secret"])
+            else:
+                # Some helpers hold token-only entries, with no username; those are no use
+                # for basic auth or a token request, so the lookup goes on without them.
+                log_debug(f"docker-credential-{helper} has no username and secret for {server}; skipping it")
+        else:
+            log_debug(f"docker-credential-{helper} has no credentials for {server}")
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        log_debug(f"docker-credential-{helper} failed for {server}: {e}")
+    with _lock:
+        _helper_credentials[key] = credentials
+    return credentials
+
+
+def credentials_for(ref: ImageReference):
+    """(username, password) for the reference's registry, or None for anonymous access."""
+    keys = _auth_keys(ref)
+    for auth_file in _auth_files():
+        try:
+            config = json.loads(auth_file.read_text())
+        except (OSError, ValueError):
+            continue
+        auths = config.get("auths") or {}
+        for key in keys:
+            entry = auths.get(key)
+            if not entry:
+                continue
+            if entry.get("auth"):
+                username, _, password = base64.standard_b64decode(entry["auth"]).decode().partition(":")
+                return username, password
+            if entry.get("username"):
+                return entry["username"], entry.get("password", "")
+        cred_helpers = config.get("credHelpers") or {}
+        for key in keys:
+            if key in cred_helpers:
+                credentials = _credential_helper(cred_helpers[key], key)
+                if credentials:
+                    return credentials
+        if config.get("credsStore"):
+            # The store is keyed as docker login keys it: by host alone.
+            server = DOCKER_HUB_AUTH_KEYS[0] if ref.host == DOCKER_HUB_HOST else ref.host
+            credentials = _credential_helper(config["credsStore"], server)
+            if credentials:
+                return credentials
+    return None
+
+
+def _session(ref: ImageReference):
+    key = (ref.scheme, ref.host)
+    with _lock:
+        if key not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_PROBES)
+            session.mount(f"{ref.scheme}://", adapter)
+            _sessions[key] = session
+        return _sessions[key]
+
+
+def _parse_challenge(header):
+    scheme, _, params = header.partition(" ")
+    return scheme.lower(), dict(re.findall(r'(\w+)="([^"]*)"', params))
+
+
+def _fetch_token(ref: ImageReference, challenge):
+    params = {k: v for k, v in challenge.items() if k in ("service", "scope")}
+    params.setdefault("scope", f"repository:{ref.repository}:pull")
+    credentials = credentials_for(ref)
+    try:
+        response = _session(ref).get(challenge["realm"], params=params, auth=credentials, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        log_debug(f"Token request to {challenge['realm']} failed: {e}")
+        return None
+    if response.status_code != 200:
+        log_debug(f"Token request to {challenge['realm']} returned {response.status_code}")
+        return None
+    body = response.json()
+    return body.get("token") or body.get("access_token")
+
+
+def _request(method, ref: ImageReference, path, headers=None):
+    """A request to the registry's API, answering its auth challenge if it makes one."""
+    url = f"{ref.scheme}://{ref.host}/v2/{ref.repository}/{path}"
+    headers = dict(headers or {})
+    token_key = (ref.scheme, ref.host, ref.repository)
+    with _lock:
+        auth_header = _tokens.get(token_key)
+    if auth_header:
+        headers["Authorization"] = auth_header
+
+    response = _session(ref).request(method, url, headers=headers, timeout=TIMEOUT)
+    if response.status_code != 401 or "WWW-Authenticate" not in response.headers:
+        return response
+
+    scheme, challenge = _parse_challenge(response.headers["WWW-Authenticate"])
+    if scheme == "bearer" and "realm" in challenge:
+        token = _fetch_token(ref, challenge)
+        if not token:
+            return response
+        auth_header = f"Bearer {token}"
+    elif scheme == "basic":
+        credentials = credentials_for(ref)
+        if not credentials:
+            return response
+        auth_header = "Basic " + base64.standard_b64encode(":".join(credentials).encode()).decode()
+    else:
+        return response
+
+    with _lock:
+        _tokens[token_key] = auth_header
+    headers["Authorization"] = auth_header
+    return _session(ref).request(method, url, headers=headers, timeout=TIMEOUT)
+
+
+def _fetch_platforms(ref: ImageReference):
+    accept = {"Accept": ", ".join(MANIFEST_TYPES)}
+    # Most probes are for images that were never published: a HEAD answers those
+    # without a body, and does not count against Docker Hub's pull limit.
+    response = _request("HEAD", ref, f"manifests/{ref.tag}", accept)
+    if response.status_code in (401, 403):
+        # Debug, not a warning: registries are probed speculatively (the natural registry
+        # for the repo's git host, plus the default one), and for a stack whose images were
+        # never published every probe is denied. That is the ordinary case, and the caller
+        # already reports the outcome as "needs to be built" and "built". A registry returns
+        # the same denial for a private repo and one that does not exist, so this cannot
+        # distinguish "not published" from "no access" anyway. A user who requires a pull
+        # rather than a build should say so with --build-policy prebuilt, which fails hard.
+        log_debug(f"denied by {ref.host} for {ref}; treating as not available remotely")
+        return []
+    if response.status_code != 200:
+        log_debug(f"{ref} not found ({response.status_code})")
+        return []
+
+    response = _request("GET", ref, f"manifests/{ref.tag}", accept)
+    if response.status_code != 200:
+        return []
+    manifest = response.json()
+    media_type = manifest.get("mediaType") or response.headers.get("Content-Type", "").split(";")[0]
+    if media_type in INDEX_TYPES or "manifests" in manifest:
+        return [(m.get("platform", {}).get("os"), m.get("platform", {}).get("architecture"))
+                for m in manifest.get("manifests", [])]
+
+    # A single-platform image: its platform is recorded in the image config.
+    config_digest = (manifest.get("config") or {}).get("digest")
+    if not config_digest:
+        return []
+    response = _request("GET", ref, f"blobs/{config_digest}")
+    if response.status_code != 200:
+        return []
+    config = response.json()
+    return [(config.get("os"), config.get("architecture"))]
+
+
+def image_platforms(tag, registry=None):
+    """The (os, architecture) pairs `tag` is published for in `registry`; [] if it is not."""
+    ref = parse_reference(tag, registry)
+    key = str(ref)
+    with _lock:
+        probe_lock = _probe_locks.setdefault(key, threading.Lock())
+    # Concurrent askers of the same reference wait for the first one's answer.
+    with probe_lock:
+        with _lock:
+            if key in _platforms:
+                return _platforms[key]
+        log_debug(f"Checking for {ref}")
+        try:
+            platforms = _fetch_platforms(ref)
+        except (requests.RequestException, ValueError) as e:
+            log_debug(f"Unable to check {ref}: {e}")
+            platforms = []
+        with _lock:
+            _platforms[key] = platforms
+        return platforms
+
+
+def image_exists(tag, registry=None, arch=None, os_name="linux"):
+    for platform_os, platform_arch in image_platforms(tag, registry):
+        if platform_os == os_name and (not arch or platform_arch == arch):
+            return True
+    return False
+
+
+def probe_images(probes):
+    """Fill the cache for many (tag, registry) pairs at once."""
+    probes = list(dict.fromkeys(probes))
+    if len(probes) <= 1:
+        for tag, registry in probes:
+            image_platforms(tag, registry)
+        return
+    with ThreadPoolExecutor(max_workers=min(len(probes), MAX_CONCURRENT_PROBES),
+                            thread_name_prefix="stack-registry") as pool:
+        list(pool.map(lambda probe: image_platforms(*probe), probes))
+
+
+def clear_cache():
+    with _lock:
+        _platforms.clear()
+        _probe_locks.clear()
+        _tokens.clear()
+        _helper_credentials.clear()
@@ -0,0 +1,146 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Per-phase timings of a prepare run, written out as JSON or CSV (`--timings-out`).
+
+Each container's way through prepare is timed phase by phase -- fetch, identity,
+local-check, remote-probe, pull, build, tag, publish -- as is each wrapper base image
+shared between containers, and the run's own steps (fetching the stack's repos).  A
+phase entered more than once (a container is tagged both when found and when
+finished) is reported as the sum of its intervals.
+
+The report gives, besides each subject's phases, the total time spent in each phase
+across the run, the run's wall time, and its critical path: the longest chain of work
+that had to happen one after the other -- a container's own phases, preceded by those
+of the wrapper base its build waited on.  With --jobs > 1 that chain, not the sum of
+the totals, is what bounds the run.
+"""
+
+import contextlib
+import csv
+import json
+import threading
+import time
+
+from pathlib import Path
+
+from stack.util import error_exit
+
+PHASES = ["fetch", "identity", "local-check", "remote-probe", "pull", "build", "tag", "publish"]
+FORMATS = ["json", "csv"]
+# The subject the run's own phases are recorded against.
+RUN = "(run)"
+
+
+class BuildTimings:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        # subject -> phase -> [(start, end)], in the order the subjects were first seen.
+        self._intervals = {}
+        self._depends_on = {}
+
+    @contextlib.contextmanager
+    def phase(self, subject, phase):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            end = self._clock()
+            with self._lock:
+                self._intervals.setdefault(subject, {}).setdefault(phase, []).append(
+                    (start - self._started, end - self._started))
+
+    def depends(self, subject, on):
+        """Record that some of subject's work waited for all of on's."""
+        with self._lock:
+            self._depends_on.setdefault(subject, set()).add(on)
+
+    def _duration(self, subject):
+        return sum(end - start for intervals in self._intervals.get(subject, {}).values() for start, end in intervals)
+
+    def critical_path(self):
+        """The chain of subjects, ending with the last, whose work added up to the most time."""
+        longest = {}
+
+        def chain(subject, visiting=()):
+            if subject not in longest:
+                before = max((chain(dep, visiting + (subject,)) for dep in self._depends_on.get(subject, [])
+                              if dep not in visiting and dep in self._intervals),
+                             key=lambda c: c[0], default=(0, []))
+                longest[subject] = (before[0] + self._duration(subject), before[1] + [subject])
+            return longest[subject]
+
+        with self._lock:
+            chains = [chain(subject) for subject in self._intervals if subject != RUN]
+        seconds, subjects = max(chains, key=lambda c: c[0], default=(0, []))
+        return {"seconds": round(seconds, 3), "subjects": subjects}
+
+    def report(self):
+        with self._lock:
+            wall = self._clock() - self._started
+            subjects = {}
+            totals = {}
+            for subject, phases in self._intervals.items():
+                entry = {}
+                for phase, intervals in phases.items():
+                    seconds = sum(end - start for start, end in intervals)
+                    entry[phase] = {
+                        "started": round(min(start for start, _ in intervals), 3),
+                        "finished": round(max(end for _, end in intervals), 3),
+                        "seconds": round(seconds, 3),
+                    }
+                    totals[phase] = totals.get(phase, 0) + seconds
+                subjects[subject] = entry
+        return {
+            "wall_seconds": round(wall, 3),
+            "totals": {phase: round(totals[phase], 3) for phase in _ordered(totals)},
+            "critical_path": self.critical_path(),
+            "subjects": subjects,
+        }
+
+    def write(self, path, format=None):
+        """Write the report to path, as JSON or CSV: as `format` says, else as its suffix does."""
+        path = Path(path)
+        format = format or ("csv" if path.suffix.lower() == ".csv" else "json")
+        if format not in FORMATS:
+            error_exit(f"Timings format must be one of {FORMATS}, not {format}")
+        report = self.report()
+        with open(path, "w", newline="") as out:
+            if format == "json":
+                json.dump(report, out, indent=2)
+                out.write("\n")
+            else:
+                _write_csv(report, out)
+
+
+def _ordered(phases):
+    return sorted(phases, key=lambda p: (PHASES.index(p) if p in PHASES else len(PHASES), p))
+
+
+def _write_csv(report, out):
+    # One flat table: a row per subject and phase, then the totals and the critical path.
+    writer = csv.writer(out)
+    writer.writerow(["record", "subject", "phase", "started", "finished", "seconds"])
+    for subject, phases in report["subjects"].items():
+        for phase in _ordered(phases):
+            timing = phases[phase]
+            writer.writerow(["phase", subject, phase, timing["started"], timing["finished"], timing["seconds"]])
+    for phase, seconds in report["totals"].items():
+        writer.writerow(["total", "", phase, "", "", seconds])
+    writer.writerow(["total", "", "wall", "", "", report["wall_seconds"]])
+    critical_path = report["critical_path"]
+    writer.writerow(["critical-path", " > ".join(critical_path["subjects"]), "", "", "", critical_path["seconds"]])
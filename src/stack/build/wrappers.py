@@ -42,7 +42,7 @@ import os
 from pathlib import Path
 
 from stack.config.util import get_dev_root_path
-from stack.util import get_yaml, error_exit
+from stack.util import error_exit, read_yaml_file
 
 
 class Wrapper:
@@ -74,7 +74,7 @@ class Wrapper:
 
     def init_from_file(self, file_path: Path):
         self.dir = Path(file_path).absolute().parent
-        y = get_yaml().load(open(file_path, "r"))
+        y = read_yaml_file(file_path)
         if "wrapper" not in y:
             error_exit(f"No 'wrapper' section in {file_path}.")
         wrapper_section = y["wrapper"]
@@ -153,6 +153,7 @@ def wrapper_repo_info(wrapper: Wrapper):
     repo_ref is like github.com/org/repo, or None if it cannot be derived (e.g. the
     repo has a local-path remote)."""
     # Deferred import to avoid a circular dependency.
+    from stack.repos import repo_metadata
     from stack.repos.repo_util import find_repo_root, get_repo_current_hash, is_repo_dirty
     import git
 
@@ -162,7 +163,7 @@ def wrapper_repo_info(wrapper: Wrapper):
 
     repo_ref = None
     try:
-        repo_url = git.Repo(repo_root).remotes[0].url
+        repo_url = repo_metadata.remote_url(repo_root) or ""
         if repo_url.startswith("https://") or repo_url.startswith("http://"):
             repo_url = repo_url.split("://", 2)[1]
             repo_host, repo_name = repo_url.split("/", 1)
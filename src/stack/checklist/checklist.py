@@ -23,6 +23,7 @@ from stack.build.build_util import (
     container_exists_locally,
     container_exists_remotely,
     local_container_arch,
+    prefetch_remote_containers,
     same_repo_ref,
 )
 from stack.config.util import get_config_setting
@@ -38,6 +39,7 @@ from stack.repos.repo_util import (
 
 def container_disposition(parent_stack, image_registry, git_ssh):
     ret = {}
+    remote_candidates = {}
     required_stacks = parent_stack.get_required_stacks_paths()
 
     for stack_path in required_stacks:
@@ -71,19 +73,22 @@ def container_disposition(parent_stack, image_registry, git_ssh):
                 log_debug(f"{container_tag} exists locally: {exists_locally}")
                 ret[container_tag] = "local"
             elif identity.tag_version and not identity.tag_version.startswith("stackdev-"):
-                image_registries_to_check = [r for r in [image_registry, image_registry_for_repo(identity.recipe_ref)] if r]
-                exists_remotely, image_registry_to_pull_this_container = container_exists_remotely(
-                    container_tag, image_registries_to_check, local_container_arch()
-                )
-                if exists_remotely:
-                    log_debug(f"{container_tag} exists remotely: {exists_remotely}")
-                    ret[container_tag] = "remote:" + (image_registry_to_pull_this_container or "")
-                else:
-                    ret[container_tag] = "needs-built"
+                # Settled below, once every container's registries have been probed at once.
+                remote_candidates[container_tag] = [r for r in [image_registry, image_registry_for_repo(identity.recipe_ref)] if r]
+                ret[container_tag] = "needs-built"
             else:
                 # A stackdev or unpinned identity can never exist remotely.
                 ret[container_tag] = "needs-built"
 
+    prefetch_remote_containers(remote_candidates.items())
+    for container_tag, image_registries_to_check in remote_candidates.items():
+        exists_remotely, image_registry_to_pull_this_container = container_exists_remotely(
+            container_tag, image_registries_to_check, local_container_arch()
+        )
+        if exists_remotely:
+            log_debug(f"{container_tag} exists remotely: {exists_remotely}")
+            ret[container_tag] = "remote:" + (image_registry_to_pull_this_container or "")
+
     return ret
 
 
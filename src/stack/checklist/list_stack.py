@@ -17,7 +17,7 @@
 import click
 
 from stack.config.util import get_dev_root_path
-from stack.deploy.stack import locate_stacks_beneath
+from stack.deploy.stack_index import stacks_beneath
 from stack.log import log_debug, output_main
 
 
@@ -32,7 +32,7 @@ def command(ctx, filter, show_path):
 
     search_path = dev_root_path
 
-    stacks = locate_stacks_beneath(search_path)
+    stacks = stacks_beneath(search_path)
     stacks.sort(key=lambda s: s.name)
 
     if filter:
@@ -17,13 +17,14 @@ import click
 import os
 import string
 import sys
+import importlib
 import importlib.util
 
 from click import Context, HelpFormatter
 from gettext import gettext as _
 
 from stack.config.util import get_dev_root_path
-from stack.deploy.stack import locate_stacks_beneath, resolve_stack
+from stack.deploy.stack_index import stacks_beneath
 from stack.log import log_warn
 from stack.util import STACK_USE_BUILTIN_STACK
 
@@ -32,9 +33,27 @@ class StackCLI(click.Group):
     command_group_section_name = {}
     _stack_subcommands_loaded = False
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # name -> "module:attribute" of each command registered but not yet imported.
+        self.lazy_commands = {}
+
     def add_command_group_section(self, name: str):
         self.command_group_section_name[name] = name
 
+    def add_lazy_command(self, name: str, import_path: str):
+        """Register a command by where it lives; its module is imported when it is first looked up."""
+        self.lazy_commands[name] = import_path
+
+    def _resolve_lazy_command(self, name: str):
+        import_path = self.lazy_commands.pop(name, None)
+        if import_path is None:
+            return None
+        module_name, attribute = import_path.split(":")
+        cmd = getattr(importlib.import_module(module_name), attribute)
+        self.add_command(cmd, name)
+        return cmd
+
     def _load_stack_subcommands(self):
         """Register the subcommands contributed by every stack beneath the repo base dir.
 
@@ -49,16 +68,30 @@ class StackCLI(click.Group):
             return
         self._stack_subcommands_loaded = True
 
-        for stack in locate_stacks_beneath(get_dev_root_path()):
+        # Only the stacks the index says have subcommands are parsed at all.
+        for entry in stacks_beneath(get_dev_root_path()):
+            if not entry.subcommand_files:
+                continue
             # One stack with a broken subcommand file should cost that stack its
             # subcommands, not take the whole CLI down with it.
             try:
-                load_subcommands_from_stack(self, stack)
+                load_subcommands_from_stack(self, str(entry.file_path.parent))
             except Exception as e:
-                log_warn(f"WARN: ignoring exception loading subcommands from {stack.file_path.parent}: {e}")
+                log_warn(f"WARN: ignoring exception loading subcommands from {entry.file_path.parent}: {e}")
+
+    def _main_shell_completion(self, ctx_args, prog_name, complete_var=None):
+        # click's hook for a TAB press (_STACK_COMPLETE set).  Answered from a cached
+        # command tree, instead of importing every command the words pass through.
+        from stack.complete.completion import completion_var, shell_complete
+
+        complete_var = complete_var or completion_var(prog_name)
+        instruction = os.environ.get(complete_var)
+        if not instruction:
+            return
+        sys.exit(shell_complete(self, prog_name, complete_var, instruction))
 
     def get_command(self, ctx: Context, cmd_name: str):
-        cmd = super().get_command(ctx, cmd_name)
+        cmd = super().get_command(ctx, cmd_name) or self._resolve_lazy_command(cmd_name)
         if cmd is None:
             # Only a name that is not a built-in command pays for the stack search.
             self._load_stack_subcommands()
@@ -67,7 +100,7 @@ class StackCLI(click.Group):
 
     def list_commands(self, ctx: Context):
         self._load_stack_subcommands()
-        return super().list_commands(ctx)
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
 
     def format_commands(self, ctx: Context, formatter: HelpFormatter) -> None:
         # Listed first: a stack's subcommands register their section as they load, and
@@ -103,6 +136,9 @@ class StackCLI(click.Group):
 
 
 def load_subcommands_from_stack(cli, stack_path: str):
+    # Here, not at the top: the stack model pulls in GitPython, which most commands never need.
+    from stack.deploy.stack import resolve_stack
+
     stack = resolve_stack(stack_path)
     cmds_path = stack.file_path.parent.joinpath("subcommands")
     if os.path.exists(cmds_path):
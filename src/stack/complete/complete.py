@@ -16,62 +16,17 @@
 
 import click
 
+from stack.complete.completion import SHELLS, completion_script
 from stack.log import output_main
 from stack.util import error_exit
 
 
-# EXPERIMENTAL
-
-SHELL_COMPLETIONS = {
-    "bash": r"""
-_stack_completions()
-{
-  if [ "${#COMP_WORDS[@]}" == "2" ]; then
-    COMPREPLY=($(compgen -W "$(stack -h | grep -A99 '^Core Commands' | tail +2 | awk '{print $1}')" -- "${COMP_WORDS[1]}"))
-    return
-  fi
-
-  local lix=$((${#COMP_WORDS[@]} - 1))
-  if [ "${COMP_WORDS[$((lix-1))]}" == "--stack" ]; then
-    COMPREPLY=($(compgen -W "$(stack list)" -- "${COMP_WORDS[$((lix))]}"))
-    return
-  fi
-
-  if [ ${#COMP_WORDS[@]} -gt 2 ]; then
-    if [[ ${COMP_WORDS[$((lix))]} = --* ]]; then
-      SHORTER="${COMP_WORDS[@]::${#COMP_WORDS[@]}-1}"
-      TRY=$(bash -c "$SHORTER --help")
-      if [ $? -eq 0 ] && [ -n "$TRY" ]; then
-        COMPREPLY=($(compgen -W "$(bash -c "$SHORTER --help" | grep '\--' | grep -v '\--help' | awk '{ print $1 }')" -- "${COMP_WORDS[$((lix))]}"))
-      fi
-    elif [[ -z ${COMP_WORDS[$((lix))]} ]]; then
-      TRY=$(${COMP_WORDS[*]} --help 2>/dev/null)
-      if [ $? -eq 0 ] && [ -n "$TRY" ]; then
-        COMPREPLY=($(compgen -W "$(${COMP_WORDS[*]} --help 2>/dev/null | grep -A99 'Commands' | tail +2 | awk '{ print $1 }')"))
-      fi
-    else
-      TRY=$(${COMP_WORDS[@]::${#COMP_WORDS[@]}-1} --help 2>/dev/null)
-      if [ $? -eq 0 ] && [ -n "$TRY" ]; then
-        COMPREPLY=($(compgen -W "$(${COMP_WORDS[@]::${#COMP_WORDS[@]}-1} --help 2>/dev/null | grep -A99 'Commands' | tail +2 | awk '{ print $1 }')" -- "${COMP_WORDS[$((lix))]}"))
-      fi
-    fi
-    return
-  fi
-
-  COMPREPLY=()
-}
-complete -o bashdefault -o default -F _stack_completions stack
-"""
-}
-
-
 @click.command(hidden=True)
 @click.option("--shell", help="name of shell", default="bash")
 @click.pass_context
 def command(ctx, shell):
     """output shell completion script"""
 
-    script = SHELL_COMPLETIONS.get(shell)
-    if not script:
-        error_exit(f"{shell} is not among supported shells: {SHELL_COMPLETIONS.keys()}")
-    output_main(script)
+    if shell not in SHELLS:
+        error_exit(f"{shell} is not among supported shells: {SHELLS}")
+    output_main(completion_script(ctx.find_root().command, shell))
@@ -0,0 +1,237 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Shell completion over click's protocol, answered from a cached command tree.
+
+The scripts `stack complete` prints are click's: on TAB the shell runs `stack` with
+_STACK_COMPLETE set and the words typed so far, and prints what comes back.  Click
+would answer by building the real command tree, which means importing every command a
+completion passes through -- the kubernetes client and the rest, a second or more per
+TAB.  Instead the tree (commands, their options, which take values, their choices) is
+dumped once to <dev root>/.stack-cache/completion.json and answered from there.
+
+The dump is rebuilt when stack's own code changes, or when a stack's subcommand files
+do (they add commands).  Values for --stack come from the stack index, which is
+brought up to date with a stat() per directory rather than a parse per stack.
+"""
+
+import json
+import os
+import threading
+
+import click
+
+from click.shell_completion import CompletionItem, get_completion_class
+from pathlib import Path
+
+from stack import constants
+from stack.config.util import get_dev_root_path
+from stack.deploy.stack_index import stacks_beneath
+from stack.log import log_debug
+
+CACHE_FILE_NAME = "completion.json"
+CACHE_VERSION = 1
+# The options whose values are the names of stacks.
+STACK_OPTIONS = {"--stack"}
+SHELLS = ["bash", "zsh", "fish"]
+
+
+def completion_var(prog_name):
+    return f"_{prog_name}_COMPLETE".replace("-", "_").replace(".", "_").upper()
+
+
+def completion_script(cli, shell, prog_name="stack"):
+    """The script that hooks `prog_name` into the shell's completion."""
+    comp_cls = get_completion_class(shell)
+    return comp_cls(cli, {}, prog_name, completion_var(prog_name)).source()
+
+
+def _value_type(param):
+    if param.name == "stack" or STACK_OPTIONS.intersection(getattr(param, "opts", [])):
+        return "stack"
+    if isinstance(param.type, click.Path):
+        return "dir" if param.type.dir_okay and not param.type.file_okay else "file"
+    if isinstance(param.type, click.File):
+        return "file"
+    return None
+
+
+def _dump(cmd, ctx):
+    node = {
+        "help": cmd.get_short_help_str(),
+        "hidden": cmd.hidden,
+        "options": [],
+        "arguments": [],
+        "subcommands": {},
+    }
+    for param in cmd.get_params(ctx):
+        if isinstance(param, click.Option):
+            node["options"].append({
+                "opts": list(param.opts) + list(param.secondary_opts),
+                "help": param.help or "",
+                "hidden": param.hidden,
+                "takes_value": not param.is_flag and not param.count,
+                "choices": [str(c) for c in param.type.choices] if isinstance(param.type, click.Choice) else None,
+                "type": _value_type(param),
+            })
+        elif isinstance(param, click.Argument):
+            node["arguments"].append({"type": _value_type(param)})
+    if isinstance(cmd, click.Group):
+        for name in cmd.list_commands(ctx):
+            sub = cmd.get_command(ctx, name)
+            if sub is not None:
+                node["subcommands"][name] = _dump(sub, click.Context(sub, parent=ctx, info_name=name))
+    return node
+
+
+def command_tree(cli):
+    """The whole command tree as plain data, importing every command to get it."""
+    return _dump(cli, click.Context(cli, info_name="stack", **cli.context_settings))
+
+
+def _package_stamp():
+    # Every module of stack itself: an upgrade, or an edit to a development checkout,
+    # can change the commands.
+    count, latest = 0, 0
+    for directory, _, files in os.walk(Path(__file__).parent.parent):
+        for name in files:
+            if name.endswith(".py"):
+                count += 1
+                latest = max(latest, os.stat(os.path.join(directory, name)).st_mtime_ns)
+    return [count, latest]
+
+
+def _fingerprint(entries):
+    plugins = []
+    for entry in entries:
+        for file_name in entry.subcommand_files:
+            path = entry.file_path.parent.joinpath("subcommands", file_name)
+            try:
+                plugins.append([str(path), os.stat(path).st_mtime_ns])
+            except OSError:
+                pass
+    return {"version": CACHE_VERSION, "package": _package_stamp(), "plugins": plugins,
+            "builtin": os.environ.get("STACK_USE_BUILTIN_STACK", "false")}
+
+
+def _cache_file_path():
+    return get_dev_root_path().joinpath(constants.cache_dir_name, CACHE_FILE_NAME)
+
+
+def cached_command_tree(cli, entries):
+    """The command tree from the cache file, dumped afresh (and saved) if it is out of date."""
+    fingerprint = _fingerprint(entries)
+    cache_file = _cache_file_path()
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached.get("fingerprint") == fingerprint:
+            return cached["tree"]
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+    log_debug("Dumping the command tree for completion")
+    tree = command_tree(cli)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so that concurrent completions never see a torn file.
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp_file.write_text(json.dumps({"fingerprint": fingerprint, "tree": tree}))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        log_debug(f"Unable to write completion cache {cache_file}: {e}")
+    return tree
+
+
+def _find_option(node, token):
+    for option in node["options"]:
+        if token in option["opts"]:
+            return option
+    return None
+
+
+def _complete_value(value_type, choices, incomplete, entries):
+    if choices is not None:
+        return [CompletionItem(c) for c in choices if c.startswith(incomplete)]
+    if value_type == "stack":
+        names = sorted({entry.name for entry in entries if entry.name})
+        return [CompletionItem(n) for n in names if n.startswith(incomplete)]
+    if value_type in ["file", "dir"]:
+        # Left to the shell, which knows the filesystem better than we could say.
+        return [CompletionItem(incomplete, type=value_type)]
+    return []
+
+
+def completions(tree, args, incomplete, entries):
+    """The CompletionItems for `incomplete`, following `args` through the tree."""
+    node = tree
+    expecting = None
+    positional = 0
+    options_done = False
+    for token in args:
+        if expecting is not None:
+            expecting = None
+        elif token == "--":
+            options_done = True
+        elif token.startswith("-") and not options_done:
+            option = _find_option(node, token.split("=", 1)[0])
+            if option and option["takes_value"] and "=" not in token:
+                expecting = option
+        elif token in node["subcommands"]:
+            node = node["subcommands"][token]
+            positional = 0
+        else:
+            positional += 1
+
+    if expecting is not None:
+        return _complete_value(expecting["type"], expecting["choices"], incomplete, entries)
+    if incomplete.startswith("-") and not options_done:
+        if "=" in incomplete:
+            name, value = incomplete.split("=", 1)
+            option = _find_option(node, name)
+            if not option or not option["takes_value"]:
+                return []
+            return [CompletionItem(f"{name}={item.value}", type=item.type)
+                    for item in _complete_value(option["type"], option["choices"], value, entries)]
+        items = []
+        for option in node["options"]:
+            if not option["hidden"]:
+                items.extend(CompletionItem(o, help=option["help"]) for o in option["opts"] if o.startswith(incomplete))
+        return items
+    if node["subcommands"]:
+        return [CompletionItem(name, help=sub["help"]) for name, sub in node["subcommands"].items()
+                if not sub["hidden"] and name.startswith(incomplete)]
+    if positional < len(node["arguments"]):
+        return _complete_value(node["arguments"][positional]["type"], None, incomplete, entries)
+    return []
+
+
+def shell_complete(cli, prog_name, complete_var, instruction):
+    """click's shell_complete(), answering from the cached tree; returns the exit status."""
+    shell, _, instruction = instruction.partition("_")
+    comp_cls = get_completion_class(shell)
+    if comp_cls is None:
+        return 1
+    comp = comp_cls(cli, {}, prog_name, complete_var)
+    if instruction == "source":
+        click.echo(comp.source().encode(), nl=False)
+        return 0
+    if instruction != "complete":
+        return 1
+    args, incomplete = comp.get_completion_args()
+    entries = stacks_beneath(get_dev_root_path())
+    tree = cached_command_tree(cli, entries)
+    out = [comp.format_completion(item) for item in completions(tree, args, incomplete, entries)]
+    # Bytes, so that line endings reach the shell untranslated.
+    click.echo("\n".join(out).encode())
+    return 0
@@ -13,7 +13,9 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
+import copy
 import os
+import threading
 import stack.util
 
 from pathlib import Path
@@ -21,6 +23,10 @@ from pathlib import Path
 
 _DEFAULTS = {"repo-base-dir": "~/.config/stack/repos"}
 
+# The parsed config profile, shared by every lookup in the process: (path, stamp, settings).
+_snapshot_lock = threading.Lock()
+_snapshot = None
+
 
 def get_config_dir():
     return Path(os.path.expanduser("~/.config/stack"))
@@ -39,13 +45,56 @@ def get_config():
     return {}
 
 
+def _flatten(config, prefix="", settings=None):
+    # Every key reachable by a dotted lookup, nested sections included, mapped to its value.
+    settings = {} if settings is None else settings
+    for key, value in config.items():
+        # A key with a dot in it can never be looked up: the dot means a nested section.
+        if not isinstance(key, str) or "." in key:
+            continue
+        settings[prefix + key] = value
+        if isinstance(value, dict):
+            _flatten(value, f"{prefix}{key}.", settings)
+    return settings
+
+
+def _config_snapshot():
+    """The settings of the current profile, parsed once and shared until the file changes.
+
+    Option defaults across the CLI read settings at import time, and some helpers read
+    them in loops; each lookup used to parse the profile again.  The snapshot is keyed
+    by the profile's path, so switching profiles (or HOME) reads the new one, and by the
+    file's mtime and size, so that a change made by another process is seen too."""
+    global _snapshot
+    config_path = get_config_file_path()
+    try:
+        st = os.stat(config_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != config_path or _snapshot[1] != stamp:
+            config = stack.util.read_yaml_file(config_path) if stamp else None
+            _snapshot = (config_path, stamp, _flatten(config if isinstance(config, dict) else {}))
+        return _snapshot[2]
+
+
+def invalidate_config():
+    """Forget the parsed profile, so that the next lookup reads it again."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
 def save_config(config):
     config_path = get_config_file_path()
     if not config_path.parent.exists():
         config_path.parent.mkdir(parents=True)
 
     yaml = stack.util.get_yaml()
-    yaml.dump(config, open(config_path, "w+"))
+    with open(config_path, "w+") as f:
+        yaml.dump(config, f)
+    invalidate_config()
 
 
 def get_config_setting(key, default=None):
@@ -88,22 +137,9 @@ def _get_from_env(key):
 
 
 def _get_from_file(key):
-    config = get_config()
-
-    parts = key.split(".")
-    if len(parts) == 1:
-        return config.get(key, None)
-
-    for i in range(len(parts)):
-        part = parts[i]
-        if i == len(parts) - 1:
-            return config.get(part, None)
-        else:
-            config = config.get(part, {})
-            if stack.util.is_primitive(config):
-                return None
-
-    return None
+    value = _config_snapshot().get(key, None)
+    # Sections are shared by every lookup: hand out a copy the caller is free to change.
+    return value if stack.util.is_primitive(value) else copy.deepcopy(value)
 
 
 def get_dev_root_path():
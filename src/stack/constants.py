@@ -83,6 +83,14 @@ stack_key = "stack"
 stacks_key = "stacks"
 volumes_key = "volumes"
 
+# Beneath the repo base dir: stack's caches (image identities, the stack index, git
+# mirrors, completions), none of which is a repo.
+cache_dir_name = ".stack-cache"
+# A file modified this recently might be modified again within the same timestamp tick,
+# unseen; git calls such entries "racily clean" and re-checks them.  Caches keyed on a
+# file's stat() do not trust one this young.
+racy_window_ns = 2 * 1000 * 1000 * 1000
+
 stack_annotation_marker = "@stack"
 # On an image: line, opts that external image out of digest locking (see docs/stack-integrity.md).
 unpinned_annotation = "unpinned"
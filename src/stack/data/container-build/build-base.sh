@@ -11,3 +11,34 @@ fi
 if [[ -n "$STACK_CONTAINER_EXTRA_BUILD_ARGS" ]]; then
     build_command_args="${build_command_args} ${STACK_CONTAINER_EXTRA_BUILD_ARGS}"
 fi
+if [[ -n "$STACK_BUILD_CACHE_REF" ]]; then
+    if docker --version 2>/dev/null | grep -qi podman; then
+        # podman caches layers in a repository of its own, and has no local cache export.
+        if [[ -n "$STACK_BUILD_CACHE_REPO" ]]; then
+            build_command_args="${build_command_args} --layers --cache-from ${STACK_BUILD_CACHE_REPO}"
+            if [[ -n "$STACK_BUILD_CACHE_TO" ]]; then
+                build_command_args="${build_command_args} --cache-to ${STACK_BUILD_CACHE_REPO}"
+            fi
+        fi
+    else
+        if [[ -n "$STACK_BUILD_CACHE_FROM" ]]; then
+            build_command_args="${build_command_args} --cache-from ${STACK_BUILD_CACHE_FROM}"
+        fi
+        if [[ -n "$STACK_BUILD_CACHE_TO" ]]; then
+            build_command_args="${build_command_args} --cache-to ${STACK_BUILD_CACHE_TO}"
+        fi
+        if [[ -n "$STACK_BUILD_CACHE_FROM" || -n "$STACK_BUILD_CACHE_TO" ]]; then
+            # A docker-container builder, the usual one for cache export, leaves the image in
+            # its own store unless told to load it into docker's; to the default builder this is a no-op.
+            build_command_args="${build_command_args} --load"
+        fi
+    fi
+fi
+if [[ -n "$STACK_BUILD_PLATFORMS" ]]; then
+    if docker --version 2>/dev/null | grep -qi podman; then
+        echo "Building for several platforms (--platforms) is not supported with podman" >&2
+        exit 1
+    fi
+    # One build for every platform, which BuildKit runs concurrently into a single multi-platform image.
+    build_command_args="${build_command_args} --platform ${STACK_BUILD_PLATFORMS}"
+fi
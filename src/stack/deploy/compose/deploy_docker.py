@@ -23,9 +23,9 @@ from stack.deploy import secrets as stack_secrets
 from stack.deploy.backup import backup_settings
 from stack.deploy.deployer import Deployer, DeployerException, DeployerConfigGenerator
 from stack.deploy.deployment_context import DeploymentContext
-from stack.log import output_main, log_info
+from stack.log import output_main, log_info, log_warn
 from stack.opts import opts
-from stack.util import get_yaml, error_exit
+from stack.util import error_exit, read_yaml_file
 
 
 def _local_image_id(tag):
@@ -70,7 +70,7 @@ class DockerDeployer(Deployer):
         (see docs/developing-applications.md).
         """
         for compose_file in self.compose_files:
-            parsed_file = get_yaml().load(open(compose_file, "r"))
+            parsed_file = read_yaml_file(compose_file)
             for svc_name in parsed_file.get("services", {}):
                 image = parsed_file["services"][svc_name].get("image")
                 if not image or not image.endswith(self.deployment_context.id):
@@ -102,12 +102,14 @@ class DockerDeployer(Deployer):
         for name, value in stack_secrets.resolve_referenced_secrets(spec).items():
             os.environ[stack_secrets.shell_var(name)] = value
 
-    def up(self, detach, skip_cluster_management, services):
+    def up(self, detach, skip_cluster_management, services, wait=None):
         if not opts.o.dry_run:
             self._stage_local_images()
             self._export_referenced_secrets()
             try:
-                return self.docker.compose.up(detach=detach, services=services)
+                # compose's own --wait: running, and healthy where there is a
+                # healthcheck.  It has no timeout for us to pass on.
+                return self.docker.compose.up(detach=detach, services=services, wait=wait is not None)
             except DockerException as e:
                 raise DeployerException(e)
 
@@ -209,10 +211,13 @@ class DockerDeployer(Deployer):
             except DockerException as e:
                 raise DeployerException(e)
 
-    def logs(self, services, tail, follow, stream):
+    def logs(self, services, tail, follow, stream, since=None, timestamps=False, max_bytes=None):
         if not opts.o.dry_run:
+            if max_bytes is not None:
+                log_warn("WARN: --max-bytes is not supported by compose; showing the whole log")
             try:
-                return self.docker.compose.logs(services=services, tail=tail, follow=follow, stream=stream)
+                return self.docker.compose.logs(services=services, tail=tail, follow=follow, stream=stream,
+                                                since=since, timestamps=timestamps)
             except DockerException as e:
                 raise DeployerException(e)
 
@@ -13,11 +13,8 @@
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
 
-from ruamel.yaml import CommentedSeq
-
-
 def add_env_var(key, value, target):
-    if isinstance(target, CommentedSeq):
+    if isinstance(target, list):
         target.append(f'{key}="{value}"')
     else:
         target[key] = str(value)
@@ -59,7 +59,7 @@ def create_deploy_context(
     return DeployCommandContext(stack, cluster_context, deployer)
 
 
-def up_operation(ctx, services_list, stay_attached=False, skip_cluster_management=False):
+def up_operation(ctx, services_list, stay_attached=False, skip_cluster_management=False, wait=None):
     global_context = ctx.parent.parent.obj
     deployment_cmd_context = ctx.obj
     cluster_context = deployment_cmd_context.cluster_context
@@ -74,6 +74,7 @@ def up_operation(ctx, services_list, stay_attached=False, skip_cluster_managemen
         detach=not stay_attached,
         skip_cluster_management=skip_cluster_management,
         services=services_list,
+        wait=wait,
     )
     for post_start_command in cluster_context.post_start_commands:
         _run_command(global_context, deployment_cmd_context, cluster_context, post_start_command)
@@ -258,15 +259,17 @@ def backup_restore_operation(ctx, snapshot: str, volumes, source: str = None):
             error_exit(f"restore failed: {e}")
 
 
-def logs_operation(ctx, tail: int, follow: bool, extra_args: str):
+def logs_operation(ctx, tail: int, follow: bool, extra_args: str, since=None, timestamps=False, max_bytes=None):
     extra_args_list = list(extra_args) or None
     services_list = extra_args_list if extra_args_list is not None else []
     try:
-        logs_stream = ctx.obj.deployer.logs(services=services_list, tail=tail, follow=follow, stream=True)
+        logs_stream = ctx.obj.deployer.logs(services=services_list, tail=tail, follow=follow, stream=True,
+                                            since=since, timestamps=timestamps, max_bytes=max_bytes)
     except ClusterNotRunningException:
         error_exit("the deployment is not running")
     for stream_type, stream_content in logs_stream:
-        output_main(stream_content.decode("utf-8"), end="")
+        # A line cut at the length limit may end part way through a character.
+        output_main(stream_content.decode("utf-8", errors="replace"), end="")
 
 
 def _make_runtime_env(ctx):
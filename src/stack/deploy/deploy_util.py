@@ -21,8 +21,8 @@ from stack.deploy.deploy_types import DeployCommandContext, VolumeMapping
 from stack.deploy.stack import get_parsed_stack_config
 from stack.log import log_debug
 from stack.util import (
-    get_yaml,
     get_pod_list,
+    read_yaml_file,
     resolve_compose_file,
 )
 
@@ -56,10 +56,9 @@ def _container_image_from_service(stack: str, service: str):
     image_name = None
     parsed_stack = get_parsed_stack_config(stack)
     pods = get_pod_list(parsed_stack)
-    yaml = get_yaml()
     for pod in pods:
         pod_file_path = resolve_compose_file(stack, pod)
-        parsed_pod_file = yaml.load(open(pod_file_path, "r"))
+        parsed_pod_file = read_yaml_file(pod_file_path)
         if "services" in parsed_pod_file:
             services = parsed_pod_file["services"]
             if service in services:
@@ -72,9 +71,7 @@ def _container_image_from_service(stack: str, service: str):
 def parsed_pod_files_map_from_file_names(pod_files):
     parsed_pod_yaml_map: Any = {}
     for pod_file in pod_files:
-        with open(pod_file, "r") as pod_file_descriptor:
-            parsed_pod_file = get_yaml().load(pod_file_descriptor)
-            parsed_pod_yaml_map[pod_file] = parsed_pod_file
+        parsed_pod_yaml_map[pod_file] = read_yaml_file(pod_file)
     log_debug(f"parsed_pod_yaml_map: {parsed_pod_yaml_map}")
     return parsed_pod_yaml_map
 
@@ -19,7 +19,12 @@ from pathlib import Path
 
 class Deployer(ABC):
     @abstractmethod
-    def up(self, detach, skip_cluster_management, services):
+    def up(self, detach, skip_cluster_management, services, wait=None):
+        """Start the deployment.
+
+        With wait, a number of seconds, return only once every service is
+        available, failing if it is not by then or is stuck on the way.
+        """
         pass
 
     @abstractmethod
@@ -63,7 +68,12 @@ class Deployer(ABC):
         pass
 
     @abstractmethod
-    def logs(self, services, tail, follow, stream):
+    def logs(self, services, tail, follow, stream, since=None, timestamps=False, max_bytes=None):
+        """The services' logs, as (stream type, bytes) chunks.
+
+        since is a duration (10m) or a time; max_bytes caps each container's log,
+        where the target can.
+        """
         pass
 
     # Backup operations.  The engine differs by target -- restic in the mixed-in
@@ -46,7 +46,7 @@ from stack.deploy.deployment_context import DeploymentContext
 from stack.deploy.backup import backup_settings
 from stack.deploy.explain import explain_op
 from stack.log import output_main
-from stack.util import error_exit, get_yaml
+from stack.util import error_exit, read_yaml_file
 
 
 @click.group()
@@ -117,13 +117,17 @@ def explain(ctx):
     default=False,
     help="Skip cluster initialization/tear-down (only for kind-k8s deployments)",
 )
+@click.option("--wait", is_flag=True, default=False, help="return once every service is available, reporting progress")
+@click.option("--wait-timeout", type=int, default=600, show_default=True, help="seconds to --wait before failing (k8s)")
 @click.argument("extra_args", nargs=-1)  # help: command: start <service1> <service2>
 @click.pass_context
-def start(ctx, stay_attached, skip_cluster_management, extra_args):
+def start(ctx, stay_attached, skip_cluster_management, wait, wait_timeout, extra_args):
     """start the deployment"""
+    if wait and stay_attached:
+        error_exit("Error: --wait cannot be combined with --stay-attached")
     ctx.obj = make_deploy_context(ctx)
     services_list = list(extra_args) or None
-    up_operation(ctx, services_list, stay_attached, skip_cluster_management)
+    up_operation(ctx, services_list, stay_attached, skip_cluster_management, wait_timeout if wait else None)
 
 
 @command.command()
@@ -235,12 +239,15 @@ def exec(ctx, extra_args):
 @command.command()
 @click.option("--tail", "-n", default=None, help="number of lines to display")
 @click.option("--follow", "-f", is_flag=True, default=False, help="follow log output")
+@click.option("--since", default=None, help="only logs newer than a duration (10m, 1h30m) or a time")
+@click.option("--timestamps", "-t", is_flag=True, default=False, help="show timestamps")
+@click.option("--max-bytes", type=int, default=None, help="at most this many bytes of each container's log (k8s)")
 @click.argument("extra_args", nargs=-1)  # help: command: logs <service1> <service2>
 @click.pass_context
-def logs(ctx, tail, follow, extra_args):
+def logs(ctx, tail, follow, since, timestamps, max_bytes, extra_args):
     """get logs for running containers"""
     ctx.obj = make_deploy_context(ctx)
-    logs_operation(ctx, tail, follow, extra_args)
+    logs_operation(ctx, tail, follow, extra_args, since, timestamps, max_bytes)
 
 
 @command.command()
@@ -355,6 +362,6 @@ def services(ctx):
     deployment_context: DeploymentContext = ctx.obj
     services = set()
     for compose_file in deployment_context.get_compose_files():
-        parsed_pod_file = get_yaml().load(open(compose_file, "rt")) or {}
+        parsed_pod_file = read_yaml_file(compose_file) or {}
         services.update(parsed_pod_file.get(constants.services_key, {}).keys())
     output_main("\n".join(sorted(services)))
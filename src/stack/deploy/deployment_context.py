@@ -18,7 +18,7 @@ import glob
 from pathlib import Path
 
 from stack import constants
-from stack.util import get_yaml, error_exit
+from stack.util import error_exit, read_yaml_file
 from stack.deploy.spec import Spec
 
 
@@ -52,7 +52,7 @@ class DeploymentContext:
         deployment_file_path = self.get_deployment_file()
         if deployment_file_path.exists():
             with deployment_file_path:
-                obj = get_yaml().load(open(deployment_file_path, "r"))
+                obj = read_yaml_file(deployment_file_path)
                 self.id = obj[constants.cluster_id_key]
         else:
             error_exit(f"Missing {deployment_file_path}")
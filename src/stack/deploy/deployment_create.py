@@ -23,7 +23,7 @@ import re
 from importlib import util
 from pathlib import Path
 from secrets import token_hex
-from shutil import copy, copyfile, copytree
+from shutil import copy, copyfile, copytree, rmtree
 from typing import List
 
 from stack import constants
@@ -37,10 +37,12 @@ from stack.util import (
     get_yaml,
     error_exit,
     env_var_map_from_file,
+    read_yaml_file,
     resolve_config_dir,
 )
 from stack.deploy.deploy import create_deploy_context
 from stack.deploy.kube_config import is_deferred_reference, validate_reference
+from stack.deploy import deployment_update
 from stack.deploy import secrets as stack_secrets
 from stack.deploy.spec import Spec, MergedSpec, load_spec
 from stack.deploy.stack import Stack, get_plugin_code_paths, get_pod_script_paths, pod_has_scripts
@@ -599,8 +601,14 @@ def _check_runtime_class(spec):
 @click.option("--cluster", help="specify a non-default cluster name")
 @click.option("--spec-file", required=True, help="Spec file to use to create this deployment", multiple=True)
 @click.option("--deployment-dir", help="Create deployment files in this directory")
+@click.option(
+    "--update",
+    is_flag=True,
+    default=False,
+    help="Regenerate an existing deployment directory, rewriting only the files that changed",
+)
 @click.pass_context
-def create(ctx, cluster, spec_file, deployment_dir):
+def create(ctx, cluster, spec_file, deployment_dir, update):
     """deploy a stack"""
 
     ctx.obj = create_deploy_context(
@@ -628,12 +636,13 @@ def create(ctx, cluster, spec_file, deployment_dir):
         deployment_command_context,
         spec,
         deployment_dir,
+        update=update,
     )
 
 
 # The init command's implementation is in a separate function so that we can
 # call it from other commands, bypassing the click decoration stuff
-def create_operation(deployment_command_context, parsed_spec: Spec | MergedSpec, deployment_dir):  # noqa: C901
+def create_operation(deployment_command_context, parsed_spec: Spec | MergedSpec, deployment_dir, update=False):
     log_debug(f"parsed spec: {parsed_spec}")
     _check_volume_definitions(parsed_spec)
     _check_runtime_class(parsed_spec)
@@ -641,17 +650,45 @@ def create_operation(deployment_command_context, parsed_spec: Spec | MergedSpec,
     # Validated here as well as at init, since a spec file is edited by hand.
     stack_secrets.validate_spec_secrets(parsed_spec)
 
-    deployment_type = parsed_spec[constants.deploy_to_key]
-
     # steps that we need no matter the spec type
     if deployment_dir is None:
         deployment_dir_path = _make_default_deployment_dir()
     else:
         deployment_dir_path = Path(deployment_dir)
+    if update:
+        return _update_operation(deployment_command_context, parsed_spec, deployment_dir_path)
     if deployment_dir_path.exists():
         error_exit(f"{deployment_dir_path} already exists")
 
     os.mkdir(deployment_dir_path)
+    _generate_deployment(deployment_command_context, parsed_spec, deployment_dir_path)
+    deployment_update.record_generated_files(deployment_dir_path, parsed_spec)
+
+
+def _update_operation(deployment_command_context, parsed_spec: Spec | MergedSpec, deployment_dir_path: Path):
+    """Regenerate an existing deployment beside it, then bring across only what changed."""
+    deployment_file = deployment_dir_path.joinpath(constants.deployment_file_name)
+    if not deployment_file.exists():
+        error_exit(f"{deployment_dir_path} is not a deployment directory")
+    cluster = (read_yaml_file(deployment_file) or {}).get(constants.cluster_id_key)
+    requested_cluster = deployment_command_context.cluster_context.cluster
+    if requested_cluster and requested_cluster != cluster:
+        error_exit(f"{deployment_dir_path} is deployment {cluster}, not {requested_cluster}")
+    deployment_command_context.cluster_context.cluster = cluster
+
+    staging_dir = deployment_update.make_staging_dir(deployment_dir_path)
+    try:
+        _generate_deployment(deployment_command_context, parsed_spec, staging_dir)
+        changes = deployment_update.apply_generated_files(staging_dir, deployment_dir_path, parsed_spec)
+    finally:
+        rmtree(staging_dir, ignore_errors=True)
+
+    deployment_update.report_changes(changes, deployment_dir_path)
+    return changes
+
+
+def _generate_deployment(deployment_command_context, parsed_spec: Spec | MergedSpec, deployment_dir_path: Path):  # noqa: C901
+    deployment_type = parsed_spec[constants.deploy_to_key]
     destination_compose_dir = deployment_dir_path.joinpath("compose")
     os.mkdir(destination_compose_dir)
     # pods/<pod>/scripts/ holds a pod's pre/post-start hook scripts, and is created
@@ -0,0 +1,218 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""`stack deploy --update`: regenerate a deployment directory, rewriting only what changed.
+
+The deployment is generated afresh into a staging directory beside the existing one,
+by the same code that creates a deployment.  Every staged file is then compared with
+its counterpart, by content hash and execute bit.  Only the files that are new or
+different are copied in, and only the files the last generation wrote that this one
+no longer does are removed.  The rest of the directory is left exactly as it was:
+unchanged files keep their mtimes, and the running deployment's own state is never
+touched.  That state is the volume data, the `destroyed` marker, and anything else
+stack did not generate.
+
+Generated secrets are create-or-keep, so the existing secrets.env is copied into the
+staging directory before generating; new secrets are minted into it and the old ones
+keep their values.  Generated files that embed the deployment's absolute path (the
+kind config's host mounts) name the staging directory when generated; that path is
+rewritten to the deployment's own before comparing.
+
+Which files the last generation wrote is recorded, with their hashes, in
+.generated-files.json.  A deployment created before that record existed has nothing
+removed outside compose/, pods/, config/ and configmaps/.  A generated file edited by
+hand since it was generated is reported when it is overwritten.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from pathlib import Path
+
+from stack import constants
+from stack.log import log_debug, log_info, log_warn, output_main
+
+MANIFEST_FILE_NAME = ".generated-files.json"
+# Kept from the existing deployment: values minted once, and a file they are added to.
+PRESERVED_FILE_NAMES = [constants.secrets_file_name, ".gitignore"]
+# Wholly generated: in a deployment with no manifest, what may be removed.
+GENERATED_DIR_NAMES = ["compose", "pods", "config", "configmaps"]
+
+
+def make_staging_dir(deployment_dir: Path) -> Path:
+    """A new directory beside deployment_dir, holding the files a regeneration must keep."""
+    deployment_dir = deployment_dir.absolute()
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{deployment_dir.name}.update-", dir=deployment_dir.parent))
+    for name in PRESERVED_FILE_NAMES:
+        if deployment_dir.joinpath(name).exists():
+            shutil.copy2(deployment_dir.joinpath(name), staging_dir.joinpath(name))
+    return staging_dir
+
+
+def _volume_dirs(spec):
+    # Relative volume paths are the deployment's data, beneath its directory.
+    dirs = []
+    for path in spec.get_volumes().values():
+        if path and not os.path.isabs(path):
+            dirs.append(os.path.normpath(path))
+    return dirs
+
+
+def _is_beneath(rel_path, dirs):
+    return any(rel_path == d or rel_path.startswith(d + os.sep) for d in dirs)
+
+
+def _digest(path: Path):
+    m = hashlib.sha256(path.read_bytes())
+    if os.access(path, os.X_OK):
+        m.update(b"\0x")
+    return m.hexdigest()
+
+
+def generated_file_hashes(root: Path, spec) -> dict:
+    """{path relative to root: digest} of the generated files beneath root."""
+    excluded = _volume_dirs(spec)
+    hashes = {}
+    for directory, dirs, files in os.walk(root):
+        rel_dir = os.path.relpath(directory, root)
+        if rel_dir != "." and _is_beneath(os.path.normpath(rel_dir), excluded):
+            dirs[:] = []
+            continue
+        for name in files:
+            rel_path = os.path.normpath(os.path.join(rel_dir, name))
+            if rel_path in PRESERVED_FILE_NAMES or rel_path == MANIFEST_FILE_NAME or _is_beneath(rel_path, excluded):
+                continue
+            hashes[rel_path] = _digest(Path(directory, name))
+    return hashes
+
+
+def _read_manifest(deployment_dir: Path):
+    try:
+        return json.loads(deployment_dir.joinpath(MANIFEST_FILE_NAME).read_text()).get("files")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_manifest(deployment_dir: Path, hashes: dict):
+    manifest = deployment_dir.joinpath(MANIFEST_FILE_NAME)
+    tmp_file = manifest.with_name(f"{manifest.name}.{os.getpid()}")
+    tmp_file.write_text(json.dumps({"files": dict(sorted(hashes.items()))}, indent=2) + "\n")
+    os.replace(tmp_file, manifest)
+
+
+def record_generated_files(deployment_dir: Path, spec):
+    """Record what a new deployment's generation wrote, for a later --update to compare with."""
+    _write_manifest(deployment_dir, generated_file_hashes(deployment_dir, spec))
+
+
+def _relocate(staging_dir: Path, deployment_dir: Path):
+    # A generated file that names the staging directory means the deployment's own.
+    replacements = []
+    for staged, final in [(staging_dir.absolute(), deployment_dir.absolute()),
+                          (staging_dir.resolve(), deployment_dir.absolute().parent.resolve().joinpath(deployment_dir.name))]:
+        pair = (str(staged).encode(), str(final).encode())
+        if pair not in replacements:
+            replacements.append(pair)
+    for directory, _, files in os.walk(staging_dir):
+        for name in files:
+            path = Path(directory, name)
+            if path.is_symlink():
+                continue
+            content = path.read_bytes()
+            relocated = content
+            for staged, final in replacements:
+                relocated = relocated.replace(staged, final)
+            if relocated != content:
+                path.write_bytes(relocated)
+
+
+def _copy_in(source: Path, target: Path):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}")
+    shutil.copy2(source, tmp_file)
+    os.replace(tmp_file, target)
+
+
+def _remove(deployment_dir: Path, rel_path):
+    path = deployment_dir.joinpath(rel_path)
+    path.unlink(missing_ok=True)
+    # And any directory that leaves empty, up to the deployment's own.
+    parent = path.parent
+    while parent != deployment_dir and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def apply_generated_files(staging_dir: Path, deployment_dir: Path, spec) -> dict:
+    """Bring the regeneration in staging_dir across to deployment_dir; return what changed.
+
+    The result maps "added", "changed" and "removed" to sorted relative paths."""
+    _relocate(staging_dir, deployment_dir)
+    staged = generated_file_hashes(staging_dir, spec)
+    current = generated_file_hashes(deployment_dir, spec)
+    manifest = _read_manifest(deployment_dir)
+
+    changes = {"added": [], "changed": [], "removed": []}
+    for rel_path, digest in sorted(staged.items()):
+        if rel_path not in current:
+            changes["added"].append(rel_path)
+        elif current[rel_path] != digest:
+            if manifest is not None and rel_path in manifest and manifest[rel_path] != current[rel_path]:
+                log_warn(f"WARN: {rel_path} was edited after it was generated; the edit is overwritten")
+            changes["changed"].append(rel_path)
+        else:
+            continue
+        _copy_in(staging_dir.joinpath(rel_path), deployment_dir.joinpath(rel_path))
+
+    if manifest is not None:
+        previously_generated = manifest.keys()
+    else:
+        previously_generated = [p for p in current if p.split(os.sep, 1)[0] in GENERATED_DIR_NAMES]
+    for rel_path in sorted(set(previously_generated) - staged.keys()):
+        if rel_path in current:
+            changes["removed"].append(rel_path)
+            _remove(deployment_dir, rel_path)
+
+    # New secrets are minted into the staged copy of secrets.env.
+    for name in PRESERVED_FILE_NAMES:
+        staged_file, current_file = staging_dir.joinpath(name), deployment_dir.joinpath(name)
+        if staged_file.exists() and (not current_file.exists() or staged_file.read_bytes() != current_file.read_bytes()):
+            changes["changed" if current_file.exists() else "added"].append(name)
+            _copy_in(staged_file, current_file)
+
+    # A volume the spec has gained gets its directory, seeded as a new deployment's would be.
+    for rel_dir in _volume_dirs(spec):
+        if staging_dir.joinpath(rel_dir).is_dir() and not deployment_dir.joinpath(rel_dir).exists():
+            log_debug(f"Adding volume directory {rel_dir}")
+            deployment_dir.joinpath(rel_dir).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copytree(staging_dir.joinpath(rel_dir), deployment_dir.joinpath(rel_dir))
+            changes["added"].append(rel_dir + os.sep)
+
+    if manifest != staged:
+        _write_manifest(deployment_dir, staged)
+    return {kind: sorted(paths) for kind, paths in changes.items()}
+
+
+def report_changes(changes: dict, deployment_dir: Path):
+    if not any(changes.values()):
+        output_main("No changes")
+        return
+    for kind in ["added", "changed", "removed"]:
+        for rel_path in changes[kind]:
+            output_main(f"{kind}: {rel_path}")
+    log_info(f"Run 'stack manage --dir {deployment_dir} update' to apply the changes to the running deployment.")
@@ -0,0 +1,64 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Server-side apply of the objects stack generates, under its own field manager.
+
+With the `k8s-server-side-apply` setting on, start and update send each object's
+desired state, as ClusterInfo builds it, in one PATCH of type apply-patch.  The API
+server merges it with what is live, so the same call creates an object or brings an
+existing one up to date.  A start after a partly failed start is then not an error,
+and an update needs no read-modify-write cycle and so meets no 409.
+
+The fields stack sets are owned by the `stack` field manager.  Applies are forced:
+stack's deployment directory is the source of truth for those fields, so a field
+another manager has since changed (a hand-run `kubectl edit`, say) is taken back
+rather than reported as a conflict.  Fields stack does not set are left to whoever
+set them.  A field stack set in an earlier apply and no longer sets is removed.
+"""
+
+from stack.config.util import get_config_setting
+
+FIELD_MANAGER = "stack"
+APPLY_PATCH_CONTENT_TYPE = "application/apply-patch+yaml"
+
+# kind -> (apiVersion, patch method, namespaced)
+_KINDS = {
+    "Namespace": ("v1", "patch_namespace", False),
+    "ConfigMap": ("v1", "patch_namespaced_config_map", True),
+    "Service": ("v1", "patch_namespaced_service", True),
+    "Deployment": ("apps/v1", "patch_namespaced_deployment", True),
+    "Ingress": ("networking.k8s.io/v1", "patch_namespaced_ingress", True),
+}
+
+
+def server_side_apply_enabled():
+    return bool(get_config_setting("k8s-server-side-apply", False))
+
+
+def apply_object(api, kind, body, namespace=None):
+    """Apply body, a kubernetes client object of the given kind, through api; return the live object."""
+    api_version, method, namespaced = _KINDS[kind]
+    # An apply patch is a whole object, so it has to say what it is.
+    body.api_version = api_version
+    body.kind = kind
+    kwargs = {"namespace": namespace} if namespaced else {}
+    return getattr(api, method)(
+        name=body.metadata.name,
+        body=body,
+        field_manager=FIELD_MANAGER,
+        force=True,
+        _content_type=APPLY_PATCH_CONTENT_TYPE,
+        **kwargs,
+    )
@@ -15,18 +15,19 @@
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 import base64
 import sys
+import time
 
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from threading import Thread
 
 from kubernetes import client, config
 from kubernetes.config.config_exception import ConfigException
 from kubernetes.stream import stream
-from kubernetes import watch
 
 from stack import constants
-from stack.deploy.deployer import ClusterNotRunningException, Deployer, DeployerConfigGenerator
+from stack.config.util import get_config_setting
+from stack.deploy.deployer import ClusterNotRunningException, Deployer, DeployerConfigGenerator, DeployerException
 from stack.deploy.k8s.helpers import (
     create_cluster,
     destroy_cluster,
@@ -36,11 +37,14 @@ from stack.deploy.k8s.helpers import install_ingress_for_kind, wait_for_ingress_
 from stack.deploy.k8s.helpers import (
     live_pods,
     pods_in_deployment,
-    containers_in_pod,
+    containers_in_deployment,
     log_stream_from_string,
 )
 from stack.deploy.k8s.helpers import generate_kind_config
 from stack.deploy.k8s import gateway
+from stack.deploy.k8s.apply import apply_object, server_side_apply_enabled
+from stack.deploy.k8s.log_stream import log_sources, since_seconds, stream_logs
+from stack.deploy.k8s.rollout import wait_for_rollout
 from stack.deploy.k8s import k8up
 from stack.deploy.kube_config import kube_config_file
 from stack.deploy import secrets as stack_secrets
@@ -48,10 +52,18 @@ from stack.deploy.images import is_staged_reference, stale_staged_images
 from stack.deploy.backup import backup_settings
 from stack.deploy.k8s.cluster_info import ClusterInfo
 from stack.opts import opts
+from stack.scheduler import TaskScheduler
 from stack.deploy.deployment_context import DeploymentContext
 from stack.log import log_debug, log_warn, log_info, output_main
 from stack.util import error_exit
 
+# How many objects up() creates at once; see K8sDeployer._create_objects().
+DEFAULT_APPLY_JOBS = 8
+# How many of the slowest objects a start reports, with their round-trip times.
+SLOWEST_REPORTED = 3
+# Set on a Deployment's pod template to roll its pods, as `kubectl rollout restart` does.
+RESTARTED_AT_ANNOTATION = "kubectl.kubernetes.io/restartedAt"
+
 
 class AttrDict(dict):
     def __init__(self, *args, **kwargs):
@@ -273,54 +285,52 @@ class K8sDeployer(Deployer):
         self.apps_api = client.AppsV1Api()
         self.custom_obj_api = client.CustomObjectsApi()
 
-    def _create_volume_data(self):
-        # Create the host-path-mounted PVs for this deployment
-        pvs = self.cluster_info.get_pvs()
-        for pv in pvs:
-            log_debug(f"Sending this pv: {pv}")
-            if not opts.o.dry_run:
-                try:
-                    pv_resp = self.core_api.read_persistent_volume(name=pv.metadata.name)
-                    if pv_resp:
-                        log_debug("PVs already present:")
-                        log_debug(f"{pv_resp}")
-                        continue
-                except:  # noqa: E722
-                    pass
-
-                pv_resp = self.core_api.create_persistent_volume(body=pv)
-                log_debug("PVs created:")
+    def _create_pv(self, pv):
+        # The host-path-mounted PVs for this deployment
+        log_debug(f"Sending this pv: {pv}")
+        if opts.o.dry_run:
+            return
+        try:
+            pv_resp = self.core_api.read_persistent_volume(name=pv.metadata.name)
+            if pv_resp:
+                log_debug("PVs already present:")
                 log_debug(f"{pv_resp}")
+                return
+        except:  # noqa: E722
+            pass
 
-        # Figure out the PVCs for this deployment
-        pvcs = self.cluster_info.get_pvcs()
-        for pvc in pvcs:
-            log_debug(f"Sending this pvc: {pvc}")
+        pv_resp = self.core_api.create_persistent_volume(body=pv)
+        log_debug("PVs created:")
+        log_debug(f"{pv_resp}")
 
-            if not opts.o.dry_run:
-                try:
-                    pvc_resp = self.core_api.read_namespaced_persistent_volume_claim(
-                        name=pvc.metadata.name, namespace=self.k8s_namespace
-                    )
-                    if pvc_resp:
-                        log_debug("PVCs already present:")
-                        log_debug(f"{pvc_resp}")
-                        continue
-                except:  # noqa: E722
-                    pass
-
-                pvc_resp = self.core_api.create_namespaced_persistent_volume_claim(body=pvc, namespace=self.k8s_namespace)
-                log_debug("PVCs created:")
+    def _create_pvc(self, pvc):
+        log_debug(f"Sending this pvc: {pvc}")
+        if opts.o.dry_run:
+            return
+        try:
+            pvc_resp = self.core_api.read_namespaced_persistent_volume_claim(
+                name=pvc.metadata.name, namespace=self.k8s_namespace
+            )
+            if pvc_resp:
+                log_debug("PVCs already present:")
                 log_debug(f"{pvc_resp}")
+                return
+        except:  # noqa: E722
+            pass
 
-        # Figure out the ConfigMaps for this deployment
-        config_maps = self.cluster_info.get_configmaps()
-        for cfg_map in config_maps:
-            log_debug(f"Sending this ConfigMap: {cfg_map}")
-            if not opts.o.dry_run:
+        pvc_resp = self.core_api.create_namespaced_persistent_volume_claim(body=pvc, namespace=self.k8s_namespace)
+        log_debug("PVCs created:")
+        log_debug(f"{pvc_resp}")
+
+    def _create_config_map(self, cfg_map):
+        log_debug(f"Sending this ConfigMap: {cfg_map}")
+        if not opts.o.dry_run:
+            if server_side_apply_enabled():
+                cfg_rsp = apply_object(self.core_api, "ConfigMap", cfg_map, self.k8s_namespace)
+            else:
                 cfg_rsp = self.core_api.create_namespaced_config_map(body=cfg_map, namespace=self.k8s_namespace)
-                log_debug("ConfigMap created:")
-                log_debug(f"{cfg_rsp}")
+            log_debug("ConfigMap created:")
+            log_debug(f"{cfg_rsp}")
 
     def _backup_settings(self):
         """This deployment's backup settings, or None if backup is switched off.
@@ -401,27 +411,80 @@ class K8sDeployer(Deployer):
             log_debug(f"Secret {stack_secrets.K8S_SECRET_NAME} replaced")
         return True
 
-    def _create_deployments(self):
-        # Process compose files into a Deployment
-        deployments = self.cluster_info.get_deployments(image_pull_policy=None if self.is_kind() else "Always")
-        for deployment in deployments:
-            # Create the k8s objects
-            log_debug(f"Sending this deployment: {deployment}")
-            if not opts.o.dry_run:
+    def _create_deployment(self, deployment):
+        log_debug(f"Sending this deployment: {deployment}")
+        if not opts.o.dry_run:
+            if server_side_apply_enabled():
+                deployment_resp = apply_object(self.apps_api, "Deployment", deployment, self.k8s_namespace)
+            else:
                 deployment_resp = self.apps_api.create_namespaced_deployment(body=deployment, namespace=self.k8s_namespace)
-                log_debug("Deployment created:")
-                log_debug(
-                    f"{deployment_resp.metadata.namespace} {deployment_resp.metadata.name} \
-                    {deployment_resp.metadata.generation} {deployment_resp.spec.template.spec.containers[0].image}"
-                )
+            log_debug("Deployment created:")
+            log_debug(
+                f"{deployment_resp.metadata.namespace} {deployment_resp.metadata.name} \
+                {deployment_resp.metadata.generation} {deployment_resp.spec.template.spec.containers[0].image}"
+            )
 
-        services: client.V1Service = self.cluster_info.get_services()
-        log_debug(f"Sending these services: {services}")
+    def _create_service(self, svc):
+        log_debug(f"Sending this service: {svc}")
         if not opts.o.dry_run:
-            for svc in services:
+            if server_side_apply_enabled():
+                service_resp = apply_object(self.core_api, "Service", svc, self.k8s_namespace)
+            else:
                 service_resp = self.core_api.create_namespaced_service(namespace=self.k8s_namespace, body=svc)
-                log_debug("Service created:")
-                log_debug(f"{service_resp}")
+            log_debug("Service created:")
+            log_debug(f"{service_resp}")
+
+    def _create_objects(self):
+        """Create the deployment's objects in its namespace, independent ones concurrently.
+
+        Each object is one API round trip, and with many services against a distant API
+        server those add up when made one after another.  Here they are tasks on a
+        TaskScheduler of `k8s-apply-jobs` workers, ordered only where one object refers
+        to another: a PVC waits for the PVs it may bind to, and a Deployment for the
+        PVCs, ConfigMaps and Secret its pods mount.  Services, ConfigMaps and the backup
+        configuration need nothing but the namespace.  The first failure stops anything
+        not yet started and is raised once the running calls finish.
+
+        The kubernetes client's connection pool is shared between the workers.  Each
+        object's round trip is timed; the total and the slowest objects are reported.
+
+        With server-side apply (see apply.py) the ConfigMaps, Deployments and Services
+        are applied rather than created, so those already there are brought up to date.
+        PVs and PVCs are still only created when absent: their specs are all but
+        immutable once bound, and they are where the data is.
+        """
+        scheduler = TaskScheduler(get_config_setting("k8s-apply-jobs", DEFAULT_APPLY_JOBS), thread_name_prefix="stack-k8s-apply")
+        timings = {}
+
+        def add(key, fn, depends_on=()):
+            def timed():
+                start = time.monotonic()
+                fn()
+                timings[key] = time.monotonic() - start
+                log_debug(f"{key}: {timings[key]:.3f}s")
+
+            scheduler.add(key, timed, depends_on)
+            return key
+
+        pv_keys = [add(f"pv/{pv.metadata.name}", partial(self._create_pv, pv)) for pv in self.cluster_info.get_pvs()]
+        pvc_keys = [add(f"pvc/{pvc.metadata.name}", partial(self._create_pvc, pvc), pv_keys)
+                    for pvc in self.cluster_info.get_pvcs()]
+        config_map_keys = [add(f"configmap/{cfg_map.metadata.name}", partial(self._create_config_map, cfg_map))
+                           for cfg_map in self.cluster_info.get_configmaps()]
+        add("backup", self._create_backup_configuration)
+        secret_key = add(f"secret/{stack_secrets.K8S_SECRET_NAME}", self._create_secrets)
+        for deployment in self.cluster_info.get_deployments(image_pull_policy=None if self.is_kind() else "Always"):
+            add(f"deployment/{deployment.metadata.name}", partial(self._create_deployment, deployment),
+                pvc_keys + config_map_keys + [secret_key])
+        for svc in self.cluster_info.get_services():
+            add(f"service/{svc.metadata.name}", partial(self._create_service, svc))
+
+        start = time.monotonic()
+        scheduler.run()
+        if timings:
+            slowest = sorted(timings, key=timings.get, reverse=True)[:SLOWEST_REPORTED]
+            log_info(f"Created {len(timings)} object(s) in {time.monotonic() - start:.1f}s, {scheduler.jobs} at a time;"
+                     f" slowest: {', '.join(f'{key} {timings[key]:.2f}s' for key in slowest)}")
 
     def _find_certificate_for_host_name(self, host_name):
         all_certificates = self.custom_obj_api.list_namespaced_custom_object(
@@ -483,7 +546,17 @@ class K8sDeployer(Deployer):
         log_debug(f"Sending this HTTPRoute: {http_route}")
         gateway.create_http_route(self.custom_obj_api, self.k8s_namespace, http_route)
 
-    def up(self, detach, skip_cluster_management, services):
+    def up(self, detach, skip_cluster_management, services, wait=None):
+        self._up(skip_cluster_management)
+        if wait is not None and not opts.o.dry_run:
+            deployment_names = [d.metadata.name for d in self.cluster_info.get_deployments()]
+            try:
+                wait_for_rollout(self.apps_api, self.core_api, self.k8s_namespace, self.cluster_info.app_name,
+                                 deployment_names, wait)
+            except DeployerException as e:
+                error_exit(f"{e}")
+
+    def _up(self, skip_cluster_management):
         try:
             self.skip_cluster_management = skip_cluster_management
             if not opts.o.dry_run:
@@ -513,7 +586,10 @@ class K8sDeployer(Deployer):
                     metadata=client.V1ObjectMeta(name=self.k8s_namespace)
                 )
                 try:
-                    self.core_api.create_namespace(body=namespace)
+                    if server_side_apply_enabled():
+                        apply_object(self.core_api, "Namespace", namespace)
+                    else:
+                        self.core_api.create_namespace(body=namespace)
                     log_debug(f"Namespace {self.k8s_namespace} created")
                 except client.exceptions.ApiException as e:
                     if e.status == 409:
@@ -521,10 +597,7 @@ class K8sDeployer(Deployer):
                     else:
                         raise
 
-            self._create_volume_data()
-            self._create_backup_configuration()
-            self._create_secrets()
-            self._create_deployments()
+            self._create_objects()
 
             http_proxy_info = self.cluster_info.spec.get_http_proxy()
             if http_proxy_info and not opts.o.dry_run and gateway.gateway_api_available(self.custom_obj_api):
@@ -544,7 +617,10 @@ class K8sDeployer(Deployer):
                 log_debug(f"Sending this ingress: {ingress}")
                 if not opts.o.dry_run:
                     # We've seen this exception thrown here: kubernetes.client.exceptions.ApiException: (500)
-                    ingress_resp = self.networking_api.create_namespaced_ingress(namespace=self.k8s_namespace, body=ingress)
+                    if server_side_apply_enabled():
+                        ingress_resp = apply_object(self.networking_api, "Ingress", ingress, self.k8s_namespace)
+                    else:
+                        ingress_resp = self.networking_api.create_namespaced_ingress(namespace=self.k8s_namespace, body=ingress)
                     log_debug("Ingress created:")
                     log_debug(f"{ingress_resp}")
             else:
@@ -958,68 +1034,31 @@ class K8sDeployer(Deployer):
         if len(failed) == len(volumes):
             error_exit(f"Error: nothing could be restored from {source or 'this deployment'}: {failed[-1]}")
 
-    def logs(self, services, tail, follow, stream):
+    def logs(self, services, tail, follow, stream, since=None, timestamps=False, max_bytes=None):
         self.connect_api()
-        pods = pods_in_deployment(self.core_api, self.cluster_info.app_name, self.k8s_namespace)
-        if len(pods) == 0:
-            log_data = "******* Pods not running ********\n"
+        try:
+            since = since_seconds(since) if since else None
+        except ValueError as e:
+            error_exit(f"Error: --since: {e}")
+        pod_containers = containers_in_deployment(self.core_api, self.cluster_info.app_name, self.k8s_namespace)
+        if len(pod_containers) == 0:
+            return log_stream_from_string("******* Pods not running ********\n")
 
         if services:
-            matched_pods = []
-            for svc in services:
-                for pod in pods:
-                    if f"deploy-{svc}" in pod:
-                        matched_pods.append(pod)
-            pods = matched_pods
-
-        if follow:
-
-            def log_follower(pod_name, container):
-                w = watch.Watch()
-                for line in w.stream(
-                    self.core_api.read_namespaced_pod_log,
-                    name=pod_name,
-                    container=container,
-                    tail_lines=tail,
-                    namespace=self.k8s_namespace,
-                ):
-                    output_main(f"{container}: {line}")
-
-            threads = []
-            for k8s_pod_name in pods:
-                containers = containers_in_pod(self.core_api, k8s_pod_name, self.k8s_namespace)
-                for container in containers:
-                    t = Thread(target=log_follower, args=(k8s_pod_name, container), daemon=True)
-                    t.start()
-                    threads.append(t)
-            for t in threads:
-                t.join()
-
-            return log_stream_from_string("")
-        else:
-            all_logs = []
-            for k8s_pod_name in pods:
-                containers = containers_in_pod(self.core_api, k8s_pod_name, self.k8s_namespace)
-                # If the pod is not yet started, the logs request below will throw an exception
-                try:
-                    log_data = ""
-                    for container in containers:
-                        container_log = self.core_api.read_namespaced_pod_log(
-                            k8s_pod_name, namespace=self.k8s_namespace, container=container, tail_lines=tail
-                        )
-                        # A container that is running but has not written anything yet
-                        # returns an empty body, which the client deserializes to None
-                        # rather than "". Common against a real cluster, where a caller
-                        # polling for a log line reaches a container whose image has only
-                        # just finished being pulled.
-                        container_log_lines = (container_log or "").splitlines()
-                        for line in container_log_lines:
-                            log_data += f"{container}: {line}\n"
-                except client.exceptions.ApiException as e:
-                    log_debug(f"Error from read_namespaced_pod_log: {e}")
-                    log_data = "******* No logs available ********\n"
-                all_logs.append(log_data)
-            return log_stream_from_string("\n".join(all_logs))
+            pod_containers = [(pod, containers) for pod, containers in pod_containers
+                              if any(f"deploy-{svc}" in pod for svc in services)]
+
+        sources = log_sources(
+            self.core_api,
+            self.k8s_namespace,
+            pod_containers,
+            follow=follow or None,
+            tail_lines=tail,
+            since_seconds=since,
+            timestamps=timestamps or None,
+            limit_bytes=max_bytes,
+        )
+        return stream_logs(sources, follow)
 
     def update(self):
         """Converge the running deployment on its deployment directory.
@@ -1029,6 +1068,10 @@ class K8sDeployer(Deployer):
         ports, volumes, resources, replicas -- is refused with a redeploy
         message rather than half-applied, so the whole diff of desired against
         live is computed before anything is written.
+
+        With server-side apply each changed Deployment is applied from its
+        desired state, all of them concurrently; otherwise the live object is
+        patched, one at a time.
         """
         self.connect_api()
         spec = self.cluster_info.spec
@@ -1083,6 +1126,8 @@ class K8sDeployer(Deployer):
         if secrets_changed:
             output_main("secrets: changed; restarting all services")
 
+        server_side_apply = server_side_apply_enabled()
+        applies = TaskScheduler(get_config_setting("k8s-apply-jobs", DEFAULT_APPLY_JOBS), thread_name_prefix="stack-k8s-apply")
         for desired in desired_deployments:
             name = desired.metadata.name
             desired_containers = {c.name: c for c in desired.spec.template.spec.containers}
@@ -1110,7 +1155,7 @@ class K8sDeployer(Deployer):
                     # Merged, not assigned: the pod template also carries the K8up
                     # backup-command annotations, which a restart must not strip.
                     annotations = live.spec.template.metadata.annotations or {}
-                    annotations["kubectl.kubernetes.io/restartedAt"] = (
+                    annotations[RESTARTED_AT_ANNOTATION] = (
                         datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
                     )
                     live.spec.template.metadata.annotations = annotations
@@ -1126,6 +1171,20 @@ class K8sDeployer(Deployer):
             if force_restart and not changes and not secrets_changed:
                 output_main(f"{name}: restarting")
 
+            if server_side_apply:
+                # The desired Deployment is sent whole, in one apply that cannot
+                # conflict.  The restart annotation is the one field stack sets
+                # that ClusterInfo does not: it is carried over (or, for a
+                # restart, renewed), since leaving it out would remove it, and
+                # that would roll the pods again.
+                restarted_at = (live.spec.template.metadata.annotations or {}).get(RESTARTED_AT_ANNOTATION)
+                if restarted_at:
+                    annotations = dict(desired.spec.template.metadata.annotations or {})
+                    annotations[RESTARTED_AT_ANNOTATION] = restarted_at
+                    desired.spec.template.metadata.annotations = annotations
+                applies.add(f"deployment/{name}", partial(apply_object, self.apps_api, "Deployment", desired, self.k8s_namespace))
+                continue
+
             # The patch sends back the object read at the top of update(), whose
             # resourceVersion is by now stale: on kind the image reload sits
             # between that read and here, and each earlier patch in this loop
@@ -1149,6 +1208,8 @@ class K8sDeployer(Deployer):
                     live = self.apps_api.read_namespaced_deployment(name=name, namespace=self.k8s_namespace)
                     converge(live)
 
+        applies.run()
+
     def read_secrets(self):
         spec = self.cluster_info.spec
         secret_entries = spec.get_secrets()
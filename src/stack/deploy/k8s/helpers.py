@@ -14,19 +14,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
+import json
 import os
 import re
 import shlex
 import subprocess
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from expandvars import expand
 from kubernetes import client, utils, watch
 from pathlib import Path
-from ruamel.yaml.comments import CommentedSeq
-from time import sleep
 from typing import Set, Mapping, List
 
 from stack.build.build_util import container_exists_locally
+from stack.build.image_inventory import local_images, normalize_reference
+from stack.config.util import get_config_setting
 from stack.deploy.deploy_util import parsed_pod_files_map_from_file_names
 from stack.deploy.deployer import DeployerException
 from stack.log import log_info, log_debug
@@ -65,30 +68,105 @@ def destroy_cluster(name: str):
     run_shell_command(f"kind delete cluster --name {name}")
 
 
-def wait_for_ingress_in_kind():
-    core_v1 = client.CoreV1Api()
-    for i in range(20):
-        warned_waiting = False
+# The kind ingress controller, as installed by install_ingress_for_kind().
+INGRESS_NAMESPACE = "ingress-nginx"
+INGRESS_SERVICES = ["ingress-nginx-controller", "ingress-nginx-controller-admission"]
+INGRESS_WEBHOOK = "ingress-nginx-admission"
+DEFAULT_INGRESS_TIMEOUT = 600
+# How long one watch request is held open, and how soon a failed admission probe is retried.
+INGRESS_WATCH_SECONDS = 30
+INGRESS_PROBE_INTERVAL = 0.5
+
+
+def _watch_until(list_fn, satisfied, deadline, **kwargs):
+    """Watch list_fn's objects until satisfied({name: object}) holds; False if the deadline passes first."""
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # A watch without a resource version starts with an ADDED event for everything already there.
+        objects = {}
         w = watch.Watch()
-        for event in w.stream(
-            func=core_v1.list_namespaced_pod,
-            namespace="ingress-nginx",
-            label_selector="app.kubernetes.io/component=controller",
-            timeout_seconds=30,
-        ):
-            if event["object"].status.container_statuses:
-                if event["object"].status.container_statuses[0].ready is True:
-                    if warned_waiting:
-                        log_info("Ingress controller is ready")
-                        # Hack to work around https://github.com/bozemanpass/stack/issues/110
-                        # Theory is that depending on when in the 30 second polling cycle we hit ready,
-                        # the controller may not actually be ready to serve ingress requests yet.
-                        # So we wait a bit longer here.
-                        sleep(10)
-                    return
-            log_info("Waiting for ingress controller to become ready...")
-            warned_waiting = True
-    error_exit("ERROR: Timed out waiting for ingress to become ready")
+        for event in w.stream(list_fn, timeout_seconds=max(1, int(min(remaining, INGRESS_WATCH_SECONDS))), **kwargs):
+            name = event["object"].metadata.name
+            if event["type"] == "DELETED":
+                objects.pop(name, None)
+            else:
+                objects[name] = event["object"]
+            if satisfied(objects):
+                w.stop()
+                return True
+
+
+def _services_with_ready_endpoints(endpoint_slices):
+    ready = set()
+    for endpoint_slice in endpoint_slices.values():
+        service = (endpoint_slice.metadata.labels or {}).get("kubernetes.io/service-name")
+        for endpoint in endpoint_slice.endpoints or []:
+            if endpoint.conditions and endpoint.conditions.ready:
+                ready.add(service)
+    return ready
+
+
+def _webhook_has_ca_bundle(webhook_configurations):
+    configuration = webhook_configurations.get(INGRESS_WEBHOOK)
+    return bool(configuration and configuration.webhooks
+                and all(w.client_config.ca_bundle for w in configuration.webhooks))
+
+
+def _admission_serves(networking_api):
+    # A server-side dry run goes through the admission webhooks and stores nothing.
+    probe = client.V1Ingress(
+        metadata=client.V1ObjectMeta(name="stack-ingress-probe"),
+        spec=client.V1IngressSpec(default_backend=client.V1IngressBackend(
+            service=client.V1IngressServiceBackend(name="stack-ingress-probe",
+                                                   port=client.V1ServiceBackendPort(number=80)))),
+    )
+    try:
+        networking_api.create_namespaced_ingress(namespace=INGRESS_NAMESPACE, body=probe, dry_run="All")
+    except client.exceptions.ApiException as e:
+        # A webhook that cannot be called is a 500; one that answers, even with a refusal, is serving.
+        if e.status >= 500:
+            log_debug(f"Ingress admission webhook not serving yet: {e.reason}")
+            return False
+    return True
+
+
+def _wait_for_ingress(discovery_api, admission_api, networking_api, deadline):
+    """The first readiness gate not passed by the deadline, or None once the controller can serve."""
+    if not _watch_until(discovery_api.list_namespaced_endpoint_slice,
+                        lambda slices: set(INGRESS_SERVICES) <= _services_with_ready_endpoints(slices),
+                        deadline, namespace=INGRESS_NAMESPACE):
+        return "the controller's endpoints to become ready"
+    # The webhook's certificate is patched in by a Job of its own, which can finish after the controller is up.
+    if not _watch_until(admission_api.list_validating_webhook_configuration, _webhook_has_ca_bundle,
+                        deadline, field_selector=f"metadata.name={INGRESS_WEBHOOK}"):
+        return "the admission webhook's certificate"
+    # Ready endpoints can still be a moment ahead of the API server being able to reach them.
+    while not _admission_serves(networking_api):
+        if time.monotonic() + INGRESS_PROBE_INTERVAL > deadline:
+            return "the admission webhook to answer"
+        time.sleep(INGRESS_PROBE_INTERVAL)
+    return None
+
+
+def wait_for_ingress_in_kind():
+    """Return as soon as kind's ingress controller can accept Ingresses.
+
+    Creating an Ingress calls the controller's admission webhook, so the Ingress a
+    deployment creates fails unless the webhook is serving.  That is the case once
+    both of the controller's services have a ready endpoint and the webhook has its
+    CA bundle, as watched for here, and then confirmed with a dry-run Ingress.  The
+    deadline is the `kind-ingress-timeout` setting, in seconds.
+    """
+    timeout = get_config_setting("kind-ingress-timeout", DEFAULT_INGRESS_TIMEOUT)
+    start = time.monotonic()
+    log_info("Waiting for ingress controller to become ready...")
+    waiting_for = _wait_for_ingress(client.DiscoveryV1Api(), client.AdmissionregistrationV1Api(),
+                                    client.NetworkingV1Api(), start + float(timeout))
+    if waiting_for:
+        error_exit(f"ERROR: Timed out after {timeout}s waiting for ingress to become ready (waiting for {waiting_for})")
+    log_info(f"Ingress controller is ready ({time.monotonic() - start:.1f}s)")
 
 
 def install_ingress_for_kind():
@@ -98,15 +176,83 @@ def install_ingress_for_kind():
     utils.create_from_yaml(api_client, yaml_file=ingress_install)
 
 
+# How many missing images load_images_into_kind() pulls at once.
+KIND_PULL_JOBS = 4
+
+
+def _kind_nodes(kind_cluster_name: str):
+    result = subprocess.run(["kind", "get", "nodes", "--name", kind_cluster_name], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise DeployerException(f"kind get nodes failed: {result.stderr.strip()}")
+    return sorted(result.stdout.split())
+
+
+def _node_images(node: str):
+    """{normalized tag: image ID} of the images in a kind node's containerd, or {} if it cannot be asked."""
+    result = subprocess.run(["docker", "exec", node, "crictl", "images", "-o", "json"], capture_output=True, text=True)
+    if result.returncode != 0:
+        log_debug(f"Unable to list the images in kind node {node}: {result.stderr.strip()}")
+        return {}
+    try:
+        listed = json.loads(result.stdout).get("images") or []
+    except (ValueError, AttributeError):
+        return {}
+    return {normalize_reference(tag): image.get("id") for image in listed for tag in image.get("repoTags") or []}
+
+
+def _pull_missing(images):
+    missing = [image for image in images if not container_exists_locally(image)]
+    if not missing:
+        return
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(KIND_PULL_JOBS, len(missing)), thread_name_prefix="stack-pull") as pool:
+        results = dict(zip(missing, pool.map(lambda image: run_shell_command(f"docker pull {image}", check_result=False),
+                                             missing)))
+    local_images().invalidate()
+    failed = [image for image, rc in results.items() if rc != 0]
+    if failed:
+        raise DeployerException(f"docker pull failed for {', '.join(failed)}")
+    log_info(f"Pulled {len(missing)} image(s) in {time.monotonic() - start:.1f}s")
+
+
 def load_images_into_kind(kind_cluster_name: str, image_set: Set[str]):
-    for image in image_set:
-        if not container_exists_locally(image):
-            result = run_shell_command(f"docker pull {image}")
-            if result != 0:
-                raise DeployerException(f"kind create cluster failed: {result}")
-        result = run_shell_command(f"kind load docker-image {image} --name {kind_cluster_name}")
+    """Make the kind cluster's nodes hold the local build of every image in image_set.
+
+    Images missing locally are pulled first, several at once.  Each node's containerd
+    is then listed, once, and an image is loaded only into the nodes that do not
+    already hold it under its tag with the same ID -- so a restart that changed
+    nothing loads nothing.  The images a set of nodes needs go in one `kind load`,
+    which exports them as one archive and imports it once per node.
+    """
+    images = sorted(image_set)
+    _pull_missing(images)
+
+    start = time.monotonic()
+    nodes = _kind_nodes(kind_cluster_name)
+    with ThreadPoolExecutor(max_workers=max(1, len(nodes)), thread_name_prefix="stack-kind-node") as pool:
+        node_images = dict(zip(nodes, pool.map(_node_images, nodes)))
+    # nodes lacking an image -> the images they lack
+    needed = {}
+    for image in images:
+        image_id = local_images().image_id(image)
+        lacking = tuple(n for n in nodes if image_id is None or node_images[n].get(normalize_reference(image)) != image_id)
+        if lacking:
+            needed.setdefault(lacking, []).append(image)
+    loaded = sorted({image for batch in needed.values() for image in batch})
+    log_debug(f"Listed the images in {len(nodes)} kind node(s) in {time.monotonic() - start:.1f}s")
+
+    for lacking, batch in needed.items():
+        log_debug(f"Loading into {', '.join(lacking)}: {', '.join(batch)}")
+        result = run_shell_command(
+            f"kind load docker-image {' '.join(shlex.quote(i) for i in batch)} --name {kind_cluster_name}"
+            f" --nodes {','.join(lacking)}",
+            check_result=False,
+        )
         if result != 0:
-            raise DeployerException(f"kind create cluster failed: {result}")
+            raise DeployerException(f"kind load docker-image failed: {result}")
+    already_present = len(images) - len(loaded)
+    log_info(f"Loaded {len(loaded)} image(s) into kind in {time.monotonic() - start:.1f}s"
+             f" ({already_present} already present)")
 
 
 def live_pods(pod_items):
@@ -132,6 +278,12 @@ def pods_in_deployment(core_api: client.CoreV1Api, deployment_name: str, namespa
     return pods
 
 
+def containers_in_deployment(core_api: client.CoreV1Api, deployment_name: str, namespace: str = DEFAULT_K8S_NAMESPACE):
+    """[(pod name, [container name])] for the deployment's live pods, from a single listing."""
+    pod_response = core_api.list_namespaced_pod(namespace=namespace, label_selector=f"app={deployment_name}")
+    return [(pod.metadata.name, [c.name for c in pod.spec.containers]) for pod in live_pods(pod_response.items)]
+
+
 def containers_in_pod(core_api: client.CoreV1Api, pod_name: str, namespace: str = DEFAULT_K8S_NAMESPACE):
     containers = []
     pod_response = core_api.read_namespaced_pod(pod_name, namespace=namespace)
@@ -393,7 +545,7 @@ def envs_from_compose_file(compose_file_envs: Mapping[str, str], environ=os.envi
 
 def envs_from_environment_variables_map(map: Mapping[str, str]) -> List[client.V1EnvVar]:
     result = []
-    if isinstance(map, CommentedSeq):
+    if isinstance(map, list):
         for item in map:
             env_var, env_val = item.split("=", 1)
             result.append(client.V1EnvVar(env_var, env_val))
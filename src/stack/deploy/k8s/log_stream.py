@@ -0,0 +1,152 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""The containers' logs for `stack manage logs` on k8s, streamed whole line by whole line.
+
+Each container's log is read as a stream rather than into memory, and cut into lines
+as it arrives.  A line is held only until its newline comes, and a line longer than
+LINE_LIMIT is passed on in pieces, so memory stays bounded whatever a container writes.
+
+Without --follow the containers are read one after another, each in full.  With it,
+every container has a reader thread, and the readers hand their lines to one bounded
+queue.  The caller takes lines from the queue and is the only one writing output, so
+lines from different containers never interleave part way.  When the caller falls
+behind, the queue fills, the readers block, and the API server's connections are left
+unread until it catches up, so memory does not grow with the backlog.
+"""
+
+import queue
+import re
+import threading
+
+from datetime import datetime, timezone
+
+from kubernetes import client
+
+from stack.log import log_debug
+
+# The longest line held whole; anything longer is passed on in pieces this size.
+LINE_LIMIT = 64 * 1024
+CHUNK_SIZE = 16 * 1024
+# Lines waiting to be written, across every container, before the readers block.
+QUEUE_LINES = 1000
+NO_LOGS = b"******* No logs available ********"
+
+_DURATION = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$")
+
+
+def since_seconds(since: str):
+    """Seconds ago that `since` names: a duration (90s, 10m, 1h30m) or an ISO 8601 time."""
+    match = _DURATION.match(since)
+    if match and any(match.groups()):
+        hours, minutes, seconds = (int(g or 0) for g in match.groups())
+        total = hours * 3600 + minutes * 60 + seconds
+        # The API server rejects since_seconds=0, and a request for nothing is more likely a slip.
+        if total == 0:
+            raise ValueError(f"a duration must be longer than zero, not {since}")
+        return total
+    try:
+        when = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"not a duration or a time: {since}")
+    if when.tzinfo is None:
+        when = when.astimezone()
+    return max(1, int((datetime.now(timezone.utc) - when).total_seconds()))
+
+
+def split_lines(chunks, prefix: bytes):
+    """Whole lines, each with prefix and a newline, from a stream of byte chunks."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield prefix + line + b"\n"
+        while len(pending) > LINE_LIMIT:
+            yield prefix + pending[:LINE_LIMIT] + b"\n"
+            pending = pending[LINE_LIMIT:]
+    if pending:
+        yield prefix + pending + b"\n"
+
+
+class LogSource:
+    """One container's log, and how to read it."""
+
+    def __init__(self, core_api, namespace, pod, container, label, **read_options):
+        self.core_api = core_api
+        self.namespace = namespace
+        self.pod = pod
+        self.container = container
+        self.prefix = f"{label}: ".encode()
+        # follow, tail_lines, since_seconds, timestamps, limit_bytes
+        self.read_options = {k: v for k, v in read_options.items() if v is not None}
+
+    def lines(self):
+        try:
+            response = self.core_api.read_namespaced_pod_log(
+                self.pod, namespace=self.namespace, container=self.container, _preload_content=False, **self.read_options
+            )
+        except client.exceptions.ApiException as e:
+            # A pod that has not started yet fails the request outright.
+            log_debug(f"Error from read_namespaced_pod_log: {e}")
+            yield self.prefix + NO_LOGS + b"\n"
+            return
+        try:
+            yield from split_lines(response.stream(CHUNK_SIZE), self.prefix)
+        finally:
+            response.release_conn()
+
+
+def log_sources(core_api, namespace, pod_containers, **read_options):
+    """A LogSource for each (pod, [container]), labelled by container, or pod/container where a name repeats."""
+    names = [c for _, containers in pod_containers for c in containers]
+    sources = []
+    for pod, containers in pod_containers:
+        for container in containers:
+            label = container if names.count(container) == 1 else f"{pod}/{container}"
+            sources.append(LogSource(core_api, namespace, pod, container, label, **read_options))
+    return sources
+
+
+def _read_into(source, lines, done):
+    try:
+        for line in source.lines():
+            lines.put(line)
+    except Exception as e:
+        log_debug(f"Log stream for {source.pod}/{source.container} ended: {e}")
+    finally:
+        lines.put(done)
+
+
+def stream_logs(sources, follow: bool):
+    """Yield ("stdout", line) for every line of every source's log."""
+    if not follow:
+        for source in sources:
+            for line in source.lines():
+                yield "stdout", line
+        return
+
+    lines = queue.Queue(maxsize=QUEUE_LINES)
+    done = object()
+    for source in sources:
+        threading.Thread(target=_read_into, args=(source, lines, done), daemon=True,
+                         name=f"stack-logs-{source.pod}-{source.container}").start()
+    remaining = len(sources)
+    while remaining:
+        line = lines.get()
+        if line is done:
+            remaining -= 1
+            continue
+        yield "stdout", line
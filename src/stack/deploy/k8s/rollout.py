@@ -0,0 +1,199 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Waiting for a k8s deployment's rollout by watching it, for `stack manage start --wait`.
+
+Without this, a script that starts a deployment has to poll `manage status` until it
+looks ready, and every poll connects afresh, lists the pods and looks up the ingress
+and certificate.  Here one watch is opened on the namespace's Deployments and one on
+the deployment's pods, each starting from a list of what is already there.  Progress
+is reported as it happens, and the wait ends as soon as it is decided either way.
+
+A Deployment is judged rolled out the way `kubectl rollout status` judges it: its
+controller has seen the latest spec, and every replica is updated and available, with
+no old ones left.  The wait fails early when one of the pods has a container that will
+not start without someone changing something: an image that cannot be pulled, a crash
+loop, a config error.  It also fails when a Deployment exceeds its progress deadline,
+or when the wait's own timeout runs out.
+"""
+
+import queue
+import threading
+import time
+
+from kubernetes import client, watch
+
+from stack.deploy.deployer import DeployerException
+from stack.log import log_debug, output_main
+
+# Waiting reasons that mean a container will not start without someone changing something.
+STUCK_REASONS = {
+    "ImagePullBackOff",
+    "ErrImageNeverPull",
+    "InvalidImageName",
+    "CrashLoopBackOff",
+    "CreateContainerConfigError",
+    "CreateContainerError",
+    "RunContainerError",
+}
+# How long one watch request is held open; it is then re-opened where it left off.
+WATCH_SECONDS = 30
+
+WAITING = "waiting"
+READY = "ready"
+FAILED = "failed"
+
+
+def rollout_status(deployment):
+    """(WAITING, READY or FAILED, a line describing it) for a Deployment."""
+    name = deployment.metadata.name
+    status = deployment.status or client.V1DeploymentStatus()
+    wanted = deployment.spec.replicas if deployment.spec.replicas is not None else 1
+    if (status.observed_generation or 0) < (deployment.metadata.generation or 0):
+        return WAITING, f"{name}: waiting for the new spec to be picked up"
+    for condition in status.conditions or []:
+        if condition.type == "Progressing" and condition.reason == "ProgressDeadlineExceeded":
+            return FAILED, f"{name}: exceeded its progress deadline: {condition.message}"
+    updated = status.updated_replicas or 0
+    if updated < wanted:
+        return WAITING, f"{name}: {updated} of {wanted} replicas updated"
+    old = (status.replicas or 0) - updated
+    if old > 0:
+        return WAITING, f"{name}: {old} old replica(s) terminating"
+    available = status.available_replicas or 0
+    if available < updated:
+        return WAITING, f"{name}: {available} of {updated} replicas available"
+    return READY, f"{name}: {available} of {wanted} replicas available"
+
+
+def stuck_containers(pod):
+    """{container name: "reason: message"} for the containers of pod that will not start by themselves."""
+    stuck = {}
+    statuses = (pod.status.init_container_statuses or []) + (pod.status.container_statuses or []) if pod.status else []
+    for container in statuses:
+        waiting = container.state.waiting if container.state else None
+        if waiting and waiting.reason in STUCK_REASONS:
+            stuck[container.name] = f"{waiting.reason}: {waiting.message}" if waiting.message else waiting.reason
+    return stuck
+
+
+class RolloutTracker:
+    """What the watch events so far say about the rollout of a set of Deployments."""
+
+    def __init__(self, deployment_names):
+        self.states = {name: (WAITING, f"{name}: waiting to be seen") for name in deployment_names}
+        # pod name -> {container name: reason}
+        self.stuck = {}
+
+    def observe(self, kind, event_type, obj):
+        """Take in one watch event; return the lines of progress it makes."""
+        name = obj.metadata.name
+        if kind == "deployment":
+            if name not in self.states:
+                return []
+            state = rollout_status(obj)
+            if state == self.states[name]:
+                return []
+            self.states[name] = state
+            return [state[1]]
+        previously = self.stuck.pop(name, {})
+        now = stuck_containers(obj) if event_type != "DELETED" else {}
+        if now:
+            self.stuck[name] = now
+        return [f"{name}: container {c} is stuck ({reason})" for c, reason in now.items() if previously.get(c) != reason]
+
+    def done(self):
+        return all(state == READY for state, _ in self.states.values())
+
+    def failures(self):
+        """Lines naming what has made the rollout fail, if anything has."""
+        failed = [line for state, line in self.states.values() if state == FAILED]
+        if self.done():
+            return failed
+        return failed + [f"{pod}: container {c}: {reason}"
+                         for pod, containers in sorted(self.stuck.items()) for c, reason in containers.items()]
+
+    def pending(self):
+        return [line for state, line in self.states.values() if state != READY]
+
+
+def _watch(list_fn, kwargs, kind, events, stop):
+    # List, then watch from there; re-listed if the server has forgotten that point.
+    resource_version = None
+    while not stop.is_set():
+        try:
+            if resource_version is None:
+                listed = list_fn(**kwargs)
+                for item in listed.items:
+                    events.put((kind, "ADDED", item))
+                resource_version = listed.metadata.resource_version
+            w = watch.Watch()
+            for event in w.stream(list_fn, resource_version=resource_version, timeout_seconds=WATCH_SECONDS, **kwargs):
+                if stop.is_set():
+                    w.stop()
+                    return
+                if event["type"] == "ERROR":
+                    resource_version = None
+                    break
+                resource_version = event["object"].metadata.resource_version
+                events.put((kind, event["type"], event["object"]))
+        except client.exceptions.ApiException as e:
+            if e.status != 410:
+                events.put(("error", None, e))
+                return
+            log_debug(f"Re-listing {kind}s: the watch's resource version has expired")
+            resource_version = None
+        except Exception as e:
+            events.put(("error", None, e))
+            return
+
+
+def wait_for_rollout(apps_api, core_api, namespace, app_name, deployment_names, timeout):
+    """Wait up to timeout seconds for deployment_names to be rolled out, reporting progress.
+
+    Raises DeployerException, naming what is stuck or unfinished, if they are not."""
+    tracker = RolloutTracker(deployment_names)
+    events = queue.Queue()
+    stop = threading.Event()
+    watchers = [
+        (apps_api.list_namespaced_deployment, {"namespace": namespace}, "deployment"),
+        (core_api.list_namespaced_pod, {"namespace": namespace, "label_selector": f"app={app_name}"}, "pod"),
+    ]
+    for list_fn, kwargs, kind in watchers:
+        threading.Thread(target=_watch, args=(list_fn, kwargs, kind, events, stop), daemon=True,
+                         name=f"stack-watch-{kind}").start()
+
+    deadline = time.monotonic() + timeout
+    try:
+        while not tracker.done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                detail = "\n".join(f"  {line}" for line in tracker.pending() + tracker.failures())
+                raise DeployerException(f"timed out after {timeout}s waiting for the rollout:\n{detail}")
+            try:
+                kind, event_type, obj = events.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if kind == "error":
+                raise DeployerException(f"watching the rollout failed: {obj}")
+            for line in tracker.observe(kind, event_type, obj):
+                output_main(line)
+            failures = tracker.failures()
+            if failures:
+                detail = "\n".join(f"  {line}" for line in failures)
+                raise DeployerException(f"the rollout is stuck:\n{detail}")
+    finally:
+        stop.set()
+    output_main(f"All {len(deployment_names)} service(s) available")
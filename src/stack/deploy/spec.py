@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
+import copy
 import typing
 import humanfriendly
 import os
@@ -22,7 +23,7 @@ from pathlib import Path
 from mergedeep import merge, Strategy
 
 from stack import constants
-from stack.util import get_yaml, get_stack_path, error_exit
+from stack.util import get_yaml, get_stack_path, error_exit, read_yaml_file
 
 from stack.deploy.stack import Stack
 
@@ -87,6 +88,8 @@ class Spec:
         self.file_path = file_path
         self.obj = obj
         self.type = "single"
+        # (stack reference, Stack) of the last load_stack().
+        self._stack = None
 
     def __getitem__(self, item):
         return self.obj[item]
@@ -217,7 +220,12 @@ class Spec:
         return self.get_deployment_type() in [constants.compose_deploy_type]
 
     def load_stack(self):
-        return Stack(self.obj["stack"]).init_from_file(os.path.join(get_stack_path(self.obj["stack"]), constants.stack_file_name))
+        """The spec's stack, parsed once and shared by every caller until the spec names another."""
+        stack_ref = self.obj["stack"]
+        if self._stack is None or self._stack[0] != stack_ref:
+            stack = Stack(stack_ref).init_from_file(os.path.join(get_stack_path(stack_ref), constants.stack_file_name))
+            self._stack = (stack_ref, stack)
+        return self._stack[1]
 
     def get_pod_list(self):
         return self.load_stack().get_pod_list()
@@ -250,52 +258,87 @@ def _runtime_class_default(spec: Spec):
     return config.get("default") if isinstance(config, dict) else None
 
 
+class _MergedModel:
+    """What a MergedSpec's stacks add up to, worked out once from its specs.
+
+    The stacks are the single-stack specs' own (each parsed once, see Spec.load_stack()),
+    shared rather than copied; `pod_owners` maps each pod to the single-stack spec it came
+    from, so that finding a pod's stack or file is a lookup rather than a search."""
+
+    def __init__(self, specs):
+        self.stacks = []
+        self.pod_owners = {}
+        self.pods = []
+        for spec in specs:
+            if spec.type == "merged":
+                # The nested spec's own stacks, not their merge: only those know where
+                # their files are.
+                self.stacks.extend(spec.load_stacks())
+                owners = spec._model().pod_owners
+                pods = spec.get_pod_list()
+            else:
+                self.stacks.append(spec.load_stack())
+                pods = spec.get_pod_list()
+                owners = {pod: spec for pod in pods}
+            self.pods.extend(pods)
+            for pod in pods:
+                self.pod_owners.setdefault(pod, owners[pod])
+        self._merged_stack = None
+        self._services = None
+
+    def merged_stack(self):
+        if self._merged_stack is None:
+            merged = Stack()
+            for stack in self.stacks:
+                merge(merged.obj, stack.obj, strategy=Strategy.ADDITIVE)
+            self._merged_stack = merged
+        return self._merged_stack
+
+    def services(self):
+        if self._services is None:
+            services = {}
+            for stack in self.stacks:
+                merge(services, stack.get_services(), strategy=Strategy.REPLACE)
+            self._services = services
+        return self._services
+
+
 class MergedSpec(Spec):
     def __init__(self):
         super().__init__()
         self.type = "merged"
         self._specs = []
+        self._merged = None
+
+    def _model(self):
+        # Dropped by merge(), the only way the set of specs changes.
+        if self._merged is None:
+            self._merged = _MergedModel(self._specs)
+        return self._merged
 
     def load_stack(self):
         return self.merge_stacks()
 
     def merge_stacks(self):
-        stacks = self.load_stacks()
-        ret = Stack()
-        for stack in stacks:
-            merge(ret.obj, stack.obj, strategy=Strategy.ADDITIVE)
-        return ret
+        """The specs' stacks merged into one, worked out once and shared by every caller."""
+        return self._model().merged_stack()
 
     def load_stacks(self):
-        return [spec.load_stack() for spec in self._specs]
+        return list(self._model().stacks)
 
     def stack_for_pod(self, pod_name):
-        for spec in self._specs:
-            if pod_name in spec.get_pod_list():
-                if spec.type == "merged":
-                    return spec.stack_for_pod(pod_name)
-                else:
-                    return spec.load_stack()
-        return None
+        owner = self._model().pod_owners.get(pod_name)
+        return owner.load_stack() if owner else None
 
     def get_pod_list(self):
-        ret = []
-        for spec in self._specs:
-            ret.extend(spec.get_pod_list())
-        return ret
+        return list(self._model().pods)
 
     def get_services(self):
-        services = {}
-        for stack in self.load_stacks():
-            merge(services, stack.get_services(), strategy=Strategy.REPLACE)
-        return services
+        return copy.deepcopy(self._model().services())
 
     def load_pod_file(self, pod_name):
-        for spec in self._specs:
-            pod_file = spec.load_pod_file(pod_name)
-            if pod_file:
-                return pod_file
-        return None
+        owner = self._model().pod_owners.get(pod_name)
+        return owner.load_pod_file(pod_name) if owner else None
 
     def fully_qualified_path(self, cfg_map_or_vol_name):
         for spec in self._specs:
@@ -390,6 +433,7 @@ class MergedSpec(Spec):
             self._set_http_proxy([merged_proxy])
 
         self._specs.append(other)
+        self._merged = None
 
         all_stacks = []
         for x in self._specs:
@@ -408,11 +452,12 @@ class MergedSpec(Spec):
         self.file_path = None
         ret.obj = self.obj.copy()
         ret._specs = self._specs.copy()
+        ret._merged = self._merged
         return ret
 
 
 def load_spec(spec_path):
-    parsed = get_yaml().load(open(spec_path, "r"))
+    parsed = read_yaml_file(spec_path)
     if not isinstance(parsed, list):
         return Spec().init_from_file(spec_path)
 
@@ -14,8 +14,9 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http:#www.gnu.org/licenses/>.
 
-import git
+import copy
 import os
+import threading
 import typing
 
 from pathlib import Path
@@ -23,7 +24,10 @@ from typing import Set, List
 
 import stack.repos.repo_util as repo_util
 
+from stack.repos import repo_metadata
+
 from stack import constants
+from stack.deploy import stack_index
 from stack.config.util import get_dev_root_path
 from stack.log import log_debug, log_warn
 from stack.util import get_yaml, get_stack_path, error_exit, resolve_compose_file, STACK_USE_BUILTIN_STACK
@@ -76,6 +80,94 @@ def _comment_lines(tokens):
             yield column, text
 
 
+class _PodIndex:
+    """What the Stack getters need from one pod file, gathered in a single walk of it."""
+
+    def __init__(self, parsed_pod_file):
+        self.services = {}
+        self.ports = {}
+        self.volumes = {}
+        self.security_settings = {}
+        # (service, port, path from the annotation), the prefix being applied per call.
+        self.http_proxy_targets = []
+        self.backup_exclude = []
+        self.backup_commands = {}
+        self.named_volume_writable = {}
+
+        services = (parsed_pod_file or {}).get(constants.services_key) or {}
+        declared_volumes = (parsed_pod_file or {}).get(constants.volumes_key) or {}
+        for svc_name, svc in services.items():
+            self.services[svc_name] = svc
+            if constants.ports_key in svc:
+                self._index_ports(svc_name, svc[constants.ports_key])
+            if constants.volumes_key in svc:
+                self._index_volumes(svc_name, svc[constants.volumes_key], declared_volumes)
+            # All we understand for now is 'privileged'
+            if constants.privileged_key in svc:
+                self.security_settings[svc_name] = {constants.privileged_key: svc[constants.privileged_key]}
+            Stack._parse_backup_command_annotations(services, svc_name, svc, self.backup_commands)
+        # In the order the pod file declares them.
+        self.named_volume_writable = {v: self.named_volume_writable[v] for v in declared_volumes
+                                      if v in self.named_volume_writable}
+
+    def _index_ports(self, svc_name, ports_section):
+        # Ports can appear as strings or numbers.  We normalize them as strings.
+        self.ports[svc_name] = [str(x) for x in ports_section]
+        for i, port in enumerate(ports_section):
+            port = str(port).split(":")[-1]
+            if i in ports_section.ca.items:
+                comment = ports_section.ca.items[i][0].value.strip()
+                if constants.stack_annotation_marker in comment and constants.http_proxy_key in comment:
+                    parts = comment.split()
+                    parts = parts[parts.index(constants.http_proxy_key) + 1 :]
+                    self.http_proxy_targets.append((svc_name, port, parts[0] if parts else ""))
+
+    def _index_volumes(self, svc_name, volumes_section, declared_volumes):
+        self.volumes[svc_name] = volumes_section
+        for i, mount in enumerate(volumes_section):
+            item_comments = volumes_section.ca.items.get(i)
+            if item_comments and item_comments[0]:
+                # Only the end-of-line comment (first line of the token) counts.
+                # ruamel attaches trailing block comments (e.g. a comment that heads
+                # the next service) to the preceding item; those must be ignored.
+                comment = item_comments[0].value.split("\n", 1)[0].strip()
+                if constants.stack_annotation_marker in comment \
+                        and constants.backup_exclude_annotation in comment:
+                    self.backup_exclude.append(str(mount).split(":")[0])
+            parts = str(mount).split(":")
+            if parts[0] in declared_volumes:
+                writable = not (len(parts) == 3 and parts[2] == "ro")
+                self.named_volume_writable[parts[0]] = self.named_volume_writable.get(parts[0], False) or writable
+
+
+class _PodFileEntry:
+    def __init__(self, stamp, parsed):
+        self.stamp = stamp
+        self.parsed = parsed
+        self.index = _PodIndex(parsed)
+
+
+# Parsed pod files, by path, shared by every Stack: one stack is loaded afresh many times
+# over during init and deploy, and a super stack's pods are each read by several getters.
+# An entry is reparsed when its file's mtime or size changes.
+_pod_files = {}
+_pod_files_lock = threading.Lock()
+
+
+def _load_pod_file_entry(pod_file_path):
+    path = os.path.abspath(pod_file_path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _pod_files_lock:
+        entry = _pod_files.get(path)
+        if entry is None or entry.stamp != stamp:
+            log_debug(f"Parsing pod file {path}")
+            with open(path, "rt") as f:
+                entry = _PodFileEntry(stamp, get_yaml().load(f))
+            _pod_files[path] = entry
+        return entry
+
+
 class Stack:
     name: str
     file_path: Path
@@ -87,6 +179,7 @@ class Stack:
         self.obj = {}
         self.file_path = None
         self.repo_path = None
+        self._local_checkout = None
 
     def __getitem__(self, item):
         return self.obj[item]
@@ -171,14 +264,18 @@ class Stack:
 
     def get_repo_url(self):
         if self._determine_repo_path():
-            repo = git.Repo(self.repo_path)
-            return repo.remotes[0].url
+            return repo_metadata.remote_url(self.repo_path)
         return None
 
     def repo_is_local_checkout(self):
         """True when this stack was loaded from a checkout other than the dev-root clone
         of its repo -- a developer tree or a CI checkout.  Colocated containers of such a
         stack build directly from that checkout, and its repo is never cloned."""
+        if self._local_checkout is None:
+            self._local_checkout = self._is_local_checkout()
+        return self._local_checkout
+
+    def _is_local_checkout(self):
         if not self._determine_repo_path():
             return False
         ref = self.get_repo_ref()
@@ -215,45 +312,42 @@ class Stack:
         return [p["name"] for p in pods]
 
     def load_pod_file(self, pod_name):
+        """The parsed pod file, a copy of which the caller is free to change."""
+        entry = self._pod_file_entry(pod_name)
+        return copy.deepcopy(entry.parsed) if entry else None
+
+    def get_pod_file_path(self, pod_name):
+        return get_pod_file_path(self, pod_name)
+
+    def _pod_file_entry(self, pod_name):
         pod_file_path = self.get_pod_file_path(pod_name)
         if pod_file_path:
-            return get_yaml().load(open(pod_file_path, "rt"))
+            return _load_pod_file_entry(pod_file_path)
         return None
 
-    def get_pod_file_path(self, pod_name):
-        return get_pod_file_path(self, pod_name)
+    def _pod_indexes(self):
+        entries = [self._pod_file_entry(pod) for pod in self.get_pod_list()]
+        return [entry.index for entry in entries if entry]
 
     def get_services(self):
         services = {}
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key in parsed_pod_file:
-                for svc_name in parsed_pod_file[constants.services_key]:
-                    services[svc_name] = parsed_pod_file[constants.services_key][svc_name]
+        for index in self._pod_indexes():
+            for svc_name, svc in index.services.items():
+                services[svc_name] = copy.deepcopy(svc)
         return services
 
     def get_ports(self):
         ports = {}
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key in parsed_pod_file:
-                for svc_name, svc in parsed_pod_file[constants.services_key].items():
-                    if constants.ports_key in svc:
-                        # Ports can appear as strings or numbers.  We normalize them as strings.
-                        ports[svc_name] = [str(x) for x in svc[constants.ports_key]]
+        for index in self._pod_indexes():
+            for svc_name, svc_ports in index.ports.items():
+                ports[svc_name] = list(svc_ports)
         return ports
 
     def get_volumes(self):
         volumes = {}
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key in parsed_pod_file:
-                for svc_name, svc in parsed_pod_file[constants.services_key].items():
-                    if constants.volumes_key in svc:
-                        volumes[svc_name] = svc[constants.volumes_key]
+        for index in self._pod_indexes():
+            for svc_name, svc_volumes in index.volumes.items():
+                volumes[svc_name] = copy.deepcopy(svc_volumes)
         return volumes
 
     def get_backup_targets(self):
@@ -269,25 +363,10 @@ class Stack:
         """
         exclude = []
         commands = {}
-        for pod in self.get_pod_list():
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key not in parsed_pod_file:
-                continue
-            services = parsed_pod_file[constants.services_key]
-            for svc_name, svc in services.items():
-                if constants.volumes_key in svc:
-                    volumes_section = svc[constants.volumes_key]
-                    for i, mount in enumerate(volumes_section):
-                        item_comments = volumes_section.ca.items.get(i)
-                        if item_comments and item_comments[0]:
-                            # Only the end-of-line comment (first line of the token) counts.
-                            # ruamel attaches trailing block comments (e.g. a comment that heads
-                            # the next service) to the preceding item; those must be ignored.
-                            comment = item_comments[0].value.split("\n", 1)[0].strip()
-                            if constants.stack_annotation_marker in comment \
-                                    and constants.backup_exclude_annotation in comment:
-                                exclude.append(str(mount).split(":")[0])
-                self._parse_backup_command_annotations(services, svc_name, svc, commands)
+        for index in self._pod_indexes():
+            exclude.extend(index.backup_exclude)
+            for svc_name, svc_commands in index.backup_commands.items():
+                commands[svc_name] = dict(svc_commands)
         for svc_name in list(commands):
             if "command" not in commands[svc_name]:
                 log_warn(
@@ -355,75 +434,31 @@ class Stack:
                 prefix = prefix.rstrip("/")
 
         http_proxy_targets = []
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key in parsed_pod_file:
-                for svc_name, svc in parsed_pod_file[constants.services_key].items():
-                    if constants.ports_key in svc:
-                        ports_section = svc[constants.ports_key]
-                        for i, port in enumerate(ports_section):
-                            port = str(port).split(":")[-1]
-                            if len(ports_section.ca.items) > 0:
-                                if i in ports_section.ca.items:
-                                    comment = ports_section.ca.items[i][0].value.strip()
-                                    if constants.stack_annotation_marker in comment and constants.http_proxy_key in comment:
-                                        parts = comment.split()
-                                        parts = parts[parts.index(constants.http_proxy_key) + 1 :]
-                                        path = ""
-                                        if len(parts) >= 1:
-                                            path = parts[0]
-                                        if prefix:
-                                            path = f"{prefix}/{path.strip('/')}"
-                                        path = "/" + path.strip("/")
-                                        http_proxy_targets.append({"service": svc_name, "port": port, "path": path})
+        for index in self._pod_indexes():
+            for svc_name, port, path in index.http_proxy_targets:
+                if prefix:
+                    path = f"{prefix}/{path.strip('/')}"
+                path = "/" + path.strip("/")
+                http_proxy_targets.append({"service": svc_name, "port": port, "path": path})
         return http_proxy_targets
 
     def get_security_settings(self):
         security_settings = {}
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.services_key in parsed_pod_file:
-                for svc_name, svc in parsed_pod_file[constants.services_key].items():
-                    # All we understand for now is 'privileged'
-                    if constants.privileged_key in svc:
-                        security_settings[svc_name] = {constants.privileged_key: svc[constants.privileged_key]}
+        for index in self._pod_indexes():
+            for svc_name, settings in index.security_settings.items():
+                security_settings[svc_name] = dict(settings)
         return security_settings
 
     def get_named_volumes(self):
-        # Parse the compose files looking for named volumes
-        named_volumes = {"rw": [], "ro": []}
-
-        def find_vol_usage(parsed_pod_file, vol):
-            ret = {}
-            if constants.services_key in parsed_pod_file:
-                for svc_name, svc in parsed_pod_file[constants.services_key].items():
-                    if constants.volumes_key in svc:
-                        for svc_volume in svc[constants.volumes_key]:
-                            parts = svc_volume.split(":")
-                            if parts[0] == vol:
-                                ret[svc_name] = {
-                                    "volume": parts[0],
-                                    "mount": parts[1],
-                                    "options": parts[2] if len(parts) == 3 else None,
-                                }
-            return ret
-
         # A volume is read-only only if *every* mount of it is read-only: one writer
         # means it has to be provisioned writable, however many readers there are.
         # Collect the verdict over all pods and services before classifying, so that
         # the answer does not depend on the order they happen to be visited in.
+        named_volumes = {"rw": [], "ro": []}
         is_writable = {}
-        pods = self.get_pod_list()
-        for pod in pods:
-            parsed_pod_file = self.load_pod_file(pod)
-            if constants.volumes_key in parsed_pod_file:
-                volumes = parsed_pod_file[constants.volumes_key]
-                for volume in volumes.keys():
-                    for vu in find_vol_usage(parsed_pod_file, volume).values():
-                        writable = vu["options"] != "ro"
-                        is_writable[volume] = is_writable.get(volume, False) or writable
+        for index in self._pod_indexes():
+            for volume, writable in index.named_volume_writable.items():
+                is_writable[volume] = is_writable.get(volume, False) or writable
 
         for volume, writable in is_writable.items():
             named_volumes["rw" if writable else "ro"].append(volume)
@@ -553,34 +588,15 @@ def pod_has_scripts(parsed_stack, pod_name: str):
     return result
 
 
-def _is_deployment_stack_copy(stack_file_path: Path, search_path: Path):
-    # A deployment directory contains a copy of the stack's files beside its
-    # deployment.yml; that copy belongs to the deployment, not to the set of
-    # stacks available to build or deploy from.
-    for ancestor in Path(stack_file_path).parents:
-        if ancestor.joinpath(constants.deployment_file_name).exists():
-            return True
-        if ancestor == search_path:
-            break
-    return False
-
-
 def locate_stacks_beneath(search_path=get_dev_root_path()):
-    stacks = []
-    if search_path.exists():
-        for path in search_path.rglob("stack.yml"):
-            if _is_deployment_stack_copy(path, search_path):
-                continue
-            stacks.append(Stack().init_from_file(path))
-
-    return stacks
+    return [Stack().init_from_file(entry.file_path) for entry in stack_index.stacks_beneath(search_path)]
 
 
 def locate_single_stack(stack_name, search_path=get_dev_root_path(), fail_on_multiple=True, fail_on_none=True):
-    stacks = locate_stacks_beneath(search_path)
-    candidates = [s for s in stacks if s.name == stack_name]
+    # Matched by name in the index, so that only the stack found is parsed.
+    candidates = [e for e in stack_index.stacks_beneath(search_path) if e.name == stack_name]
     if len(candidates) == 1:
-        return candidates[0]
+        return Stack().init_from_file(candidates[0].file_path)
     elif len(candidates) > 1:
         candidate_paths = ", ".join(str(s.file_path.parent) for s in candidates)
         if fail_on_multiple:
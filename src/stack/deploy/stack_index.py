@@ -0,0 +1,228 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""An on-disk index of the stacks beneath a directory, kept up to date incrementally.
+
+Finding a stack by name used to walk every file beneath the dev root looking for
+stack.yml, then parse each one found -- and parsing a stack means finding its git
+checkout and reading its remote, several GitPython calls apiece.  With hundreds of
+repos in the dev root that took seconds, and resolving a name, listing stacks and
+registering stack subcommands each paid it.
+
+The index records, per directory walked, its mtime, whether it holds a stack.yml or a
+deployment.yml, and its subdirectories; and per stack found, its name, repo, required
+stacks and subcommand files.  Bringing it up to date costs a stat() per directory: a
+directory is listed again only when its mtime moves (an entry was added, removed or
+renamed in it), and a stack is parsed again only when its stack.yml, its subcommands
+directory, or its checkout's HEAD or git config changes.
+
+`.git` directories and the dev root's own cache are not walked.  The index lives
+beneath the dev root (.stack-cache/stack-index.json), and can be turned off with the
+`stack-index` config setting.
+"""
+
+import json
+import os
+import threading
+import time
+
+from pathlib import Path
+
+from stack import constants
+from stack.config.util import get_config_setting, get_dev_root_path
+from stack.log import log_debug
+
+INDEX_FILE_NAME = "stack-index.json"
+INDEX_VERSION = 1
+SKIPPED_DIR_NAMES = {".git", constants.cache_dir_name}
+SUBCOMMANDS_DIR_NAME = "subcommands"
+
+_lock = threading.Lock()
+_index = None
+
+
+class StackIndexEntry:
+    """What the index knows of one stack, enough to find it without parsing it."""
+
+    def __init__(self, file_path, name, repo_ref=None, required_stacks=None, subcommand_files=None):
+        self.file_path = Path(file_path)
+        self.name = name
+        self.repo_ref = repo_ref
+        self.required_stacks = required_stacks or []
+        self.subcommand_files = subcommand_files or []
+
+    def __repr__(self):
+        return f"StackIndexEntry({self.name}, {self.file_path})"
+
+
+def index_enabled():
+    return bool(get_config_setting("stack-index", True))
+
+
+def _index_file_path():
+    return get_dev_root_path().joinpath(constants.cache_dir_name, INDEX_FILE_NAME)
+
+
+def _load():
+    global _index
+    if _index is None:
+        _index = {}
+        index_file = _index_file_path()
+        if index_file.exists():
+            try:
+                loaded = json.loads(index_file.read_text())
+                if loaded.get("version") == INDEX_VERSION:
+                    _index = loaded.get("roots", {})
+            except (OSError, ValueError, AttributeError):
+                log_debug(f"Ignoring unreadable stack index {index_file}")
+    return _index
+
+
+def _save():
+    index_file = _index_file_path()
+    try:
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so that concurrent runs never see a torn file.
+        tmp_file = index_file.with_name(f"{index_file.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp_file.write_text(json.dumps({"version": INDEX_VERSION, "roots": _index}))
+        os.replace(tmp_file, index_file)
+    except OSError as e:
+        log_debug(f"Unable to write stack index {index_file}: {e}")
+
+
+def _list_dir(path, st):
+    subdirs = []
+    has_stack = has_deployment = False
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name == constants.stack_file_name:
+                has_stack = entry.is_file()
+            elif entry.name == constants.deployment_file_name:
+                has_deployment = True
+            elif entry.name not in SKIPPED_DIR_NAMES and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+    # A directory changed this recently might change again within the same mtime tick,
+    # unseen: it is listed afresh next time rather than trusted.
+    mtime = st.st_mtime_ns if st.st_mtime_ns < time.time_ns() - constants.racy_window_ns else None
+    return [mtime, has_stack, has_deployment, sorted(subdirs)]
+
+
+def _walk(search_path: Path, old_dirs, new_dirs):
+    """The stack files beneath search_path, in a stable order, less deployment copies."""
+    stack_files = []
+    pending = [(str(search_path), False)]
+    while pending:
+        path, in_deployment = pending.pop()
+        try:
+            st = os.stat(path)
+            cached = old_dirs.get(path)
+            if cached and cached[0] is not None and cached[0] == st.st_mtime_ns:
+                listing = cached
+            else:
+                listing = _list_dir(path, st)
+        except OSError:
+            continue
+        new_dirs[path] = listing
+        _, has_stack, has_deployment, subdirs = listing
+        # A deployment directory holds a copy of its stack's files beside its
+        # deployment.yml; that copy belongs to the deployment, not to the set of
+        # stacks available to build or deploy from.
+        in_deployment = in_deployment or has_deployment
+        if has_stack and not in_deployment:
+            stack_files.append(os.path.join(path, constants.stack_file_name))
+        pending.extend((os.path.join(path, d), in_deployment) for d in reversed(subdirs))
+    return stack_files
+
+
+def _checkout_stamp(stack_dir):
+    # What the stack's repo ref is read from: the checkout's HEAD and its config.
+    for directory in [stack_dir] + list(Path(stack_dir).parents):
+        dot_git = Path(directory).joinpath(".git")
+        try:
+            if dot_git.is_dir():
+                return [str(directory), dot_git.joinpath("HEAD").read_text().strip(),
+                        dot_git.joinpath("config").stat().st_mtime_ns]
+            if dot_git.is_file():
+                return [str(directory), dot_git.read_text().strip(), dot_git.stat().st_mtime_ns]
+        except OSError:
+            return None
+    return None
+
+
+def _stack_stamp(stack_file):
+    stack_dir = os.path.dirname(stack_file)
+    st = os.stat(stack_file)
+    try:
+        subcommands_mtime = os.stat(os.path.join(stack_dir, SUBCOMMANDS_DIR_NAME)).st_mtime_ns
+    except OSError:
+        subcommands_mtime = None
+    return [st.st_mtime_ns, st.st_size, subcommands_mtime, _checkout_stamp(stack_dir)]
+
+
+def _describe(stack_file):
+    # Here, not at the top: stack.py uses this module to find stacks.
+    from stack.deploy.stack import Stack
+
+    stack = Stack().init_from_file(Path(stack_file))
+    subcommands_dir = Path(stack_file).parent.joinpath(SUBCOMMANDS_DIR_NAME)
+    subcommand_files = []
+    if subcommands_dir.is_dir():
+        subcommand_files = sorted(f for f in os.listdir(subcommands_dir) if f.endswith(".py") and f != "__init__.py")
+    return {
+        "name": stack.name,
+        "repo_ref": stack.get_repo_ref(),
+        "required_stacks": json.loads(json.dumps(stack.get_required_stacks() or [])),
+        "subcommand_files": subcommand_files,
+    }
+
+
+def stacks_beneath(search_path) -> list:
+    """A StackIndexEntry for every stack beneath search_path, bringing the index up to date."""
+    search_path = Path(search_path).absolute()
+    if not search_path.exists():
+        return []
+    enabled = index_enabled()
+    with _lock:
+        root = _load().get(str(search_path), {}) if enabled else {}
+        old_dirs, old_stacks = root.get("dirs", {}), root.get("stacks", {})
+        new_dirs, new_stacks = {}, {}
+        changed = False
+        entries = []
+        for stack_file in _walk(search_path, old_dirs, new_dirs):
+            try:
+                stamp = _stack_stamp(stack_file)
+            except OSError:
+                continue
+            cached = old_stacks.get(stack_file)
+            if cached and cached["stamp"] == stamp:
+                described = cached
+            else:
+                log_debug(f"Indexing stack {stack_file}")
+                described = dict(_describe(stack_file), stamp=stamp)
+                changed = True
+            new_stacks[stack_file] = described
+            entries.append(StackIndexEntry(stack_file, described["name"], described["repo_ref"],
+                                           described["required_stacks"], described["subcommand_files"]))
+        if enabled and (changed or new_dirs != old_dirs or new_stacks.keys() != old_stacks.keys()):
+            _index[str(search_path)] = {"dirs": new_dirs, "stacks": new_stacks}
+            _save()
+    return entries
+
+
+def clear():
+    """Forget the in-memory copy, so that the next lookup reads the file again."""
+    global _index
+    with _lock:
+        _index = None
@@ -18,23 +18,9 @@ import click
 import os
 
 from stack.opts import opts
-from stack import update
-from stack import validate
-from stack import version
-
-from stack.build import build, prepare
-from stack.chart import chart
-from stack.checklist import list_stack, checklist
 from stack.cli_util import StackCLI
 from stack.command_types import CommandOptions
-from stack.complete import complete
-from stack.config import config
 from stack.config.util import get_config_setting
-from stack.deploy import deployment
-from stack.deploy import deployment_create
-from stack.init import init
-from stack.repos import fetch
-from stack.webapp import webapp
 
 from stack.log import LOG_LEVELS
 
@@ -85,18 +71,20 @@ def cli(ctx, profile, quiet, verbose, log_file, dry_run, debug, log_timestamps,
         os.environ["STACK_LOG_LEVEL"] = str(command_options.log_level)
 
 
-cli.add_command(build.command, "build")
-cli.add_command(chart.command, "chart")
-cli.add_command(checklist.command, "check")
-cli.add_command(complete.command, "complete")
-cli.add_command(config.command, "config")
-cli.add_command(deployment_create.create, "deploy")
-cli.add_command(fetch.command, "fetch")
-cli.add_command(init.command, "init")
-cli.add_command(list_stack.command, "list")
-cli.add_command(deployment.command, "manage")
-cli.add_command(prepare.command, "prepare")
-cli.add_command(update.command, "update")
-cli.add_command(validate.command, "validate")
-cli.add_command(version.command, "version")
-cli.add_command(webapp.command, "webapp")
+# Each command's module is imported only when that command is looked up, so that
+# `stack version` does not pay for the kubernetes client, GitPython and the rest.
+cli.add_lazy_command("build", "stack.build.build:command")
+cli.add_lazy_command("chart", "stack.chart.chart:command")
+cli.add_lazy_command("check", "stack.checklist.checklist:command")
+cli.add_lazy_command("complete", "stack.complete.complete:command")
+cli.add_lazy_command("config", "stack.config.config:command")
+cli.add_lazy_command("deploy", "stack.deploy.deployment_create:create")
+cli.add_lazy_command("fetch", "stack.repos.fetch:command")
+cli.add_lazy_command("init", "stack.init.init:command")
+cli.add_lazy_command("list", "stack.checklist.list_stack:command")
+cli.add_lazy_command("manage", "stack.deploy.deployment:command")
+cli.add_lazy_command("prepare", "stack.build.prepare:command")
+cli.add_lazy_command("update", "stack.update:command")
+cli.add_lazy_command("validate", "stack.validate:command")
+cli.add_lazy_command("version", "stack.version:command")
+cli.add_lazy_command("webapp", "stack.webapp.webapp:command")
@@ -0,0 +1,170 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""What state a git checkout is in, read from its git dir without running git.
+
+Running git costs a process per question, and callers that ask about many checkouts on
+every run -- the image identity cache, the cached repo metadata -- only need to know
+whether a checkout has changed since they last looked.  These read the git dir's files
+directly: which commit HEAD names, the paths in the index, and a digest of the two with
+the stat() of every tracked file.
+"""
+
+import hashlib
+import os
+import struct
+import time
+
+from pathlib import Path
+
+from stack import constants
+
+
+def git_dir_for(repo_path: Path):
+    """The git dir of the checkout at repo_path, following a `.git` file; None if there is none."""
+    dot_git = repo_path.joinpath(".git")
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        # A linked worktree or a submodule: ".git" names the real git dir.
+        content = dot_git.read_text().strip()
+        if content.startswith("gitdir:"):
+            git_dir = Path(content[len("gitdir:"):].strip())
+            if not git_dir.is_absolute():
+                git_dir = repo_path.joinpath(git_dir)
+            if git_dir.is_dir():
+                return git_dir
+    return None
+
+
+def common_dir_for(git_dir: Path):
+    commondir_file = git_dir.joinpath("commondir")
+    if commondir_file.exists():
+        common = Path(commondir_file.read_text().strip())
+        return common if common.is_absolute() else git_dir.joinpath(common)
+    return git_dir
+
+
+def resolve_head(git_dir: Path):
+    """The commit HEAD names, read from the ref files without running git."""
+    head = git_dir.joinpath("HEAD").read_text().strip()
+    if not head.startswith("ref:"):
+        return head
+    ref = head[len("ref:"):].strip()
+    common_dir = common_dir_for(git_dir)
+    for base in [git_dir, common_dir]:
+        ref_file = base.joinpath(ref)
+        if ref_file.is_file():
+            return ref_file.read_text().strip()
+    packed_refs = common_dir.joinpath("packed-refs")
+    if packed_refs.exists():
+        for line in packed_refs.read_text().splitlines():
+            parts = line.split(" ", 1)
+            if len(parts) == 2 and parts[1] == ref:
+                return parts[0]
+    # An unborn branch: no commit, so no version either.
+    return None
+
+
+def _read_varint(data, pos):
+    # The offset encoding git uses for index v4 path-prefix lengths.
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def read_index_paths(index_path: Path):
+    """The paths of the entries in a git index file, or None if it cannot be read.
+
+    Handles index versions 2 through 4.  Unmerged (conflicted) entries make the answer
+    None: the checkout is mid-merge, and not worth caching anything about."""
+    data = index_path.read_bytes()
+    if len(data) < 12 or data[:4] != b"DIRC":
+        return None
+    version, count = struct.unpack(">II", data[4:12])
+    if version not in (2, 3, 4):
+        return None
+
+    paths = []
+    previous = b""
+    pos = 12
+    for _ in range(count):
+        entry_start = pos
+        flags = struct.unpack(">H", data[pos + 60:pos + 62])[0]
+        if flags & 0x3000:
+            return None
+        pos += 62
+        if version >= 3 and flags & 0x4000:
+            pos += 2
+        if version == 4:
+            strip, pos = _read_varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = previous[:len(previous) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            # Entries are NUL-padded to a multiple of eight bytes.
+            pos = entry_start + ((end - entry_start) // 8 + 1) * 8
+        previous = name
+        paths.append(name.decode("utf-8", errors="surrogateescape"))
+    return paths
+
+
+def repo_state_key(repo_path):
+    """A digest that changes whenever the version of the checkout at repo_path could.
+
+    Untracked files are not part of it, as they do not make a checkout dirty to git.  None
+    when it cannot be computed without git -- an index version or layout this does not
+    understand, unmerged entries -- or when a tracked file is within the racy window of
+    being modified."""
+    try:
+        repo_path = Path(repo_path).absolute()
+        git_dir = git_dir_for(repo_path)
+        if not git_dir:
+            return None
+        head = resolve_head(git_dir)
+        if not head:
+            return None
+        index_path = git_dir.joinpath("index")
+        if not index_path.exists():
+            return None
+        index_stat = index_path.stat()
+        paths = read_index_paths(index_path)
+        if paths is None:
+            return None
+    except (OSError, ValueError, struct.error, IndexError):
+        return None
+
+    # Not keyed until the checkout has settled.
+    racy_after = time.time_ns() - constants.racy_window_ns
+    m = hashlib.sha1()
+    m.update(f"{repo_path}\0{head}\0{index_stat.st_size}:{index_stat.st_mtime_ns}\0".encode())
+    for path in paths:
+        m.update(path.encode("utf-8", errors="surrogateescape"))
+        try:
+            st = os.lstat(repo_path.joinpath(path))
+        except OSError:
+            m.update(b"\0-\0")
+            continue
+        if st.st_mtime_ns > racy_after:
+            return None
+        m.update(f"\0{st.st_mtime_ns}:{st.st_size}:{st.st_mode}:{st.st_ino}\0".encode())
+    return m.hexdigest()
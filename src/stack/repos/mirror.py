@@ -0,0 +1,161 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Cheaper clones for the dev root: a shared object mirror, and partial clones.
+
+By default a repo is cloned the plain way, complete history and all.  Two settings
+change that:
+
+`git-mirror`: each repo is first mirrored, bare, beneath the dev root
+(.stack-cache/git-mirrors/<host>/<path>.git), and checkouts are cloned from the mirror
+with `--shared`, so that their objects are the mirror's (through .git/objects/info/
+alternates) rather than copies.  The mirror is brought up to date with one fetch per run;
+a second checkout of the same repo -- another deployment, another CI workspace on the
+same machine -- then costs neither network nor disk.  Each checkout's origin still names
+the real remote, so a later pull goes there as it always did.  Since checkouts borrow
+the mirror's objects, the mirror is never garbage collected, and must not be deleted
+while checkouts made from it exist.
+
+`git-partial-clone`: clones are made with `--filter=blob:none`, so only the blobs a
+checkout needs are transferred; and a repo wanted only at a pinned commit (a ref of the
+form org/repo@<full hash>, as container.lock and embedded pins produce) is fetched at
+depth one, that commit alone.  A checkout made so that later needs another commit gets
+it fetched on demand (see ensure_commit()).
+"""
+
+import shutil
+import string
+import threading
+
+import git
+
+from git.exc import GitCommandError
+from pathlib import Path
+
+from stack import constants
+from stack.config.util import get_config_setting, get_dev_root_path
+from stack.log import log_debug, log_info
+
+MIRROR_DIR_NAME = "git-mirrors"
+
+_locks = {}
+_locks_guard = threading.Lock()
+# Mirrors already brought up to date in this run.
+_updated = set()
+
+
+def mirror_enabled():
+    return bool(get_config_setting("git-mirror", False))
+
+
+def partial_clone_enabled():
+    return bool(get_config_setting("git-partial-clone", False))
+
+
+def is_commit_hash(ref):
+    return bool(ref) and len(ref) == 40 and all(c in string.hexdigits for c in ref)
+
+
+def mirror_path_for(repo_host, repo_path):
+    return get_dev_root_path().joinpath(constants.cache_dir_name, MIRROR_DIR_NAME, repo_host, f"{repo_path}.git")
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(str(path), threading.Lock())
+
+
+def _has_commit(repo: git.Repo, commit):
+    try:
+        repo.git.cat_file("-e", f"{commit}^{{commit}}")
+        return True
+    except GitCommandError:
+        return False
+
+
+def update_mirror(remote_url, mirror_path: Path, commit=None, progress=None):
+    """Create or refresh the mirror of remote_url, making sure it holds `commit` if given."""
+    with _lock_for(mirror_path):
+        if not mirror_path.exists():
+            log_info(f"Creating mirror of {remote_url} in {mirror_path}")
+            mirror_path.parent.mkdir(parents=True, exist_ok=True)
+            mirror = git.Repo.clone_from(remote_url, mirror_path, mirror=True, progress=progress)
+            with mirror.config_writer() as config:
+                # Checkouts borrow these objects: none may ever be pruned out from under them.
+                config.set_value("gc", "auto", "0")
+                config.set_value("gc", "pruneExpire", "never")
+            _updated.add(str(mirror_path))
+        else:
+            mirror = git.Repo(mirror_path)
+            if str(mirror_path) not in _updated:
+                log_debug(f"Updating mirror {mirror_path}")
+                mirror.git.remote("set-url", "origin", remote_url)
+                mirror.git.fetch("origin", "--prune", "--tags")
+                _updated.add(str(mirror_path))
+        if commit and not _has_commit(mirror, commit):
+            # Not reachable from any of the remote's refs: ask for it by name.
+            mirror.git.fetch("origin", commit)
+    return mirror_path
+
+
+def _shallow_clone_commit(remote_url, fs_path: Path, commit):
+    repo = git.Repo.init(fs_path)
+    repo.create_remote("origin", remote_url)
+    repo.git.fetch("origin", commit, depth=1)
+    repo.git.checkout(commit)
+
+
+def clone_repo(remote_url, fs_path: Path, repo_host, repo_path, ref=None, progress=None):
+    """Clone remote_url into fs_path, through the mirror or partially when so configured.
+
+    `ref` is the branch, tag or commit wanted; only a full commit hash changes how the
+    clone is made.  The caller checks out `ref` afterwards, as for any clone."""
+    commit = ref if is_commit_hash(ref) else None
+
+    if mirror_enabled():
+        mirror_path = update_mirror(remote_url, mirror_path_for(repo_host, repo_path), commit, progress)
+        repo = git.Repo.clone_from(str(mirror_path), fs_path, shared=True)
+        repo.git.remote("set-url", "origin", remote_url)
+        return repo
+
+    if partial_clone_enabled():
+        if commit:
+            try:
+                log_debug(f"Fetching only {commit} of {remote_url}")
+                _shallow_clone_commit(remote_url, fs_path, commit)
+                return git.Repo(fs_path)
+            except GitCommandError as e:
+                # Not every server will serve a commit by hash; fall back to a clone.
+                log_debug(f"Shallow fetch of {commit} failed, cloning instead: {e}")
+                shutil.rmtree(fs_path, ignore_errors=True)
+        return git.Repo.clone_from(remote_url, fs_path, progress=progress, filter="blob:none")
+
+    return git.Repo.clone_from(remote_url, fs_path, progress=progress)
+
+
+def ensure_commit(repo: git.Repo, ref):
+    """Make `ref` available for checkout in a shallow checkout, fetching it if need be."""
+    if not repo.git.rev_parse("--is-shallow-repository") == "true":
+        return
+    if is_commit_hash(ref):
+        if not _has_commit(repo, ref):
+            repo.git.fetch("origin", ref, depth=1)
+        return
+    try:
+        repo.git.rev_parse("--verify", f"{ref}^{{commit}}")
+    except GitCommandError:
+        # A branch or tag, where the checkout held only a commit: it needs the history now.
+        log_info(f"Fetching full history of {repo.working_dir} for {ref}")
+        repo.git.fetch("origin", "--unshallow", "--tags")
@@ -0,0 +1,133 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""What stack reads of a git checkout -- remote URL, HEAD, branch, dirtiness -- read once.
+
+A stack's repo ref, a container's recipe repo and a wrapper's repo are looked up
+inside the per-container loops of check, fetch and prepare, and each lookup used to
+open the checkout with GitPython again: a config parse for the remote, a `git` process
+for the HEAD or branch, a `git diff` for dirtiness.  Here each answer is kept for the
+life of the process, per checkout.
+
+Each answer is kept together with a stamp read without running git, and is read again
+when the stamp moves: the git config's mtime for the remote, HEAD and the ref it names
+for the HEAD and branch, and the checkout's state key (see build/identity_cache.py)
+for dirtiness -- so an edit made in the process, such as writing a lock file, is seen.
+A checkout whose state cannot be keyed that way has its dirtiness read every time.
+
+process_repo() calls invalidate() for a checkout it has cloned, pulled or switched.
+"""
+
+import threading
+
+import git
+
+from pathlib import Path
+
+from stack.repos.git_state import common_dir_for, git_dir_for, repo_state_key, resolve_head
+
+UNSTAMPED = object()
+
+_lock = threading.Lock()
+# checkout path -> field -> (stamp, value)
+_metadata = {}
+
+
+def _key(repo_path):
+    return str(Path(repo_path).absolute())
+
+
+def _cached(repo_path, field, stamp, read):
+    key = _key(repo_path)
+    if stamp is not UNSTAMPED:
+        with _lock:
+            cached = _metadata.get(key, {}).get(field)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    value = read()
+    if stamp is not UNSTAMPED:
+        with _lock:
+            _metadata.setdefault(key, {})[field] = (stamp, value)
+    return value
+
+
+def _config_stamp(repo_path):
+    try:
+        git_dir = git_dir_for(Path(repo_path).absolute())
+        return common_dir_for(git_dir).joinpath("config").stat().st_mtime_ns if git_dir else UNSTAMPED
+    except OSError:
+        return UNSTAMPED
+
+
+def _head_stamp(repo_path):
+    try:
+        git_dir = git_dir_for(Path(repo_path).absolute())
+        if not git_dir:
+            return UNSTAMPED
+        return git_dir.joinpath("HEAD").read_text().strip(), resolve_head(git_dir)
+    except OSError:
+        return UNSTAMPED
+
+
+def _state_stamp(repo_path):
+    state = repo_state_key(repo_path)
+    return UNSTAMPED if state is None else state
+
+
+def remote_url(repo_path):
+    """The URL of the checkout's first remote, or None if it has none."""
+
+    def read():
+        remotes = git.Repo(repo_path).remotes
+        return remotes[0].url if remotes else None
+
+    return _cached(repo_path, "remote_url", _config_stamp(repo_path), read)
+
+
+def head_hash(repo_path):
+    return _cached(repo_path, "head", _head_stamp(repo_path), lambda: git.Repo(repo_path).head.object.hexsha)
+
+
+def is_dirty(repo_path):
+    return _cached(repo_path, "dirty", _state_stamp(repo_path), lambda: git.Repo(repo_path).is_dirty())
+
+
+def branch_or_tag(repo_path):
+    """(name, is_branch): the checked-out branch; else a tag exactly at HEAD; else HEAD's hash."""
+
+    def read():
+        repo = git.Repo(repo_path)
+        try:
+            return repo.active_branch.name, True
+        except TypeError:
+            # This means that the current ref is not a branch, so possibly a tag
+            try:
+                # Note that git is asymmetric -- the tag you told it to check out may not be the one
+                # you get back here (if there are multiple tags associated with the same commit)
+                return repo.git.describe("--tags", "--exact-match"), False
+            except git.GitCommandError:
+                # If there is no matching branch or tag checked out, just use the current SHA
+                return repo.commit("HEAD").hexsha, False
+
+    return _cached(repo_path, "branch", _head_stamp(repo_path), read)
+
+
+def invalidate(repo_path=None):
+    """Forget what was read of the checkout at repo_path, or of every checkout."""
+    with _lock:
+        if repo_path is None:
+            _metadata.clear()
+        else:
+            _metadata.pop(_key(repo_path), None)
@@ -17,7 +17,10 @@
 import git
 import hashlib
 import os
+import queue
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from git.exc import GitCommandError
 from pathlib import Path
 from tqdm import tqdm
@@ -26,22 +29,54 @@ import stack.deploy.stack as stack_util
 
 from stack import constants
 from stack.build import build_util
-from stack.config.util import get_dev_root_path
-from stack.log import log_debug, log_info, get_log_file, is_info_enabled, log_is_console
+from stack.build.identity_cache import cached_repo_version
+from stack.config.util import get_config_setting, get_dev_root_path
+from stack.log import log_debug, log_error, log_info, get_log_file, is_info_enabled, log_is_console
 from stack.opts import opts
+from stack.repos import repo_metadata
+from stack.repos.mirror import clone_repo, ensure_commit
 from stack.util import include_exclude_check, error_exit
 
 
+_repo_locks = {}
+_repo_locks_guard = threading.Lock()
+
+
+def repo_lock(fs_path):
+    """The lock serializing work on one checkout, for callers that fetch repos concurrently.
+
+    Re-entrant, so that a caller holding it across its own check-then-fetch can still
+    call process_repo(), which takes it too."""
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(str(Path(fs_path).absolute()), threading.RLock())
+
+
+# Which line of a multi-repo fetch display the current worker thread draws its bar on.
+_progress_slot = threading.local()
+
+
 class GitProgress(git.RemoteProgress):
-    def __init__(self):
+    def __init__(self, desc=None, position=None):
         super().__init__()
-        self.pbar = tqdm(unit="B", ascii=True, unit_scale=True, file=get_log_file())
+        # A bar on a shared display is cleared when its repo is done, leaving the line to the next.
+        self.pbar = tqdm(unit="B", ascii=True, unit_scale=True, file=get_log_file(), desc=desc, position=position,
+                         leave=position is None)
 
     def update(self, op_code, cur_count, max_count=None, message=""):
         self.pbar.total = max_count
         self.pbar.n = cur_count
         self.pbar.refresh()
 
+    def close(self):
+        self.pbar.close()
+
+
+def _git_progress(repo_path):
+    if not (log_is_console() and is_info_enabled()):
+        return None
+    position = getattr(_progress_slot, "position", None)
+    return GitProgress(desc=repo_path if position is not None else None, position=position)
+
 
 def branch_strip(s):
     return str(s).split("@")[0]
@@ -92,14 +127,14 @@ def get_repo_current_hash(path):
     if not is_git_repo(path):
         return None
 
-    return git.Repo(path).head.object.hexsha
+    return repo_metadata.head_hash(path)
 
 
 def is_repo_dirty(path):
     if not is_git_repo(path):
         return None
 
-    return git.Repo(path).is_dirty()
+    return repo_metadata.is_dirty(path)
 
 
 def hash_dirty_files(path):
@@ -130,6 +165,13 @@ def find_repo_root(path):
 
 
 def get_container_tag_for_repo(path):
+    """The repo's HEAD hash when clean, a stackdev- hash of HEAD and the diff when not.
+
+    Cached across runs on the state of the checkout; see build/identity_cache.py."""
+    return cached_repo_version("container-tag", path, lambda: _container_tag_for_repo(path))
+
+
+def _container_tag_for_repo(path):
     tag = None
     git_hash = get_repo_current_hash(path)
     if git_hash:
@@ -142,22 +184,7 @@ def get_container_tag_for_repo(path):
 
 # See: https://stackoverflow.com/questions/18659425/get-git-current-branch-tag-name
 def _get_repo_current_branch_or_tag(full_filesystem_repo_path):
-    current_repo_branch_or_tag = "***UNDETERMINED***"
-    is_branch = False
-    try:
-        current_repo_branch_or_tag = git.Repo(full_filesystem_repo_path).active_branch.name
-        is_branch = True
-    except TypeError:
-        # This means that the current ref is not a branch, so possibly a tag
-        # Let's try to get the tag
-        try:
-            current_repo_branch_or_tag = git.Repo(full_filesystem_repo_path).git.describe("--tags", "--exact-match")
-            # Note that git is asymmetric -- the tag you told it to check out may not be the one
-            # you get back here (if there are multiple tags associated with the same commit)
-        except GitCommandError:
-            # If there is no matching branch or tag checked out, just use the current SHA
-            current_repo_branch_or_tag = git.Repo(full_filesystem_repo_path).commit("HEAD").hexsha
-    return current_repo_branch_or_tag, is_branch
+    return repo_metadata.branch_or_tag(full_filesystem_repo_path)
 
 
 def fs_path_for_repo(fully_qualified_repo, dev_root_path=get_dev_root_path()):
@@ -169,6 +196,18 @@ def fs_path_for_repo(fully_qualified_repo, dev_root_path=get_dev_root_path()):
 
 # TODO: fix the messy arg list here
 def process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully_qualified_repo):
+    repo_fs_path = fs_path_for_repo(fully_qualified_repo, dev_root_path)
+    if not repo_fs_path:
+        return _process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully_qualified_repo)
+    with repo_lock(repo_fs_path):
+        try:
+            return _process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully_qualified_repo)
+        finally:
+            # Cloned, pulled or switched: what was read of the checkout may no longer hold.
+            repo_metadata.invalidate(repo_fs_path)
+
+
+def _process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully_qualified_repo):
     log_debug(f"Processing repo: {fully_qualified_repo}")
     repo_host, repo_path, repo_branch = host_and_path_for_repo(fully_qualified_repo)
     if not repo_host or not repo_path:
@@ -200,7 +239,12 @@ def process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully
                     if is_branch:
                         git_repo = git.Repo(full_filesystem_repo_path)
                         origin = git_repo.remotes.origin
-                        origin.pull(progress=GitProgress() if log_is_console() and is_info_enabled() else None)
+                        progress = _git_progress(repo_path)
+                        try:
+                            origin.pull(progress=progress)
+                        finally:
+                            if progress:
+                                progress.close()
                     else:
                         log_info("skipping pull because this repo is not on a branch")
                 else:
@@ -209,11 +253,12 @@ def process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully
         # Clone
         log_info(f"Running git clone for {full_github_repo_path} into {full_filesystem_repo_path}")
         if not opts.o.dry_run:
-            git.Repo.clone_from(
-                full_github_repo_path,
-                full_filesystem_repo_path,
-                progress=GitProgress() if log_is_console() and is_info_enabled() else None,
-            )
+            progress = _git_progress(repo_path)
+            try:
+                clone_repo(full_github_repo_path, full_filesystem_repo_path, repo_host, repo_path, repo_branch, progress)
+            finally:
+                if progress:
+                    progress.close()
         else:
             log_info("(git clone skipped)")
     # Checkout the requested branch, if one was specified
@@ -235,6 +280,7 @@ def process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, fully
         ):
             log_debug(f"switching to branch {branch_to_checkout} in repo {repo_path}")
             git_repo = git.Repo(full_filesystem_repo_path)
+            ensure_commit(git_repo, branch_to_checkout)
             # git checkout works for both branches and tags
             git_repo.git.checkout(branch_to_checkout)
         else:
@@ -257,32 +303,78 @@ def parse_branches(branches_string):
         return None
 
 
-def clone_all_repos_for_stack(stack, include=None, exclude=None, pull=False, git_ssh=None):
+def fetch_repos(repos, pull, git_ssh, dev_root_path, jobs=1):
+    """Clone or pull each repo, up to `jobs` at once.
+
+    Returns ({repo: fs path}, {repo: error}).  A failure does not stop the others: on a
+    cold checkout it is more useful to hear about every unreachable repo at once than to
+    fix them one run at a time."""
+    fetched = {}
+    errors = {}
+    jobs = max(1, min(int(jobs or 1), len(repos)))
+    slots = queue.Queue()
+    for position in range(jobs):
+        slots.put(position)
+
+    def fetch(repo):
+        position = slots.get()
+        # With one worker there is one bar at a time, drawn as it always was.
+        _progress_slot.position = position if jobs > 1 else None
+        try:
+            return process_repo(pull, False, git_ssh, dev_root_path, None, repo)
+        finally:
+            _progress_slot.position = None
+            slots.put(position)
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="stack-fetch") as pool:
+        futures = {repo: pool.submit(fetch, repo) for repo in repos}
+        for repo, future in futures.items():
+            try:
+                fetched[repo] = future.result()
+            except GitCommandError as error:
+                errors[repo] = error
+    return fetched, errors
+
+
+def _report_fetch_errors(errors):
+    if errors:
+        for repo, error in errors.items():
+            log_error(f"\n******* git command for {repo} returned error exit status:\n{error}")
+        error_exit(f"Unable to fetch {len(errors)} repo(s): {', '.join(errors.keys())}")
+
+
+def clone_all_repos_for_stack(stack, include=None, exclude=None, pull=False, git_ssh=None, jobs=None):
+    """Clone or pull every repo the stack, and any stacks it requires, names.
+
+    Up to `jobs` repos are fetched at once; by default the `fetch-jobs` config setting."""
+    if jobs is None:
+        jobs = get_config_setting("fetch-jobs", 1)
     required_stacks = [stack]
     processed_repos = []
+    dev_root_path = get_dev_root_path()
+    log_debug(f"Dev Root is: {dev_root_path}")
+
+    if not os.path.isdir(dev_root_path):
+        log_debug("Dev root directory doesn't exist, creating")
+        os.makedirs(dev_root_path)
 
     if stack.is_super_stack():
         # Pre-pull child stacks so that we can load their parsed stack configs in the next step.
-        for req_stack in stack.get_required_stacks():
-            try:
-                ref = req_stack[constants.ref_key]
-                repo_fs_path = process_repo(pull, False, git_ssh, get_dev_root_path(), None, ref)
-                if repo_fs_path:
-                    processed_repos.append(repo_fs_path)
-            except git.exc.GitCommandError as error:
-                error_exit(f"\n******* git command returned error exit status:\n{error}")
+        child_stacks = stack.get_required_stacks()
+        fetched, errors = fetch_repos(list(dict.fromkeys(s[constants.ref_key] for s in child_stacks)),
+                                      pull, git_ssh, dev_root_path, jobs)
+        _report_fetch_errors(errors)
+        for req_stack in child_stacks:
+            repo_fs_path = fetched[req_stack[constants.ref_key]]
+            if repo_fs_path and repo_fs_path not in processed_repos:
+                processed_repos.append(repo_fs_path)
             required_stacks.append(repo_fs_path.joinpath(req_stack[constants.path_key]))
 
+    # Every stack's repos are gathered first, then fetched together.
+    repos = []
     for req_stack in required_stacks:
         req_stack = stack_util.get_parsed_stack_config(req_stack)
 
-        dev_root_path = get_dev_root_path()
-        log_debug(f"Dev Root is: {dev_root_path}")
-
-        if not os.path.isdir(dev_root_path):
-            log_debug("Dev root directory doesn't exist, creating")
-            os.makedirs(dev_root_path)
-
         # A stack loaded from a local checkout builds its colocated containers from that
         # checkout: its own repo is not cloned (it may not even be reachable, e.g. a
         # private repo in CI).
@@ -307,22 +399,18 @@ def clone_all_repos_for_stack(stack, include=None, exclude=None, pull=False, git
             log_debug(f"NOTE: stack {req_stack.name} does not define any repositories")
             continue
 
-        repos = []
         for repo in repos_in_scope:
-            if include_exclude_check(branch_strip(repo), include, exclude):
-                repos.append(repo)
-            else:
+            if not include_exclude_check(branch_strip(repo), include, exclude):
                 log_debug(f"Excluding: {repo}")
-
-        for repo in repos:
+                continue
             repo_fs_path = fs_path_for_repo(repo, dev_root_path)
             if repo_fs_path and repo_fs_path not in processed_repos:
-                try:
-                    process_repo(pull, False, git_ssh, dev_root_path, None, repo)
-                    processed_repos.append(repo_fs_path)
-                except git.exc.GitCommandError as error:
-                    error_exit(f"\n******* git command returned error exit status:\n{error}")
+                repos.append(repo)
+                processed_repos.append(repo_fs_path)
             else:
                 log_debug(f"Repo {repo} already processed")
 
+    _, errors = fetch_repos(repos, pull, git_ssh, dev_root_path, jobs)
+    _report_fetch_errors(errors)
+
     return processed_repos
@@ -0,0 +1,168 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""A bounded worker pool over a dependency graph of tasks.
+
+Some of stack's work is many slow, mostly independent steps -- the containers of
+`stack prepare`, the objects of a k8s deployment -- with a few ordering constraints
+between them: a wrapper's base image has to exist before a container wrapped by it is
+built, a PVC before the Deployment that mounts it.  Each step is a task here, and each
+constraint an edge between tasks.  Some edges are only discoverable part way through,
+so a running task may add further tasks, and dependencies on them, to the graph it is
+part of.
+
+Tasks are started in order of their `order` key (insertion order by default), so with a
+single worker the run is exactly the serial one: a task added by a running task and
+given that task's order runs before the next independent one is started.
+
+A task may belong to a named pool with its own limit, separate from the main one: the
+publishing of a finished image, say, which is network-bound and should overlap with the
+next container's build rather than take a build worker from it.
+
+The first failure stops the run: no further task is started, those already running are
+allowed to finish (a thread cannot be interrupted, and a half-finished `docker build`
+is worse than a finished one), and then the failure is re-raised in the caller.  That
+includes the SystemExit raised by error_exit(), so a worker reports an error exactly as
+the serial code did.
+"""
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from stack.log import log_debug, log_warn
+
+
+class _Task:
+    key: str
+    fn: callable
+    depends_on: list
+    order: tuple
+    pool: str
+
+    def __init__(self, key, fn, depends_on, order, pool):
+        self.key = key
+        self.fn = fn
+        self.depends_on = list(depends_on)
+        self.order = order
+        self.pool = pool
+
+
+class TaskScheduler:
+    jobs: int
+    pools: dict
+    thread_name_prefix: str
+
+    def __init__(self, jobs: int = 1, pools: dict = None, thread_name_prefix: str = "stack"):
+        self.thread_name_prefix = thread_name_prefix
+        self.jobs = max(1, int(jobs or 1))
+        self.pools = {name: max(1, int(limit or 1)) for name, limit in (pools or {}).items()}
+        self._tasks = {}
+        self._results = {}
+        self._started = set()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, fn, depends_on=(), order=None, pool: str = None):
+        """Add a task, unless one with the same key is already in the graph.
+
+        Adding an existing key is not an error: it is how several tasks share one
+        prerequisite (the first to need it adds it, the rest depend on it by key).
+        `pool` names one of the pools given at construction; by default a task runs in
+        the main one, of `jobs` workers."""
+        with self._lock:
+            if key in self._tasks:
+                return False
+            if pool is not None and pool not in self.pools:
+                raise ValueError(f"unknown pool {pool}")
+            if order is None:
+                order = (len(self._tasks),)
+            self._tasks[key] = _Task(key, fn, depends_on, order, pool)
+            return True
+
+    def _limit(self, pool):
+        return self.jobs if pool is None else self.pools[pool]
+
+    def depend(self, key: str, *depends_on):
+        """Add dependencies to a task that has not been started yet."""
+        with self._lock:
+            if key in self._started:
+                raise ValueError(f"task {key} has already been started")
+            self._tasks[key].depends_on.extend(depends_on)
+
+    def result(self, key: str):
+        """The return value of a finished task."""
+        with self._lock:
+            return self._results[key]
+
+    def _ready(self, done):
+        with self._lock:
+            ready = [t for t in self._tasks.values()
+                     if t.key not in self._started and all(d in done for d in t.depends_on)]
+        return sorted(ready, key=lambda t: t.order)
+
+    def _unstarted(self):
+        with self._lock:
+            return [t for t in self._tasks.values() if t.key not in self._started]
+
+    def run(self) -> dict:
+        """Run every task, returning {key: result} in the order the tasks were added."""
+        done = set()
+        failure = None
+        workers = self.jobs + sum(self.pools.values())
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.thread_name_prefix) as pool:
+            running = {}
+            running_in_pool = {}
+            while True:
+                if failure is None:
+                    for task in self._ready(done):
+                        if running_in_pool.get(task.pool, 0) >= self._limit(task.pool):
+                            continue
+                        with self._lock:
+                            self._started.add(task.key)
+                        log_debug(f"Starting task {task.key}")
+                        running[pool.submit(task.fn)] = task
+                        running_in_pool[task.pool] = running_in_pool.get(task.pool, 0) + 1
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    running_in_pool[task.pool] -= 1
+                    key = task.key
+                    exception = future.exception()
+                    if exception is not None:
+                        if failure is None:
+                            failure = exception
+                            if running:
+                                log_warn(f"WARN: {key} failed; waiting for {len(running)} running task(s) to finish.")
+                        continue
+                    with self._lock:
+                        self._results[key] = future.result()
+                    done.add(key)
+                    log_debug(f"Finished task {key}")
+
+        if failure is not None:
+            raise failure
+
+        stuck = self._unstarted()
+        if stuck:
+            # A dependency on a task that was never added, or a cycle.
+            details = ", ".join(f"{t.key} (waiting on {[d for d in t.depends_on if d not in done]})" for t in stuck)
+            raise RuntimeError(f"unsatisfiable task dependencies: {details}")
+
+        with self._lock:
+            return {key: self._results[key] for key in self._tasks}
@@ -17,6 +17,7 @@
 import os.path
 import asyncio
 import sys
+import threading
 import ruamel.yaml
 
 from pathlib import Path
@@ -219,6 +220,30 @@ def get_yaml():
     return yaml
 
 
+_yaml_readers = threading.local()
+
+
+def get_yaml_reader():
+    """A loader for YAML that is only read, never written back.
+
+    get_yaml() keeps every comment and quoting style so that a file can be rewritten
+    as it was, which costs far more than the parse itself, and builds a new instance
+    per call.  This one is shared (per thread: a YAML instance is not reentrant) and
+    safe-typed, producing plain dicts and lists; it uses libyaml's parser when
+    ruamel.yaml.clib is installed.  Files whose comments matter -- pod files, with
+    their @stack annotations -- or that are rewritten stay with get_yaml()."""
+    reader = getattr(_yaml_readers, "reader", None)
+    if reader is None:
+        reader = ruamel.yaml.YAML(typ="safe", pure=False)
+        _yaml_readers.reader = reader
+    return reader
+
+
+def read_yaml_file(file_path):
+    with open(file_path, "r") as f:
+        return get_yaml_reader().load(f)
+
+
 # TODO: this is fragile wrt to the subcommand depth
 # See also: https://github.com/pallets/click/issues/108
 def global_options(ctx):
@@ -32,6 +32,12 @@ def isolated_env(tmp_path):
     return env
 
 
+def run_git(repo, *args):
+    """Run git in repo, as a fixed test identity, returning its stripped stdout."""
+    return subprocess.run(["git", "-C", str(repo), "-c", "user.email=test@example.com", "-c", "user.name=test"] + list(args),
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
 def run_stack(args, env, cwd=None):
     """Run the stack CLI in a subprocess, returning CompletedProcess.
 
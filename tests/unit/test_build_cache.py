@@ -0,0 +1,143 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the --build-cache setting and the cache arguments derived from it.
+
+No build is run: these check what the build scripts are handed for each image, and the
+arguments build-base.sh turns that into, with a stand-in `docker` on the PATH.
+"""
+
+import os
+import subprocess
+
+from importlib import resources
+
+import pytest
+
+from stack.build import build_containers
+from stack.build.build_containers import _build_cache_args, build_cache_env, builder_exports_cache, parse_build_cache
+
+
+@pytest.fixture(autouse=True)
+def exporting_builder(monkeypatch):
+    monkeypatch.setattr(build_containers, "builder_exports_cache", lambda: True)
+
+
+def test_no_cache_by_default():
+    assert parse_build_cache(None) == (None, None)
+    assert build_cache_env(None, "ghcr.io/org", True) == {}
+    assert _build_cache_args("org/app", {}) == {}
+
+
+def test_registry_cache_follows_the_image_registry():
+    env = build_cache_env("registry", "ghcr.io/org", True)
+    args = _build_cache_args("org/app", env)
+    assert args["STACK_BUILD_CACHE_FROM"] == "type=registry,ref=ghcr.io/org/org/app:buildcache"
+    assert args["STACK_BUILD_CACHE_TO"] == "type=registry,ref=ghcr.io/org/org/app:buildcache,mode=max"
+    assert args["STACK_BUILD_CACHE_REPO"] == "ghcr.io/org/org/app-buildcache"
+    # Without a registry to put it in there is no cache.
+    assert build_cache_env("registry", None, True) == {}
+
+
+def test_registry_cache_is_only_written_when_publishing():
+    env = build_cache_env("registry:cache.example.com/stack", "ghcr.io/org", False)
+    args = _build_cache_args("org/app", env)
+    assert args["STACK_BUILD_CACHE_FROM"] == "type=registry,ref=cache.example.com/stack/org/app:buildcache"
+    assert "STACK_BUILD_CACHE_TO" not in args
+
+
+def test_local_cache(tmp_path):
+    env = build_cache_env(f"local:{tmp_path}", None, False)
+    args = _build_cache_args("org/app", env)
+    cache_dir = tmp_path / "org-app"
+    # Nothing to read from until the first build has written it.
+    assert "STACK_BUILD_CACHE_FROM" not in args
+    assert args["STACK_BUILD_CACHE_TO"] == f"type=local,dest={cache_dir},mode=max"
+    cache_dir.mkdir()
+    assert _build_cache_args("org/app", env)["STACK_BUILD_CACHE_FROM"] == f"type=local,src={cache_dir}"
+
+
+@pytest.mark.parametrize("value", ["s3", "local", "local:"])
+def test_invalid_setting(value):
+    with pytest.raises(SystemExit):
+        parse_build_cache(value)
+
+
+def test_no_cache_written_when_the_builder_cannot_export_one(monkeypatch, tmp_path):
+    monkeypatch.setattr(build_containers, "builder_exports_cache", lambda: False)
+    args = _build_cache_args("org/app", build_cache_env(f"local:{tmp_path}", None, True))
+    assert "STACK_BUILD_CACHE_TO" not in args
+
+
+@pytest.mark.parametrize("driver, driver_status, exports", [
+    ("docker", '[["Backing Filesystem","extfs"]]', False),
+    ("docker", '[["driver-type","io.containerd.snapshotter.v1"]]', True),
+    ("docker-container", "", True),
+])
+def test_builder_exports_cache(monkeypatch, driver, driver_status, exports):
+    def run(args, **kwargs):
+        stdout = f"Name: default\nDriver: {driver}\n" if args[1] == "buildx" else driver_status
+        return subprocess.CompletedProcess(args, 0, stdout, "")
+
+    monkeypatch.setattr(build_containers.subprocess, "run", run)
+    builder_exports_cache.cache_clear()
+    try:
+        assert builder_exports_cache() == exports
+    finally:
+        builder_exports_cache.cache_clear()
+
+
+def build_args(tmp_path, env, docker_version="Docker version 27.0.3"):
+    """The docker build arguments build-base.sh makes of env."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    docker = bin_dir / "docker"
+    docker.write_text(f"#!/bin/sh\necho '{docker_version}'\n")
+    docker.chmod(0o755)
+    build_base = resources.files("stack") / "data" / "container-build" / "build-base.sh"
+    result = subprocess.run(["bash", "-c", f"source {build_base} && echo $build_command_args"],
+                            env={"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}", **env},
+                            capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def test_build_args_for_a_registry_cache(tmp_path):
+    env = _build_cache_args("org/app", build_cache_env("registry", "ghcr.io/org", True))
+    ref = "ghcr.io/org/org/app:buildcache"
+    assert build_args(tmp_path, env) == ["--cache-from", f"type=registry,ref={ref}",
+                                         "--cache-to", f"type=registry,ref={ref},mode=max", "--load"]
+    read_only = _build_cache_args("org/app", build_cache_env("registry", "ghcr.io/org", False))
+    assert build_args(tmp_path, read_only) == ["--cache-from", f"type=registry,ref={ref}", "--load"]
+
+
+def test_build_args_for_a_local_cache(tmp_path):
+    cache = tmp_path / "cache"
+    (cache / "org-app").mkdir(parents=True)
+    env = _build_cache_args("org/app", build_cache_env(f"local:{cache}", None, False))
+    assert build_args(tmp_path, env) == ["--cache-from", f"type=local,src={cache / 'org-app'}",
+                                         "--cache-to", f"type=local,dest={cache / 'org-app'},mode=max", "--load"]
+
+
+def test_build_args_under_podman(tmp_path):
+    env = _build_cache_args("org/app", build_cache_env("registry", "ghcr.io/org", True))
+    repo = "ghcr.io/org/org/app-buildcache"
+    assert build_args(tmp_path, env, "podman version 5.0.0") == ["--layers", "--cache-from", repo, "--cache-to", repo]
+    # podman has no local cache export.
+    local = _build_cache_args("org/app", build_cache_env(f"local:{tmp_path}", None, True))
+    assert build_args(tmp_path, local, "podman version 5.0.0") == []
+
+
+def test_no_build_args_without_a_cache(tmp_path):
+    assert build_args(tmp_path, {}) == []
@@ -0,0 +1,85 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the per-phase timings report of a prepare run.
+
+The clock is faked, advancing only when told to, so that every duration is exact.
+"""
+
+import csv
+import json
+
+from stack.build.timings import RUN, BuildTimings
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _timed(timings, clock, subject, phase, seconds):
+    with timings.phase(subject, phase):
+        clock.advance(seconds)
+
+
+def _sample():
+    clock = _Clock()
+    timings = BuildTimings(clock)
+    _timed(timings, clock, RUN, "fetch", 4)
+    _timed(timings, clock, "app", "identity", 1)
+    _timed(timings, clock, "wrapper-base:node", "build", 10)
+    timings.depends("app", "wrapper-base:node")
+    _timed(timings, clock, "app", "build", 5)
+    _timed(timings, clock, "app", "tag", 0.5)
+    _timed(timings, clock, "db", "identity", 1)
+    _timed(timings, clock, "db", "pull", 3)
+    _timed(timings, clock, "app", "tag", 0.25)
+    return timings
+
+
+def test_phases_and_totals():
+    report = _sample().report()
+    assert report["wall_seconds"] == 24.75
+    app = report["subjects"]["app"]
+    assert app["build"] == {"started": 15.0, "finished": 20.0, "seconds": 5.0}
+    # Entered twice: the intervals add up, and span from the first start to the last end.
+    assert app["tag"] == {"started": 20.0, "finished": 24.75, "seconds": 0.75}
+    assert report["totals"] == {"fetch": 4.0, "identity": 2.0, "pull": 3.0, "build": 15.0, "tag": 0.75}
+    assert list(report["totals"]) == ["fetch", "identity", "pull", "build", "tag"]
+
+
+def test_critical_path_runs_through_the_wrapper_base():
+    critical_path = _sample().critical_path()
+    assert critical_path == {"seconds": 16.75, "subjects": ["wrapper-base:node", "app"]}
+
+
+def test_written_as_json_or_csv(tmp_path):
+    timings = _sample()
+    timings.write(tmp_path / "timings.json")
+    assert json.loads((tmp_path / "timings.json").read_text())["critical_path"]["seconds"] == 16.75
+
+    timings.write(tmp_path / "timings.csv")
+    with open(tmp_path / "timings.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert {"record": "phase", "subject": "db", "phase": "pull", "started": "21.5", "finished": "24.5",
+            "seconds": "3.0"} in rows
+    assert [r["seconds"] for r in rows if r["record"] == "total" and r["phase"] == "build"] == ["15.0"]
+    assert [r["subject"] for r in rows if r["record"] == "critical-path"] == ["wrapper-base:node > app"]
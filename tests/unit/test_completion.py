@@ -0,0 +1,141 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for shell completion answered from the cached command tree."""
+
+import json
+import subprocess
+import sys
+
+from pathlib import Path
+
+import click
+import pytest
+
+from stack.complete import completion
+from stack.deploy.stack_index import StackIndexEntry
+
+# What a TAB press may cost once the tree is cached: importing the CLI and answering,
+# measured inside the process, so without the interpreter's own startup.  Answering
+# through click's own tree imported every command on the way, over a second.
+TARGET_SECONDS = 0.5
+
+
+@click.group()
+@click.option("--profile")
+def cli():
+    pass
+
+
+@cli.command()
+@click.option("--stack")
+@click.option("--spec-file", type=click.Path())
+@click.option("--mode", type=click.Choice(["fast", "slow"]))
+@click.option("--force", is_flag=True)
+@click.argument("target", type=click.Path(file_okay=False))
+def deploy(stack, spec_file, mode, force, target):
+    """deploy a stack"""
+
+
+@cli.command(hidden=True)
+def secret():
+    pass
+
+
+ENTRIES = [StackIndexEntry("/r/a/stack.yml", "alpha"), StackIndexEntry("/r/b/stack.yml", "beta")]
+
+
+def _complete(args, incomplete):
+    items = completion.completions(completion.command_tree(cli), args, incomplete, ENTRIES)
+    return [(item.type, item.value) for item in items]
+
+
+def test_completions_follow_the_tree():
+    assert _complete([], "") == [("plain", "deploy")]
+    assert _complete(["deploy"], "--s") == [("plain", "--stack"), ("plain", "--spec-file")]
+    assert _complete(["deploy", "--stack"], "") == [("plain", "alpha"), ("plain", "beta")]
+    assert _complete(["deploy", "--mode"], "f") == [("plain", "fast")]
+    assert _complete(["deploy"], "--mode=s") == [("plain", "--mode=slow")]
+    assert _complete(["deploy", "--spec-file"], "sp") == [("file", "sp")]
+    # A flag takes no value: what follows it is the positional argument.
+    assert _complete(["deploy", "--force"], "") == [("dir", "")]
+    assert _complete(["deploy", "--stack", "alpha", "out"], "") == []
+
+
+@pytest.fixture
+def dev_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_REPO_BASE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_tree_is_dumped_once_until_plugins_change(dev_root, monkeypatch):
+    dumps = []
+    dump = completion.command_tree
+
+    def counting(cmd):
+        dumps.append(cmd)
+        return dump(cmd)
+
+    monkeypatch.setattr(completion, "command_tree", counting)
+    plugin = dev_root / "s" / "subcommands" / "extra.py"
+    plugin.parent.mkdir(parents=True)
+    plugin.write_text("")
+    entries = [StackIndexEntry(dev_root / "s" / "stack.yml", "s", subcommand_files=["extra.py"])]
+
+    tree = completion.cached_command_tree(cli, entries)
+    assert completion.cached_command_tree(cli, entries) == tree
+    assert len(dumps) == 1
+    assert json.loads((dev_root / ".stack-cache" / "completion.json").read_text())["tree"] == tree
+
+    plugin.write_text("# changed\n")
+    completion.os.utime(plugin, ns=(0, 1))
+    completion.cached_command_tree(cli, entries)
+    assert len(dumps) == 2
+
+
+COMPLETE_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+from stack.main import cli
+try:
+    cli(prog_name="stack")
+except SystemExit:
+    pass
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "heavy": [m for m in ["kubernetes", "python_on_whales", "git"] if m in sys.modules]}),
+      file=sys.stderr)
+"""
+
+
+def _tab(words, env):
+    cword = len(words.split()) if words.endswith(" ") else len(words.split()) - 1
+    env = dict(env, COMP_WORDS=words, COMP_CWORD=str(cword), _STACK_COMPLETE="bash_complete")
+    result = subprocess.run([sys.executable, "-c", COMPLETE_SCRIPT], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split(), json.loads(result.stderr.splitlines()[-1])
+
+
+def test_cached_completion_meets_target_latency(isolated_env, tmp_path):
+    isolated_env["STACK_REPO_BASE_DIR"] = str(tmp_path / "repos")
+    # The first TAB dumps the tree.
+    out, _ = _tab("stack manage ", isolated_env)
+    assert "plain,start" in out
+    out, stats = _tab("stack manage ", isolated_env)
+    assert "plain,start" in out and "plain,stop" in out
+    assert stats["heavy"] == []
+    assert stats["seconds"] < TARGET_SECONDS, stats
+    out, _ = _tab("stack deploy --spec", isolated_env)
+    assert out == ["plain,--spec-file"]
+    assert Path(tmp_path / "repos" / ".stack-cache" / "completion.json").exists()
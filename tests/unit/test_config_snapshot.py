@@ -0,0 +1,85 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the shared, parsed config profile behind get_config_setting."""
+
+import os
+
+import pytest
+
+from stack.config import util
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("STACK_CONFIG_PROFILE", raising=False)
+    monkeypatch.delenv("STACK_IMAGE_REGISTRY", raising=False)
+    util.invalidate_config()
+    yield tmp_path
+    util.invalidate_config()
+
+
+def _count_reads(monkeypatch):
+    reads = []
+    read = util.stack.util.read_yaml_file
+
+    def counting(path):
+        reads.append(path)
+        return read(path)
+
+    monkeypatch.setattr(util.stack.util, "read_yaml_file", counting)
+    return reads
+
+
+def test_profile_is_parsed_once(home, monkeypatch):
+    util.save_config({"image-registry": "registry.example.com", "backup": {"repository": "s3:x", "keep": {"daily": 7}}})
+    reads = _count_reads(monkeypatch)
+    for _ in range(5):
+        assert util.get_config_setting("image-registry") == "registry.example.com"
+        assert util.get_config_setting("backup.keep.daily") == 7
+    assert len(reads) == 1
+    # Dotted keys through a value that is not a section, or that is absent, find nothing.
+    assert util.get_config_setting("image-registry.x") is None
+    assert util.get_config_setting("backup.nope.daily", "d") == "d"
+    # A section handed out is the caller's own.
+    util.get_config_setting("backup")["keep"]["daily"] = 1
+    assert util.get_config_setting("backup.keep.daily") == 7
+
+
+def test_save_and_profile_change_are_seen(home, monkeypatch):
+    util.save_config({"image-registry": "one"})
+    assert util.get_config_setting("image-registry") == "one"
+    util.save_config({"image-registry": "two"})
+    assert util.get_config_setting("image-registry") == "two"
+
+    monkeypatch.setenv("STACK_CONFIG_PROFILE", "other")
+    assert util.get_config_setting("image-registry") is None
+    util.save_config({"image-registry": "three"})
+    assert util.get_config_setting("image-registry") == "three"
+    monkeypatch.delenv("STACK_CONFIG_PROFILE")
+    assert util.get_config_setting("image-registry") == "two"
+
+
+def test_change_by_another_process_is_seen(home):
+    util.save_config({"image-registry": "one"})
+    assert util.get_config_setting("image-registry") == "one"
+    config_path = util.get_config_file_path()
+    config_path.write_text("image-registry: another\n")
+    st = os.stat(config_path)
+    os.utime(config_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert util.get_config_setting("image-registry") == "another"
+    config_path.unlink()
+    assert util.get_config_setting("image-registry") is None
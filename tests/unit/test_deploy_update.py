@@ -0,0 +1,94 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for `stack deploy --update`: regenerating a deployment directory in place."""
+
+import os
+import textwrap
+
+import pytest
+
+from conftest import make_stack_from_compose, run_stack
+
+POD = """\
+    services:
+      web:
+        image: nginx:latest
+        environment:
+          GREETING: hello
+        ports:
+          - "80"
+    """
+
+
+def _run(args, env, cwd):
+    result = run_stack(args, env, cwd=cwd)
+    assert result.returncode == 0, f"{args} failed:\n{result.stdout}\n{result.stderr}"
+    return result
+
+
+@pytest.fixture
+def deployment(tmp_path, isolated_env):
+    stack_dir = make_stack_from_compose(tmp_path, textwrap.dedent(POD))
+    spec_file = tmp_path / "spec.yml"
+    _run(["init", "--stack", str(stack_dir), "--output", str(spec_file), "--config", "A=1"], isolated_env, tmp_path)
+    deployment_dir = tmp_path / "deployment"
+    _run(["deploy", "--spec-file", str(spec_file), "--deployment-dir", str(deployment_dir)], isolated_env, tmp_path)
+    return stack_dir, spec_file, deployment_dir
+
+
+def _update(spec_file, deployment_dir, env):
+    result = _run(["deploy", "--update", "--spec-file", str(spec_file), "--deployment-dir", str(deployment_dir)],
+                  env, spec_file.parent)
+    return result.stdout.splitlines()
+
+
+def test_update_without_changes_rewrites_nothing(deployment, isolated_env):
+    _, spec_file, deployment_dir = deployment
+    mtimes = {p: p.stat().st_mtime_ns for p in deployment_dir.rglob("*") if p.is_file()}
+    assert _update(spec_file, deployment_dir, isolated_env) == ["No changes"]
+    assert {p: p.stat().st_mtime_ns for p in deployment_dir.rglob("*") if p.is_file()} == mtimes
+    assert not [p for p in deployment_dir.parent.iterdir() if ".update-" in p.name]
+
+
+def test_update_rewrites_only_what_changed(deployment, isolated_env):
+    stack_dir, spec_file, deployment_dir = deployment
+    cluster_id = (deployment_dir / "deployment.yml").read_text()
+    stack_file = deployment_dir / "stack.yml"
+    stack_mtime = stack_file.stat().st_mtime_ns
+    (deployment_dir / "runtime-state").write_text("kept\n")
+
+    compose = stack_dir / "web" / "composefile.yml"
+    compose.write_text(compose.read_text().replace("hello", "goodbye"))
+    spec_file.write_text(spec_file.read_text().replace("A: 1", "A: 2").replace("A: '1'", "A: '2'"))
+
+    changes = _update(spec_file, deployment_dir, isolated_env)
+    assert "changed: compose/composefile-web.yml" in changes
+    assert "changed: config.env" in changes
+    assert not [line for line in changes if "stack.yml" in line or "deployment.yml" in line]
+    assert "goodbye" in (deployment_dir / "compose" / "composefile-web.yml").read_text()
+    assert "A=2" in (deployment_dir / "config.env").read_text()
+    assert stack_file.stat().st_mtime_ns == stack_mtime
+    assert (deployment_dir / "deployment.yml").read_text() == cluster_id
+    assert (deployment_dir / "runtime-state").read_text() == "kept\n"
+
+
+def test_update_needs_an_existing_deployment(tmp_path, isolated_env, deployment):
+    _, spec_file, _ = deployment
+    result = run_stack(["deploy", "--update", "--spec-file", str(spec_file), "--deployment-dir", str(tmp_path / "nope")],
+                       isolated_env, cwd=tmp_path)
+    assert result.returncode != 0
+    assert "is not a deployment directory" in result.stderr + result.stdout
+    assert not os.path.exists(tmp_path / "nope")
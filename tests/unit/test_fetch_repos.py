@@ -0,0 +1,91 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for fetching a stack's repos on a pool of git workers.
+
+process_repo() itself is replaced: these are about the pool -- that it stays within its
+bound, that each worker draws on its own line of the display, and that one repo's
+failure is reported alongside the others' rather than abandoning them.
+"""
+
+import threading
+import time
+
+from git.exc import GitCommandError
+
+from conftest import make_stack_from_compose
+from stack.deploy.stack import Stack
+from stack.repos import repo_util
+
+
+def _fake_process_repo(record, fail=()):
+    lock = threading.Lock()
+    active = []
+
+    def process_repo(pull, check_only, git_ssh, dev_root_path, branches_array, repo):
+        with lock:
+            active.append(repo)
+            record.append((repo, len(active), getattr(repo_util._progress_slot, "position", None)))
+        time.sleep(0.05)
+        with lock:
+            active.remove(repo)
+        if repo in fail:
+            raise GitCommandError(["git", "clone", repo], 128)
+        return f"/dev-root/{repo}"
+
+    return process_repo
+
+
+def test_fetches_within_the_bound(monkeypatch):
+    record = []
+    monkeypatch.setattr(repo_util, "process_repo", _fake_process_repo(record))
+    repos = [f"org/repo{i}" for i in range(6)]
+    fetched, errors = repo_util.fetch_repos(repos, False, False, "/dev-root", jobs=3)
+    assert errors == {}
+    assert fetched == {repo: f"/dev-root/{repo}" for repo in repos}
+    assert max(active for _, active, _ in record) == 3
+    # Each worker draws on its own line.
+    assert {position for _, _, position in record} == {0, 1, 2}
+
+
+def test_single_worker_keeps_the_plain_display(monkeypatch):
+    record = []
+    monkeypatch.setattr(repo_util, "process_repo", _fake_process_repo(record))
+    repo_util.fetch_repos(["org/a", "org/b"], False, False, "/dev-root")
+    assert [(repo, position) for repo, _, position in record] == [("org/a", None), ("org/b", None)]
+
+
+def test_failures_are_collected(monkeypatch):
+    record = []
+    monkeypatch.setattr(repo_util, "process_repo", _fake_process_repo(record, fail={"org/b", "org/d"}))
+    fetched, errors = repo_util.fetch_repos(["org/a", "org/b", "org/c", "org/d"], False, False, "/dev-root", jobs=2)
+    assert sorted(errors) == ["org/b", "org/d"]
+    assert sorted(fetched) == ["org/a", "org/c"]
+    assert len(record) == 4
+
+
+def test_fetch_jobs_setting_is_the_default(monkeypatch, tmp_path):
+    # `stack init` fetches without a --fetch-jobs of its own, so it goes by the setting.
+    stack_dir = make_stack_from_compose(tmp_path, "services: {}\n",
+                                        stack_yaml="name: teststack\nrepos:\n  - org/a\n  - org/b\npods: []\n")
+    jobs_used = []
+    monkeypatch.setattr(repo_util, "get_dev_root_path", lambda: str(tmp_path / "dev-root"))
+    monkeypatch.setattr(repo_util, "get_config_setting", lambda key, default=None: 6 if key == "fetch-jobs" else default)
+    monkeypatch.setattr(repo_util, "fetch_repos", lambda repos, pull, git_ssh, dev_root_path, jobs: jobs_used.append(jobs)
+                        or ({}, {}))
+
+    repo_util.clone_all_repos_for_stack(Stack("teststack").init_from_file(stack_dir / "stack.yml"))
+
+    assert jobs_used == [6]
@@ -0,0 +1,136 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the on-disk cache of repo versions.
+
+A stale hit is the failure that matters: it would tag an image built from edited
+source with the clean commit's hash.  So beyond "a second lookup is served from the
+cache", these check that every kind of change to a checkout misses it.
+"""
+
+import os
+import time
+
+import pytest
+
+from conftest import run_git
+from stack.build import identity_cache
+from stack.repos import git_state
+from stack.repos.repo_util import get_container_tag_for_repo
+
+
+def _settle(repo, age=60):
+    # Backdate the tree out of the racy window, as if it had been edited a while ago.
+    past = time.time() - age
+    for root, dirs, files in os.walk(repo):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in files:
+            os.utime(os.path.join(root, name), (past, past))
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_REPO_BASE_DIR", str(tmp_path / "dev-root"))
+    monkeypatch.setattr(identity_cache, "_cache", None)
+    repo = tmp_path / "repo"
+    (repo / "src" / "deep").mkdir(parents=True)
+    (repo / "README").write_text("readme\n")
+    (repo / "src" / "a.txt").write_text("a\n")
+    (repo / "src" / "deep" / "b.txt").write_text("b\n")
+    run_git(tmp_path, "init", "-q", str(repo))
+    run_git(repo, "add", ".")
+    run_git(repo, "commit", "-qm", "initial")
+    _settle(repo)
+    run_git(repo, "status")
+    return repo
+
+
+@pytest.mark.parametrize("index_version", ["2", "3", "4"])
+def test_index_paths_match_git(repo, index_version):
+    run_git(repo, "update-index", "--index-version", index_version)
+    expected = run_git(repo, "ls-files").splitlines()
+    assert git_state.read_index_paths(repo / ".git" / "index") == expected
+
+
+def test_state_key_is_stable(repo):
+    assert git_state.repo_state_key(repo) is not None
+    assert git_state.repo_state_key(repo) == git_state.repo_state_key(repo)
+
+
+def test_untracked_file_does_not_change_the_key(repo):
+    before = git_state.repo_state_key(repo)
+    (repo / "untracked.txt").write_text("x\n")
+    assert git_state.repo_state_key(repo) == before
+
+
+def test_unstaged_edit_changes_the_key(repo):
+    before = git_state.repo_state_key(repo)
+    (repo / "src" / "a.txt").write_text("edited\n")
+    _settle(repo, age=30)
+    assert git_state.repo_state_key(repo) != before
+
+
+def test_recent_edit_is_not_keyed(repo):
+    (repo / "src" / "a.txt").write_text("edited\n")
+    assert git_state.repo_state_key(repo) is None
+
+
+def test_commit_changes_the_key(repo):
+    before = git_state.repo_state_key(repo)
+    (repo / "README").write_text("changed\n")
+    run_git(repo, "commit", "-qam", "second")
+    _settle(repo)
+    assert git_state.repo_state_key(repo) != before
+
+
+def test_second_lookup_is_served_from_the_cache(repo):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "v1"
+
+    assert identity_cache.cached_repo_version("test", repo, compute) == "v1"
+    assert identity_cache.cached_repo_version("test", repo, compute) == "v1"
+    assert len(calls) == 1
+
+
+def test_cache_survives_the_process(repo, monkeypatch):
+    identity_cache.cached_repo_version("test", repo, lambda: "v1")
+    monkeypatch.setattr(identity_cache, "_cache", None)
+    assert identity_cache.cached_repo_version("test", repo, lambda: "recomputed") == "v1"
+
+
+def test_lock_file_content_is_part_of_the_key(repo):
+    lock_file = repo / "stack.lock"
+    lock_file.write_text("containers: {}\n")
+    assert identity_cache.cached_repo_version("test", repo, lambda: "v1", lock_file) == "v1"
+    lock_file.write_text("containers: {a: {hash: abc}}\n")
+    assert identity_cache.cached_repo_version("test", repo, lambda: "v2", lock_file) == "v2"
+
+
+def test_edit_after_caching_yields_a_dev_tag(repo):
+    head = run_git(repo, "rev-parse", "HEAD").strip()
+    assert get_container_tag_for_repo(repo) == head
+    (repo / "src" / "deep" / "b.txt").write_text("edited\n")
+    _settle(repo, age=30)
+    assert get_container_tag_for_repo(repo).startswith("stackdev-")
+
+
+def test_cache_can_be_disabled(repo, monkeypatch):
+    monkeypatch.setenv("STACK_IDENTITY_CACHE", "false")
+    identity_cache.cached_repo_version("test", repo, lambda: "v1")
+    assert identity_cache.cached_repo_version("test", repo, lambda: "v2") == "v2"
@@ -0,0 +1,107 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the snapshot of the local image store.
+
+The listing is faked: what matters is that docker's and podman's spellings of a name
+both match, that stack's own tags and removals are applied without listing again, and
+that an invalidation does list again.
+"""
+
+from stack.build.image_inventory import LocalImageInventory, NONE
+
+APP_ID = "sha256:" + "a" * 64
+PG_ID = "sha256:" + "b" * 64
+DANGLING_ID = "sha256:" + "c" * 64
+
+
+class _Lister:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.rows)
+
+
+def _docker_rows():
+    return [
+        (APP_ID, "org/app", "stack", NONE),
+        (APP_ID, "org/app", "abc123", NONE),
+        (PG_ID, "postgres", "16", "sha256:" + "d" * 64),
+        (DANGLING_ID, NONE, NONE, NONE),
+    ]
+
+
+def test_lists_once_for_many_questions():
+    lister = _Lister(_docker_rows())
+    inventory = LocalImageInventory(lister)
+    assert inventory.exists("org/app:stack")
+    assert inventory.exists("org/app:abc123")
+    assert not inventory.exists("org/app:local")
+    assert inventory.image_id("postgres:16") == PG_ID
+    assert lister.calls == 1
+
+
+def test_docker_and_podman_spellings_match():
+    podman = LocalImageInventory(_Lister([
+        (APP_ID, "localhost/app", "stack", NONE),
+        (PG_ID, "docker.io/library/postgres", "16", NONE),
+        (PG_ID, "docker.io/org/tool", "latest", NONE),
+    ]))
+    assert podman.exists("app:stack")
+    assert podman.exists("postgres:16")
+    assert podman.exists("docker.io/library/postgres:16")
+    assert podman.exists("org/tool")
+
+
+def test_digests_and_ids():
+    inventory = LocalImageInventory(_Lister(_docker_rows()))
+    assert inventory.digests("postgres:16") == [f"postgres@sha256:{'d' * 64}"]
+    assert inventory.image_id(f"postgres@sha256:{'d' * 64}") == PG_ID
+    assert inventory.exists(DANGLING_ID)
+    assert inventory.tags(APP_ID) == ["org/app:abc123", "org/app:stack"]
+
+
+def test_tag_and_removal_are_applied_in_place():
+    lister = _Lister(_docker_rows())
+    inventory = LocalImageInventory(lister)
+    inventory.exists("org/app:stack")
+    inventory.record_tag("org/app:abc123", "ghcr.io/org/app:abc123")
+    inventory.record_removal("org/app:stack")
+    assert inventory.image_id("ghcr.io/org/app:abc123") == APP_ID
+    assert not inventory.exists("org/app:stack")
+    assert lister.calls == 1
+
+
+def test_tag_from_an_unknown_image_relists():
+    lister = _Lister(_docker_rows())
+    inventory = LocalImageInventory(lister)
+    inventory.exists("org/app:stack")
+    lister.rows.append((DANGLING_ID, "org/new", "v1", NONE))
+    inventory.record_tag("org/new:v1", "org/new:stack")
+    assert inventory.exists("org/new:v1")
+    assert lister.calls == 2
+
+
+def test_invalidate_relists():
+    lister = _Lister(_docker_rows())
+    inventory = LocalImageInventory(lister)
+    assert not inventory.exists("org/built:stack")
+    lister.rows.append((DANGLING_ID, "org/built", "stack", NONE))
+    inventory.invalidate()
+    assert inventory.exists("org/built:stack")
+    assert lister.calls == 2
@@ -0,0 +1,186 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""How K8sDeployer.up() creates a deployment's objects: concurrently, in dependency order.
+
+No cluster is involved: the API is stubbed, and each call sleeps a little, as a round
+trip to an API server would.  What is under test is the ordering -- a Deployment is
+created only once the PVCs, ConfigMaps and Secret its pods mount exist -- that
+independent objects are created at the same time, and that a failed create stops the
+run the way it did when the objects were created one after another.
+"""
+
+import re
+import threading
+import time
+
+from types import SimpleNamespace
+
+import pytest
+from kubernetes import client
+
+from stack.deploy.k8s import deploy_k8s
+from stack.deploy.k8s.deploy_k8s import K8sDeployer
+
+NAMESPACE = "stack-test"
+ROUND_TRIP = 0.05
+SERVICES = ["web", "api", "db", "cache"]
+
+
+def named(name):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name))
+
+
+class StubApi:
+    """Records each create, with the time it finished; fails the create named in fail_on."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.finished = {}
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _create(self, kind, body):
+        with self._lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            time.sleep(ROUND_TRIP)
+            if f"{kind}/{body.metadata.name}" == self.fail_on:
+                raise client.exceptions.ApiException(status=409, reason="Conflict")
+            with self._lock:
+                self.finished[f"{kind}/{body.metadata.name}"] = time.monotonic()
+            return body
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def read_persistent_volume(self, name):
+        raise client.exceptions.ApiException(status=404, reason="Not Found")
+
+    def read_namespaced_persistent_volume_claim(self, name, namespace):
+        raise client.exceptions.ApiException(status=404, reason="Not Found")
+
+    def create_persistent_volume(self, body):
+        return self._create("pv", body)
+
+    def create_namespaced_persistent_volume_claim(self, body, namespace):
+        return self._create("pvc", body)
+
+    def create_namespaced_config_map(self, body, namespace):
+        return self._create("configmap", body)
+
+    def create_namespaced_service(self, namespace, body):
+        return self._create("service", body)
+
+    def patch_namespaced_config_map(self, name, namespace, body, field_manager, force, _content_type):
+        return self._create("applied-configmap", body)
+
+    def patch_namespaced_service(self, name, namespace, body, field_manager, force, _content_type):
+        return self._create("applied-service", body)
+
+    def patch_namespaced_deployment(self, name, namespace, body, field_manager, force, _content_type):
+        return self.create_namespaced_deployment(body, namespace, kind="applied-deployment")
+
+    def create_namespaced_deployment(self, body, namespace, kind="deployment"):
+        self._create(kind, body)
+        container = SimpleNamespace(image="app:1")
+        return SimpleNamespace(
+            metadata=SimpleNamespace(namespace=namespace, name=body.metadata.name, generation=1),
+            spec=SimpleNamespace(template=SimpleNamespace(spec=SimpleNamespace(containers=[container]))),
+        )
+
+
+def make_deployer(api):
+    deployer = object.__new__(K8sDeployer)
+    deployer.k8s_namespace = NAMESPACE
+    deployer.is_kind = lambda: False
+    deployer.core_api = api
+    deployer.apps_api = api
+    deployer._create_backup_configuration = lambda: None
+
+    def create_secrets():
+        api._create("secret", named("stack-secrets"))
+        return True
+
+    deployer._create_secrets = create_secrets
+    deployer.cluster_info = SimpleNamespace(
+        get_pvs=lambda: [named(f"pv-{s}") for s in SERVICES],
+        get_pvcs=lambda: [named(f"pvc-{s}") for s in SERVICES],
+        get_configmaps=lambda: [named(f"cm-{s}") for s in SERVICES],
+        get_deployments=lambda image_pull_policy=None: [named(f"deploy-{s}") for s in SERVICES],
+        get_services=lambda: [named(f"svc-{s}") for s in SERVICES],
+    )
+    return deployer
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(deploy_k8s, "get_config_setting", lambda key, default=None: 8 if key == "k8s-apply-jobs" else default)
+    monkeypatch.setattr(deploy_k8s, "server_side_apply_enabled", lambda: False)
+
+
+def test_independent_objects_are_created_concurrently(jobs):
+    api = StubApi()
+    start = time.monotonic()
+    make_deployer(api)._create_objects()
+    elapsed = time.monotonic() - start
+
+    assert len(api.finished) == 5 * len(SERVICES) + 1
+    assert api.most_in_flight > 1
+    # One after another this would be 21 round trips; the longest chain is three.
+    assert elapsed < 10 * ROUND_TRIP
+
+
+def test_deployments_wait_for_what_their_pods_mount(jobs):
+    api = StubApi()
+    make_deployer(api)._create_objects()
+
+    prerequisites = [k for k in api.finished if k.split("/")[0] in ["pvc", "configmap", "secret"]]
+    first_deployment = min(t for k, t in api.finished.items() if k.startswith("deployment/"))
+    assert all(api.finished[k] <= first_deployment for k in prerequisites)
+    first_pvc = min(t for k, t in api.finished.items() if k.startswith("pvc/"))
+    assert all(t <= first_pvc for k, t in api.finished.items() if k.startswith("pv/"))
+
+
+def test_a_failed_create_is_raised_and_its_dependents_are_not_started(jobs):
+    api = StubApi(fail_on="configmap/cm-db")
+
+    with pytest.raises(client.exceptions.ApiException) as excinfo:
+        make_deployer(api)._create_objects()
+
+    assert excinfo.value.status == 409
+    assert not [k for k in api.finished if k.startswith("deployment/")]
+
+
+def test_server_side_apply_applies_all_but_the_volumes(jobs, monkeypatch):
+    monkeypatch.setattr(deploy_k8s, "server_side_apply_enabled", lambda: True)
+    api = StubApi()
+    make_deployer(api)._create_objects()
+
+    kinds = {k.split("/")[0] for k in api.finished}
+    assert kinds == {"pv", "pvc", "secret", "applied-configmap", "applied-deployment", "applied-service"}
+
+
+def test_the_slowest_objects_are_reported(jobs, monkeypatch):
+    reported = []
+    monkeypatch.setattr(deploy_k8s, "log_info", reported.append)
+    make_deployer(StubApi())._create_objects()
+
+    # Every object, the backup configuration included, and the three slowest of them.
+    assert len(reported) == 1
+    assert re.fullmatch(rf"Created {5 * len(SERVICES) + 2} object\(s\) in [\d.]+s, 8 at a time;"
+                        r" slowest: \S+ [\d.]+s, \S+ [\d.]+s, \S+ [\d.]+s", reported[0])
@@ -0,0 +1,123 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Streaming container logs on k8s: cutting chunks into lines, and merging containers.
+
+No cluster is involved.  The log sources here yield fixed chunks of bytes, split at
+awkward places, as the API server's stream would; what is under test is that every
+line comes out whole and labelled, however it arrived, and that with --follow the
+lines of several containers are merged without any being cut into.
+"""
+
+import time
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from stack.deploy.k8s import log_stream
+from stack.deploy.k8s.log_stream import LINE_LIMIT, log_sources, since_seconds, split_lines, stream_logs
+
+
+def test_lines_are_rebuilt_from_chunks_split_anywhere():
+    chunks = [b"fir", b"st\nsec", b"ond\n", b"\nthird"]
+
+    assert list(split_lines(chunks, b"web: ")) == [b"web: first\n", b"web: second\n", b"web: \n", b"web: third\n"]
+
+
+def test_an_overlong_line_is_passed_on_in_pieces():
+    chunks = [b"x" * (LINE_LIMIT + 10), b"\n"]
+
+    lines = list(split_lines(chunks, b""))
+
+    assert lines == [b"x" * LINE_LIMIT + b"\n", b"x" * 10 + b"\n"]
+
+
+@pytest.mark.parametrize("since, seconds", [("90s", 90), ("10m", 600), ("1h30m", 5400), ("2h", 7200)])
+def test_since_durations(since, seconds):
+    assert since_seconds(since) == seconds
+
+
+def test_since_a_time():
+    when = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+
+    assert 295 <= since_seconds(when) <= 305
+
+
+@pytest.mark.parametrize("since", ["", "soon", "10x", "0s", "0m", "0h0m0s"])
+def test_since_rejects_what_it_cannot_read(since):
+    with pytest.raises(ValueError):
+        since_seconds(since)
+
+
+def test_labels_name_the_pod_only_where_a_container_name_repeats():
+    pods = [("web-1", ["web", "sidecar"]), ("web-2", ["web"])]
+
+    labels = [s.prefix for s in log_sources(None, "ns", pods)]
+
+    assert labels == [b"web-1/web: ", b"sidecar: ", b"web-2/web: "]
+
+
+class ChunkedSource:
+    """A log source whose lines arrive in small chunks, slowly, so that readers overlap."""
+
+    def __init__(self, name, count):
+        self.pod = "pod"
+        self.container = name
+        self.name = name
+        self.count = count
+
+    def lines(self):
+        def chunks():
+            for i in range(self.count):
+                line = f"{self.name} line {i}\n".encode()
+                for j in range(0, len(line), 3):
+                    time.sleep(0.0005)
+                    yield line[j:j + 3]
+        return split_lines(chunks(), f"{self.name}: ".encode())
+
+
+def test_following_merges_whole_lines_from_every_container():
+    sources = [ChunkedSource(name, 20) for name in ["web", "api", "db"]]
+
+    lines = [line for _, line in stream_logs(sources, follow=True)]
+
+    assert len(lines) == 60
+    for source in sources:
+        mine = [line for line in lines if line.startswith(f"{source.name}: ".encode())]
+        assert mine == [f"{source.name}: {source.name} line {i}\n".encode() for i in range(20)]
+
+
+def test_a_slow_writer_holds_the_readers_back(monkeypatch):
+    monkeypatch.setattr(log_stream, "QUEUE_LINES", 5)
+    source = ChunkedSource("web", 0)
+    read = []
+
+    def lines():
+        for i in range(100):
+            read.append(i)
+            yield f"web: {i}\n".encode()
+
+    source.lines = lines
+    stream = stream_logs([source], follow=True)
+    next(stream)
+    deadline = time.monotonic() + 1
+    while len(read) < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+    # One line taken, QUEUE_LINES waiting, and the reader blocked holding one more.
+    assert len(read) <= 7
+    assert len([line for _, line in stream]) == 99
@@ -37,8 +37,7 @@ def deployer(monkeypatch):
     Built without __init__, which would want a deployment directory and a real
     connection; logs() only reaches for the attributes set here.
     """
-    monkeypatch.setattr(deploy_k8s, "pods_in_deployment", lambda api, app_name, namespace: [POD])
-    monkeypatch.setattr(deploy_k8s, "containers_in_pod", lambda api, pod_name, namespace: ["web"])
+    monkeypatch.setattr(deploy_k8s, "containers_in_deployment", lambda api, app_name, namespace: [(POD, ["web"])])
 
     deployer = object.__new__(K8sDeployer)
     deployer.connect_api = lambda: None
@@ -52,8 +51,25 @@ def read_logs(deployer):
     return b"".join(chunk for _, chunk in deployer.logs(services=None, tail=None, follow=False, stream=True)).decode()
 
 
+class StreamedResponse:
+    """What read_namespaced_pod_log returns unread (_preload_content=False): the body, in chunks."""
+
+    def __init__(self, body, chunk_size=4):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    def stream(self, amt):
+        for i in range(0, len(self.body), self.chunk_size):
+            yield self.body[i:i + self.chunk_size]
+
+    def release_conn(self):
+        pass
+
+
 def set_log_response(deployer, response):
-    deployer.core_api = SimpleNamespace(read_namespaced_pod_log=lambda *args, **kwargs: response)
+    # Chunks far shorter than a line, so that lines are put back together from pieces.
+    body = (response or "").encode()
+    deployer.core_api = SimpleNamespace(read_namespaced_pod_log=lambda *args, **kwargs: StreamedResponse(body))
 
 
 def test_container_log_lines_are_labelled(deployer):
@@ -82,3 +98,16 @@ def test_api_failure_reports_no_logs_available(deployer):
     deployer.core_api = SimpleNamespace(read_namespaced_pod_log=raise_api_exception)
 
     assert "No logs available" in read_logs(deployer)
+
+
+def test_zero_since_is_refused_before_any_read(deployer, capsys):
+    # The API server rejects since_seconds=0, which would otherwise be reported as
+    # "No logs available" for every container.
+    def read(*args, **kwargs):
+        raise AssertionError("no log should be read")
+
+    deployer.core_api = SimpleNamespace(read_namespaced_pod_log=read)
+
+    with pytest.raises(SystemExit):
+        deployer.logs(services=None, tail=None, follow=False, stream=True, since="0s")
+    assert "--since" in capsys.readouterr().err
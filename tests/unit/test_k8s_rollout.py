@@ -0,0 +1,151 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""`stack manage start --wait` on k8s: judging a rollout from watch events.
+
+No cluster is involved.  The Deployments and pods are kubernetes client objects built
+here, and in the last tests the watch is replaced by one that plays back a fixed
+sequence of events.  What is under test is when the wait ends -- every replica
+available, a container that will not start, the timeout -- and what it says.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from kubernetes import client
+
+from stack.deploy.deployer import DeployerException
+from stack.deploy.k8s import rollout
+from stack.deploy.k8s.rollout import FAILED, READY, WAITING, RolloutTracker, rollout_status
+
+
+def deployment(name="deploy-web", replicas=2, generation=2, observed=2, updated=2, total=2, available=2,
+               conditions=None):
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name=name, generation=generation, resource_version="1"),
+        spec=client.V1DeploymentSpec(replicas=replicas, selector=client.V1LabelSelector(), template=client.V1PodTemplateSpec()),
+        status=client.V1DeploymentStatus(observed_generation=observed, updated_replicas=updated, replicas=total,
+                                         available_replicas=available, conditions=conditions),
+    )
+
+
+def pod(name="deploy-web-abc-1", waiting_reason=None, message=None):
+    state = client.V1ContainerState(waiting=client.V1ContainerStateWaiting(reason=waiting_reason, message=message)
+                                    if waiting_reason else None)
+    status = client.V1ContainerStatus(name="web", image="app:1", image_id="", ready=False, restart_count=0, state=state)
+    return client.V1Pod(metadata=client.V1ObjectMeta(name=name, resource_version="1"),
+                        status=client.V1PodStatus(container_statuses=[status]))
+
+
+@pytest.mark.parametrize("kwargs, state", [
+    ({}, READY),
+    ({"observed": 1}, WAITING),
+    ({"updated": 1}, WAITING),
+    ({"total": 3}, WAITING),
+    ({"available": 1}, WAITING),
+    ({"conditions": [client.V1DeploymentCondition(type="Progressing", status="False",
+                                                  reason="ProgressDeadlineExceeded", message="too slow")]}, FAILED),
+])
+def test_rollout_status(kwargs, state):
+    assert rollout_status(deployment(**kwargs))[0] == state
+
+
+def test_progress_is_reported_once_per_change():
+    tracker = RolloutTracker(["deploy-web"])
+
+    assert tracker.observe("deployment", "ADDED", deployment(available=0)) == ["deploy-web: 0 of 2 replicas available"]
+    assert tracker.observe("deployment", "MODIFIED", deployment(available=0)) == []
+    assert not tracker.done()
+    assert tracker.observe("deployment", "MODIFIED", deployment()) == ["deploy-web: 2 of 2 replicas available"]
+    assert tracker.done()
+    # Deployments not being waited for are not reported.
+    assert tracker.observe("deployment", "ADDED", deployment(name="someone-else", available=0)) == []
+
+
+def test_a_container_that_will_not_start_fails_the_rollout():
+    tracker = RolloutTracker(["deploy-web"])
+    tracker.observe("deployment", "ADDED", deployment(available=1))
+    tracker.observe("pod", "ADDED", pod(waiting_reason="ContainerCreating"))
+    assert tracker.failures() == []
+
+    lines = tracker.observe("pod", "MODIFIED", pod(waiting_reason="ImagePullBackOff", message="no such image app:1"))
+
+    assert lines == ["deploy-web-abc-1: container web is stuck (ImagePullBackOff: no such image app:1)"]
+    assert tracker.failures() == ["deploy-web-abc-1: container web: ImagePullBackOff: no such image app:1"]
+    # Once the pod is gone, so is the failure.
+    tracker.observe("pod", "DELETED", pod(waiting_reason="ImagePullBackOff"))
+    assert tracker.failures() == []
+
+
+class FakeWatch:
+    """Plays back the watch events queued for each list function, then ends the stream."""
+
+    events = {}
+
+    def stream(self, func, **kwargs):
+        yield from self.events.pop(func, [])
+
+    def stop(self):
+        pass
+
+
+def listing(*items):
+    return SimpleNamespace(items=list(items), metadata=SimpleNamespace(resource_version="1"))
+
+
+@pytest.fixture
+def apis(monkeypatch):
+    monkeypatch.setattr(rollout.watch, "Watch", FakeWatch)
+    monkeypatch.setattr(rollout, "WATCH_SECONDS", 0)
+    apps = SimpleNamespace(list_namespaced_deployment=lambda namespace, **kwargs: listing(deployment(available=0)))
+    core = SimpleNamespace(list_namespaced_pod=lambda namespace, label_selector, **kwargs: listing(pod()))
+    return apps, core
+
+
+def test_wait_returns_once_every_replica_is_available(apis, monkeypatch):
+    apps, core = apis
+    reported = []
+    monkeypatch.setattr(rollout, "output_main", reported.append)
+    FakeWatch.events = {apps.list_namespaced_deployment: [
+        {"type": "MODIFIED", "object": deployment(available=1)},
+        {"type": "MODIFIED", "object": deployment(available=2)},
+    ]}
+
+    rollout.wait_for_rollout(apps, core, "ns", "app", ["deploy-web"], timeout=5)
+
+    assert reported == [
+        "deploy-web: 0 of 2 replicas available",
+        "deploy-web: 1 of 2 replicas available",
+        "deploy-web: 2 of 2 replicas available",
+        "All 1 service(s) available",
+    ]
+
+
+def test_wait_names_the_stuck_container(apis):
+    apps, core = apis
+    FakeWatch.events = {core.list_namespaced_pod: [
+        {"type": "MODIFIED", "object": pod(waiting_reason="CrashLoopBackOff", message="back-off restarting")},
+    ]}
+
+    with pytest.raises(DeployerException, match="container web: CrashLoopBackOff"):
+        rollout.wait_for_rollout(apps, core, "ns", "app", ["deploy-web"], timeout=5)
+
+
+def test_wait_times_out_naming_what_is_unfinished(apis):
+    apps, core = apis
+    FakeWatch.events = {}
+
+    with pytest.raises(DeployerException, match="deploy-web: 0 of 2 replicas available"):
+        rollout.wait_for_rollout(apps, core, "ns", "app", ["deploy-web"], timeout=0.2)
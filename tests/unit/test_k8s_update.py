@@ -62,6 +62,7 @@ class StubAppsApi:
         self.live = make_deployment("app:old")
         self.conflicts = conflicts
         self.patched = []
+        self.patch_options = []
         self.reads = 0
 
     def list_namespaced_deployment(self, namespace):
@@ -71,11 +72,12 @@ class StubAppsApi:
         self.reads += 1
         return make_deployment("app:old")
 
-    def patch_namespaced_deployment(self, name, namespace, body):
+    def patch_namespaced_deployment(self, name, namespace, body, **options):
         if self.conflicts > 0:
             self.conflicts -= 1
             raise client.exceptions.ApiException(status=409, reason="Conflict")
         self.patched.append(body)
+        self.patch_options.append(options)
 
 
 @pytest.fixture
@@ -87,6 +89,7 @@ def deployer(monkeypatch):
     branch is skipped, and the staged-image scan is stubbed out.
     """
     monkeypatch.setattr(deploy_k8s, "stale_staged_images", lambda image_set, registry, deployment_id: [])
+    monkeypatch.setattr(deploy_k8s, "server_side_apply_enabled", lambda: False)
 
     deployer = object.__new__(K8sDeployer)
     deployer.connect_api = lambda: None
@@ -150,3 +153,23 @@ def test_other_api_errors_are_not_retried(deployer):
 
     assert excinfo.value.status == 403
     assert api.reads == 0
+
+
+def test_server_side_apply_sends_the_desired_deployment_once(deployer, monkeypatch):
+    monkeypatch.setattr(deploy_k8s, "server_side_apply_enabled", lambda: True)
+    api = StubAppsApi()
+    api.live.spec.template.metadata.annotations = {deploy_k8s.RESTARTED_AT_ANNOTATION: "2026-01-01T00:00:00+00:00"}
+    deployer.apps_api = api
+    deployer.update()
+
+    assert api.reads == 0
+    assert len(api.patched) == 1
+    assert api.patch_options[0] == {
+        "field_manager": "stack", "force": True, "_content_type": "application/apply-patch+yaml",
+    }
+    applied = client.ApiClient().sanitize_for_serialization(api.patched[0])
+    assert applied["apiVersion"] == "apps/v1" and applied["kind"] == "Deployment"
+    template = applied["spec"]["template"]
+    assert template["spec"]["containers"][0]["image"] == "app:new"
+    # Left out, the annotation would be removed from the live object, rolling the pods again.
+    assert template["metadata"]["annotations"] == {deploy_k8s.RESTARTED_AT_ANNOTATION: "2026-01-01T00:00:00+00:00"}
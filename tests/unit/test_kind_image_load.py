@@ -0,0 +1,109 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Loading a deployment's images into its kind cluster.
+
+No docker and no kind: the local image store, the nodes' containerd listings and the
+commands run are all stubbed.  What is under test is which images are loaded into
+which nodes -- only those a node does not already hold under the same tag and ID --
+and that they go in batched, one `kind load` per set of nodes rather than per image.
+"""
+
+import json
+import subprocess
+
+import pytest
+
+from stack.build.image_inventory import LocalImageInventory
+from stack.deploy.deployer import DeployerException
+from stack.deploy.k8s import helpers
+
+LOCAL = [
+    ("sha256:aaa", "app/web", "stack", ""),
+    ("sha256:bbb", "app/api", "stack", ""),
+    ("sha256:ccc", "postgres", "16", ""),
+]
+
+
+def crictl(*images):
+    return json.dumps({"images": [{"id": image_id, "repoTags": [tag]} for tag, image_id in images]})
+
+
+@pytest.fixture
+def kind(monkeypatch):
+    state = {"nodes": {"kind-control-plane": crictl()}, "commands": [], "pull_rc": 0}
+    inventory = LocalImageInventory(lister=lambda: LOCAL)
+    monkeypatch.setattr(helpers, "local_images", lambda: inventory)
+    monkeypatch.setattr(helpers, "container_exists_locally", inventory.exists)
+
+    def run(args, capture_output, text):
+        if args[:3] == ["kind", "get", "nodes"]:
+            return subprocess.CompletedProcess(args, 0, "\n".join(state["nodes"]) + "\n", "")
+        node = args[2]
+        return subprocess.CompletedProcess(args, 0, state["nodes"][node], "")
+
+    def run_shell_command(cmd, check_result=True):
+        state["commands"].append(cmd)
+        return state["pull_rc"] if cmd.startswith("docker pull") else 0
+
+    monkeypatch.setattr(helpers.subprocess, "run", run)
+    monkeypatch.setattr(helpers, "run_shell_command", run_shell_command)
+    return state
+
+
+def test_images_go_in_one_load(kind):
+    helpers.load_images_into_kind("kind", {"app/web:stack", "app/api:stack", "postgres:16"})
+
+    assert kind["commands"] == [
+        "kind load docker-image app/api:stack app/web:stack postgres:16 --name kind --nodes kind-control-plane"
+    ]
+
+
+def test_images_a_node_already_holds_are_not_loaded_again(kind):
+    kind["nodes"] = {
+        "kind-control-plane": crictl(("docker.io/app/web:stack", "sha256:aaa"),
+                                     ("docker.io/library/postgres:16", "sha256:ccc"),
+                                     ("docker.io/app/api:stack", "sha256:old")),
+        "kind-worker": crictl(("docker.io/app/web:stack", "sha256:aaa"),
+                              ("docker.io/library/postgres:16", "sha256:ccc"),
+                              ("docker.io/app/api:stack", "sha256:bbb")),
+    }
+
+    helpers.load_images_into_kind("kind", {"app/web:stack", "app/api:stack", "postgres:16"})
+
+    # Only the rebuilt image, and only where the old build is.
+    assert kind["commands"] == ["kind load docker-image app/api:stack --name kind --nodes kind-control-plane"]
+
+
+def test_nothing_is_loaded_when_every_node_is_current(kind):
+    kind["nodes"] = {"kind-control-plane": crictl(("docker.io/app/web:stack", "sha256:aaa"))}
+
+    helpers.load_images_into_kind("kind", {"app/web:stack"})
+
+    assert kind["commands"] == []
+
+
+def test_missing_images_are_pulled_first(kind):
+    helpers.load_images_into_kind("kind", {"app/web:stack", "redis:7"})
+
+    assert kind["commands"][0] == "docker pull redis:7"
+    assert kind["commands"][1].startswith("kind load docker-image app/web:stack redis:7 ")
+
+
+def test_a_failed_pull_is_raised(kind):
+    kind["pull_rc"] = 1
+
+    with pytest.raises(DeployerException, match="redis:7"):
+        helpers.load_images_into_kind("kind", {"redis:7"})
@@ -0,0 +1,129 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""The readiness gate a kind start waits on before creating its Ingress.
+
+No cluster is involved: the watches play back fixed events and the API is stubbed.
+What is under test is that the gate opens as soon as the controller can serve --
+both services with a ready endpoint, the webhook with its CA bundle, a dry-run Ingress
+admitted -- with no fixed sleep, and that it names what it was still waiting for when
+the deadline passes first.
+"""
+
+import time
+
+from types import SimpleNamespace
+
+import pytest
+from kubernetes import client
+
+from stack.deploy.k8s import helpers
+
+
+def endpoint_slice(service, ready):
+    return client.V1EndpointSlice(
+        address_type="IPv4",
+        metadata=client.V1ObjectMeta(name=f"{service}-abcde", labels={"kubernetes.io/service-name": service}),
+        endpoints=[client.V1Endpoint(addresses=["10.244.0.5"], conditions=client.V1EndpointConditions(ready=ready))],
+    )
+
+
+def webhook_configuration(ca_bundle):
+    return client.V1ValidatingWebhookConfiguration(
+        metadata=client.V1ObjectMeta(name=helpers.INGRESS_WEBHOOK),
+        webhooks=[client.V1ValidatingWebhook(
+            name="validate.nginx.ingress.kubernetes.io", admission_review_versions=["v1"], side_effects="None",
+            client_config=client.AdmissionregistrationV1WebhookClientConfig(ca_bundle=ca_bundle))],
+    )
+
+
+class FakeWatch:
+    """Plays back the events queued for each list function, then ends the stream."""
+
+    events = {}
+
+    def stream(self, func, **kwargs):
+        yield from self.events.pop(func, [])
+
+    def stop(self):
+        pass
+
+
+class StubNetworkingApi:
+    def __init__(self, refusals=0):
+        self.refusals = refusals
+        self.probes = []
+
+    def create_namespaced_ingress(self, namespace, body, dry_run=None):
+        self.probes.append(dry_run)
+        if self.refusals:
+            self.refusals -= 1
+            raise client.exceptions.ApiException(status=500, reason="failed calling webhook")
+
+
+@pytest.fixture
+def apis(monkeypatch):
+    monkeypatch.setattr(helpers.watch, "Watch", FakeWatch)
+    monkeypatch.setattr(helpers, "INGRESS_PROBE_INTERVAL", 0.01)
+    discovery = SimpleNamespace(list_namespaced_endpoint_slice=lambda **kwargs: None)
+    admission = SimpleNamespace(list_validating_webhook_configuration=lambda **kwargs: None)
+    FakeWatch.events = {
+        discovery.list_namespaced_endpoint_slice: [
+            {"type": "ADDED", "object": endpoint_slice("ingress-nginx-controller", False)},
+            {"type": "ADDED", "object": endpoint_slice("ingress-nginx-controller-admission", False)},
+            {"type": "MODIFIED", "object": endpoint_slice("ingress-nginx-controller", True)},
+            {"type": "MODIFIED", "object": endpoint_slice("ingress-nginx-controller-admission", True)},
+        ],
+        admission.list_validating_webhook_configuration: [
+            {"type": "ADDED", "object": webhook_configuration(None)},
+            {"type": "MODIFIED", "object": webhook_configuration("LS0tLS1CRUdJTiBDRVJU")},
+        ],
+    }
+    return discovery, admission
+
+
+def test_the_gate_opens_once_the_webhook_answers(apis):
+    discovery, admission = apis
+    networking = StubNetworkingApi(refusals=2)
+    start = time.monotonic()
+
+    assert helpers._wait_for_ingress(discovery, admission, networking, start + 5) is None
+
+    assert networking.probes == ["All"] * 3
+    # No fixed settling time: just the two retried probes.
+    assert time.monotonic() - start < 1
+
+
+def test_endpoints_not_ready_by_the_deadline_are_named(apis):
+    discovery, admission = apis
+    FakeWatch.events[discovery.list_namespaced_endpoint_slice] = [
+        {"type": "ADDED", "object": endpoint_slice("ingress-nginx-controller", True)},
+        {"type": "ADDED", "object": endpoint_slice("ingress-nginx-controller-admission", False)},
+    ]
+
+    waiting_for = helpers._wait_for_ingress(discovery, admission, StubNetworkingApi(), time.monotonic() + 0.2)
+
+    assert waiting_for == "the controller's endpoints to become ready"
+
+
+def test_a_webhook_without_its_certificate_is_not_ready(apis):
+    discovery, admission = apis
+    FakeWatch.events[admission.list_validating_webhook_configuration] = [
+        {"type": "ADDED", "object": webhook_configuration(None)},
+    ]
+
+    waiting_for = helpers._wait_for_ingress(discovery, admission, StubNetworkingApi(), time.monotonic() + 0.2)
+
+    assert waiting_for == "the admission webhook's certificate"
@@ -0,0 +1,70 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Recording a new pin keeps the comments already in a lock file.
+
+Lock files are read with the round-trip loader when they are about to be rewritten,
+so that a comment a user has put beside a pin is still there after prepare adds another.
+"""
+
+from types import SimpleNamespace
+
+from stack.build.build_containers import _write_missing_pins
+from stack.build.build_util import read_container_locks, read_stack_locks, write_stack_locks
+
+HASH = "0123456789abcdef0123456789abcdef01234567"
+
+
+def identity(**kwargs):
+    fields = dict(payload_ref="org/app", payload_is_recipe=False, payload_pin=None, wrapper_pin=None,
+                  container_spec=SimpleNamespace(name="app"), stack_dir=None, container_lock_dir=None)
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def test_container_lock_keeps_its_comments(tmp_path):
+    lock = tmp_path / "container.lock"
+    lock.write_text("# Pinned by hand until the 2.x migration is done.\n"
+                    "wrapper:\n"
+                    "  ref: org/wrapper\n"
+                    "  hash: abc123  # last known good\n")
+
+    _write_missing_pins(identity(container_lock_dir=tmp_path), HASH, None)
+
+    text = lock.read_text()
+    assert "# Pinned by hand until the 2.x migration is done." in text
+    assert "# last known good" in text
+    assert read_container_locks(tmp_path)["hash"] == HASH
+
+
+def test_stack_lock_keeps_its_comments(tmp_path):
+    lock = tmp_path / "stack.lock"
+    lock.write_text("# Reviewed 2026-09 by the platform team.\n"
+                    "images:\n"
+                    "  postgres:14: sha256:abc  # do not bump without a migration\n")
+
+    _write_missing_pins(identity(stack_dir=tmp_path), HASH, None)
+
+    text = lock.read_text()
+    assert "# Reviewed 2026-09 by the platform team." in text
+    assert "# do not bump without a migration" in text
+    assert read_stack_locks(tmp_path)["containers"]["app"] == {"ref": "org/app", "hash": HASH}
+
+
+def test_empty_sections_are_not_written(tmp_path):
+    write_stack_locks(tmp_path, read_stack_locks(tmp_path, for_update=True) | {"images": {"redis:7": "sha256:def"}})
+
+    assert read_stack_locks(tmp_path, for_update=True) == {"containers": {}, "wrappers": {}, "images": {"redis:7": "sha256:def"}}
+    assert (tmp_path / "stack.lock").read_text() == "images:\n  redis:7: sha256:def\n"
@@ -0,0 +1,82 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for MergedSpec: stacks parsed and merged once, pods found by lookup."""
+
+import pytest
+
+from conftest import make_multi_pod_stack
+from stack.deploy import spec as spec_module
+from stack.deploy.spec import MergedSpec, Spec
+
+
+def _spec(stack_dir):
+    return Spec(obj={"stack": str(stack_dir), "deploy-to": "compose"})
+
+
+@pytest.fixture
+def stacks(tmp_path):
+    return [
+        make_multi_pod_stack(tmp_path, {"db": "services:\n  db:\n    image: postgres\n",
+                                        "web": "services:\n  web:\n    image: nginx\n"}, name="one"),
+        make_multi_pod_stack(tmp_path, {"api": "services:\n  api:\n    image: api\n"}, name="two"),
+        make_multi_pod_stack(tmp_path, {"worker": "services:\n  worker:\n    image: worker\n"}, name="three"),
+    ]
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    parsed = []
+    init_from_file = spec_module.Stack.init_from_file
+
+    def counting(self, file_path):
+        parsed.append(str(file_path))
+        return init_from_file(self, file_path)
+
+    monkeypatch.setattr(spec_module.Stack, "init_from_file", counting)
+    return parsed
+
+
+def test_stacks_are_parsed_and_merged_once(stacks, parses):
+    merged = MergedSpec().merge(_spec(stacks[0])).merge(_spec(stacks[1]))
+    parses.clear()
+    for _ in range(3):
+        assert merged.get_pod_list() == ["db", "web", "api"]
+        assert sorted(merged.get_services()) == ["api", "db", "web"]
+        assert merged.stack_for_pod("api").name == "two"
+        assert merged.load_pod_file("web")["services"]["web"]["image"] == "nginx"
+        assert [p["name"] for p in merged.merge_stacks()["pods"]] == ["db", "web", "api"]
+    assert parses == []
+    assert merged.stack_for_pod("nope") is None
+    assert merged.load_pod_file("nope") is None
+
+
+def test_callers_get_their_own_pod_files_and_services(stacks):
+    merged = MergedSpec().merge(_spec(stacks[0])).merge(_spec(stacks[1]))
+    merged.load_pod_file("web")["services"]["web"]["image"] = "changed"
+    merged.get_services()["db"]["image"] = "changed"
+    assert merged.load_pod_file("web")["services"]["web"]["image"] == "nginx"
+    assert merged.get_services()["db"]["image"] == "postgres"
+
+
+def test_merge_refreshes_the_model(stacks):
+    inner = MergedSpec().merge(_spec(stacks[0])).merge(_spec(stacks[1]))
+    assert inner.get_pod_list() == ["db", "web", "api"]
+    outer = MergedSpec().merge(inner)
+    outer.merge(_spec(stacks[2]))
+    assert outer.get_pod_list() == ["db", "web", "api", "worker"]
+    # Pods of a nested merged spec are owned by the single-stack spec they came from.
+    assert outer.stack_for_pod("db").name == "one"
+    assert outer.stack_for_pod("worker").name == "three"
@@ -0,0 +1,234 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the registry client behind the remote image checks.
+
+The registry here is a stand-in speaking just enough of the distribution API (manifest
+HEAD/GET, config blobs, and optionally the token dance registry:2 and ghcr use) on a
+loopback port, which the client addresses over plain HTTP as docker would.
+"""
+
+import base64
+import json
+import os
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from stack.build import registry
+from stack.build.build_util import container_exists_remotely, parse_platforms
+
+INDEX_TYPE = "application/vnd.oci.image.index.v1+json"
+MANIFEST_TYPE = "application/vnd.oci.image.manifest.v1+json"
+
+
+class _Registry:
+    def __init__(self):
+        self.manifests = {}
+        self.blobs = {}
+        self.requests = []
+        self.credentials = None
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.host = f"127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add_index(self, repository, tag, platforms):
+        self.manifests[(repository, tag)] = (INDEX_TYPE, {
+            "schemaVersion": 2, "mediaType": INDEX_TYPE,
+            "manifests": [{"digest": f"sha256:{i}", "platform": {"os": "linux", "architecture": arch}}
+                          for i, arch in enumerate(platforms)]})
+
+    def add_image(self, repository, tag, arch):
+        digest = f"sha256:config-{tag}"
+        self.blobs[(repository, digest)] = {"os": "linux", "architecture": arch}
+        self.manifests[(repository, tag)] = (MANIFEST_TYPE, {
+            "schemaVersion": 2, "mediaType": MANIFEST_TYPE, "config": {"digest": digest}})
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=None, content_type="application/json", headers=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            def _serve(self):
+                url = urlparse(self.path)
+                stand_in.requests.append((self.command, url.path))
+                if url.path == "/token":
+                    expected = "Basic " + base64.b64encode(":".join(stand_in.credentials).encode()).decode()
+                    if self.headers.get("Authorization") != expected:
+                        return self._reply(401)
+                    scope = parse_qs(url.query).get("scope", [""])[0]
+                    return self._reply(200, {"token": f"token-for-{scope}"})
+
+                path = url.path[len("/v2/"):]
+                if stand_in.credentials:
+                    repository = path.rsplit("/", 2)[0]
+                    if self.headers.get("Authorization") != f"Bearer token-for-repository:{repository}:pull":
+                        challenge = (f'Bearer realm="http://{stand_in.host}/token",service="test",'
+                                     f'scope="repository:{repository}:pull"')
+                        return self._reply(401, {"errors": []}, headers={"WWW-Authenticate": challenge})
+
+                repository, kind, reference = path.rsplit("/", 2)
+                if kind == "manifests" and (repository, reference) in stand_in.manifests:
+                    content_type, body = stand_in.manifests[(repository, reference)]
+                    return self._reply(200, body, content_type)
+                if kind == "blobs" and (repository, reference) in stand_in.blobs:
+                    return self._reply(200, stand_in.blobs[(repository, reference)])
+                return self._reply(404, {"errors": [{"code": "MANIFEST_UNKNOWN"}]})
+
+            do_GET = _serve
+            do_HEAD = _serve
+
+        return Handler
+
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    # No stray credentials from the machine running the tests.
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("REGISTRY_AUTH_FILE", str(tmp_path / "auth.json"))
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.delenv("DOCKER_CONFIG", raising=False)
+    # The default registry is always probed last; keep that probe off the network.
+    monkeypatch.setattr(registry, "DOCKER_HUB_HOST", "127.0.0.1:9")
+    registry.clear_cache()
+    server = _Registry()
+    yield server
+    server.server.shutdown()
+    registry.clear_cache()
+
+
+def test_parse_reference():
+    ref = registry.parse_reference("org/app:abc", "ghcr.io")
+    assert (ref.host, ref.repository, ref.tag, ref.scheme) == ("ghcr.io", "org/app", "abc", "https")
+    ref = registry.parse_reference("org/app:abc", "registry.digitalocean.com/example")
+    assert (ref.host, ref.repository) == ("registry.digitalocean.com", "example/org/app")
+    ref = registry.parse_reference("app:abc", "localhost:5000")
+    assert (ref.host, ref.repository, ref.scheme) == ("localhost:5000", "app", "http")
+    ref = registry.parse_reference("postgres:16")
+    assert (ref.host, ref.repository, ref.tag) == (registry.DOCKER_HUB_HOST, "library/postgres", "16")
+    ref = registry.parse_reference("org/app")
+    assert (ref.repository, ref.tag) == ("org/app", "latest")
+
+
+def test_multi_platform_image(stand_in):
+    stand_in.add_index("org/app", "abc", ["amd64", "arm64"])
+    assert container_exists_remotely("org/app:abc", [stand_in.host], "arm64") == (True, stand_in.host)
+    assert container_exists_remotely("org/app:abc", [stand_in.host], "riscv64")[0] is False
+
+
+def test_single_platform_image_reads_its_config(stand_in):
+    stand_in.add_image("org/app", "abc", "amd64")
+    assert registry.image_platforms("org/app:abc", stand_in.host) == [("linux", "amd64")]
+    assert ("GET", "/v2/org/app/blobs/sha256:config-abc") in stand_in.requests
+
+
+def test_missing_image_costs_one_head(stand_in):
+    assert registry.image_platforms("org/app:missing", stand_in.host) == []
+    assert stand_in.requests == [("HEAD", "/v2/org/app/manifests/missing")]
+
+
+def test_answers_are_cached_for_the_run(stand_in):
+    stand_in.add_index("org/app", "abc", ["amd64"])
+    registry.image_exists("org/app:abc", stand_in.host, "amd64")
+    count = len(stand_in.requests)
+    assert registry.image_exists("org/app:abc", stand_in.host, "amd64")
+    assert not registry.image_exists("org/app:abc", stand_in.host, "arm64")
+    assert len(stand_in.requests) == count
+
+
+def test_concurrent_probes_of_one_image_share_a_request(stand_in):
+    stand_in.add_index("org/app", "abc", ["amd64"])
+    registry.probe_images([("org/app:abc", stand_in.host), ("org/other:abc", stand_in.host)])
+    threads = [threading.Thread(target=registry.image_platforms, args=("org/app:abc", stand_in.host)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stand_in.requests.count(("HEAD", "/v2/org/app/manifests/abc")) == 1
+    assert ("HEAD", "/v2/org/other/manifests/abc") in stand_in.requests
+
+
+def test_token_auth_uses_the_auth_file(stand_in, tmp_path):
+    stand_in.credentials = ("someone", "secret")
+    stand_in.add_index("org/app", "abc", ["amd64"])
+    auth = base64.b64encode(b"someone:secret").decode()
+    (tmp_path / "auth.json").write_text(json.dumps({"auths": {stand_in.host: {"auth": auth}}}))
+    assert registry.image_exists("org/app:abc", stand_in.host, "amd64")
+    # The token is reused: one challenge, then straight through.
+    assert stand_in.requests.count(("GET", "/token")) == 1
+
+
+def test_denied_is_not_available(stand_in):
+    stand_in.credentials = ("someone", "secret")
+    stand_in.add_index("org/app", "abc", ["amd64"])
+    assert not registry.image_exists("org/app:abc", stand_in.host, "amd64")
+
+
+def test_credential_helper_entry_without_a_username_is_skipped(stand_in, tmp_path, monkeypatch):
+    stand_in.credentials = ("someone", "secret")
+    stand_in.add_index("org/app", "abc", ["amd64"])
+    helper = tmp_path / "bin" / "docker-credential-tokens"
+    helper.parent.mkdir()
+    helper.write_text('#!/bin/sh\necho \'{"Username": null, "Secret": "identity-token"}\'\n')
+    helper.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{helper.parent}{os.pathsep}{os.environ['PATH']}")
+    (tmp_path / "auth.json").write_text(json.dumps({"credHelpers": {stand_in.host: "tokens"}}))
+
+    assert registry.credentials_for(registry.parse_reference("org/app:abc", stand_in.host)) is None
+    # Probed anonymously, and denied, rather than failing.
+    assert not registry.image_exists("org/app:abc", stand_in.host, "amd64")
+
+
+def test_first_registry_in_order_wins(stand_in):
+    other = _Registry()
+    try:
+        stand_in.add_index("org/app", "abc", ["amd64"])
+        other.add_index("org/app", "abc", ["amd64"])
+        assert container_exists_remotely("org/app:abc", [other.host, stand_in.host], "amd64") == (True, other.host)
+    finally:
+        other.server.shutdown()
+
+
+def test_every_platform_from_one_manifest_fetch(stand_in):
+    stand_in.add_index("org/app", "abc", ["amd64", "arm64"])
+    stand_in.add_index("org/app", "amd64-only", ["amd64"])
+    platforms = parse_platforms("linux/amd64, linux/arm64/v8")
+    assert platforms == ["linux/amd64", "linux/arm64/v8"]
+    assert container_exists_remotely("org/app:abc", [stand_in.host], platforms=platforms) == (True, stand_in.host)
+    assert container_exists_remotely("org/app:amd64-only", [stand_in.host], platforms=platforms)[0] is False
+    assert [r for r in stand_in.requests if r[1] == "/v2/org/app/manifests/abc"] == [
+        ("HEAD", "/v2/org/app/manifests/abc"), ("GET", "/v2/org/app/manifests/abc")]
+
+
+@pytest.mark.parametrize("value", ["amd64", "linux/", "linux/arm64/v8/extra"])
+def test_invalid_platforms(value):
+    with pytest.raises(SystemExit):
+        parse_platforms(value)
@@ -0,0 +1,91 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the per-process cache of what is read of a git checkout."""
+
+import os
+
+import pytest
+
+from conftest import run_git
+from stack.repos import repo_metadata
+
+
+def _age(path, seconds=10):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    run_git(repo, "init", "-q", "-b", "main")
+    run_git(repo, "remote", "add", "origin", "https://github.com/example/repo.git")
+    (repo / "a.txt").write_text("a\n")
+    _age(repo / "a.txt")
+    run_git(repo, "add", "a.txt")
+    run_git(repo, "commit", "-qm", "a")
+    repo_metadata.invalidate()
+    opened = []
+    real_repo = repo_metadata.git.Repo
+
+    def counting(path):
+        opened.append(path)
+        return real_repo(path)
+
+    monkeypatch.setattr(repo_metadata.git, "Repo", counting)
+    yield repo, opened
+    repo_metadata.invalidate()
+
+
+def test_each_answer_is_read_once(repo):
+    repo, opened = repo
+    for _ in range(3):
+        assert repo_metadata.remote_url(repo) == "https://github.com/example/repo.git"
+        assert repo_metadata.head_hash(repo) == run_git(repo, "rev-parse", "HEAD")
+        assert repo_metadata.branch_or_tag(repo) == ("main", True)
+        assert repo_metadata.is_dirty(repo) is False
+    assert len(opened) == 4
+
+
+def test_changes_to_the_checkout_are_seen(repo):
+    repo, _ = repo
+    repo_metadata.is_dirty(repo)
+    repo_metadata.head_hash(repo)
+
+    (repo / "a.txt").write_text("edited\n")
+    _age(repo / "a.txt")
+    assert repo_metadata.is_dirty(repo) is True
+
+    run_git(repo, "commit", "-qam", "edit")
+    assert repo_metadata.head_hash(repo) == run_git(repo, "rev-parse", "HEAD")
+    run_git(repo, "checkout", "-q", "-b", "feature")
+    assert repo_metadata.branch_or_tag(repo) == ("feature", True)
+
+    repo_metadata.remote_url(repo)
+    run_git(repo, "remote", "set-url", "origin", "git@github.com:example/moved.git")
+    config = repo / ".git" / "config"
+    st = os.stat(config)
+    os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert repo_metadata.remote_url(repo) == "git@github.com:example/moved.git"
+
+
+def test_invalidate_forgets_the_checkout(repo):
+    repo, opened = repo
+    repo_metadata.remote_url(repo)
+    repo_metadata.invalidate(repo)
+    repo_metadata.remote_url(repo)
+    assert len(opened) == 2
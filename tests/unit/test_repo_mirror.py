@@ -0,0 +1,111 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for cloning through the shared mirror, and partially.
+
+The "remote" is a local repo reached over file://, which behaves like a network remote
+for shallow fetches (a plain path would be copied wholesale).
+"""
+
+import git
+import pytest
+
+from conftest import run_git
+from stack.repos import mirror
+
+
+def _commit(repo, name):
+    (repo / name).write_text(f"{name}\n")
+    run_git(repo, "add", name)
+    run_git(repo, "commit", "-qm", name)
+    return run_git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_REPO_BASE_DIR", str(tmp_path / "dev-root"))
+    monkeypatch.setattr(mirror, "_updated", set())
+    repo = tmp_path / "remote"
+    repo.mkdir()
+    run_git(repo, "init", "-q", "-b", "main")
+    run_git(repo, "config", "uploadpack.allowAnySHA1InWant", "true")
+    first = _commit(repo, "one")
+    second = _commit(repo, "two")
+    return repo, f"file://{repo}", first, second
+
+
+def test_mirrored_clones_share_objects(remote, tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_GIT_MIRROR", "true")
+    _, url, _, second = remote
+    for name in ["a", "b"]:
+        mirror.clone_repo(url, tmp_path / name, "example.com", "org/repo")
+        checkout = tmp_path / name
+        assert run_git(checkout, "rev-parse", "HEAD") == second
+        # Its origin is the real remote, and its objects are the mirror's.
+        assert run_git(checkout, "remote", "get-url", "origin") == url
+        alternates = (checkout / ".git" / "objects" / "info" / "alternates").read_text()
+        assert str(mirror.mirror_path_for("example.com", "org/repo")) in alternates
+
+
+def test_mirror_is_refreshed_once_per_run(remote, tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_GIT_MIRROR", "true")
+    repo, url, _, _ = remote
+    mirror.clone_repo(url, tmp_path / "a", "example.com", "org/repo")
+    third = _commit(repo, "three")
+    # Within the run, a pinned commit the mirror lacks is still fetched for it.
+    mirror.clone_repo(url, tmp_path / "b", "example.com", "org/repo", ref=third)
+    run_git(tmp_path / "b", "checkout", "-q", third)
+    # A new run refreshes the mirror, picking up the branch's new head.
+    monkeypatch.setattr(mirror, "_updated", set())
+    mirror.clone_repo(url, tmp_path / "c", "example.com", "org/repo")
+    assert run_git(tmp_path / "c", "rev-parse", "HEAD") == third
+
+
+def test_pinned_commit_is_fetched_alone(remote, tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_GIT_PARTIAL_CLONE", "true")
+    _, url, first, second = remote
+    checkout = tmp_path / "pinned"
+    mirror.clone_repo(url, checkout, "example.com", "org/repo", ref=first)
+    assert run_git(checkout, "rev-parse", "HEAD") == first
+    assert run_git(checkout, "rev-parse", "--is-shallow-repository") == "true"
+    assert run_git(checkout, "rev-list", "--count", "HEAD") == "1"
+
+    # Moving the pin fetches just the new commit.
+    mirror.ensure_commit(git.Repo(checkout), second)
+    run_git(checkout, "checkout", "-q", second)
+    assert run_git(checkout, "rev-parse", "HEAD") == second
+
+    # A branch needs the history.
+    mirror.ensure_commit(git.Repo(checkout), "main")
+    run_git(checkout, "checkout", "-q", "main")
+    assert run_git(checkout, "rev-parse", "--is-shallow-repository") == "false"
+
+
+def test_unpinned_partial_clone_is_blobless(remote, tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_GIT_PARTIAL_CLONE", "true")
+    _, url, _, second = remote
+    checkout = tmp_path / "partial"
+    mirror.clone_repo(url, checkout, "example.com", "org/repo")
+    assert run_git(checkout, "rev-parse", "HEAD") == second
+    assert run_git(checkout, "config", "remote.origin.partialclonefilter") == "blob:none"
+
+
+def test_plain_clone_by_default(remote, tmp_path):
+    _, url, _, second = remote
+    checkout = tmp_path / "plain"
+    mirror.clone_repo(url, checkout, "example.com", "org/repo")
+    assert run_git(checkout, "rev-parse", "HEAD") == second
+    assert not (checkout / ".git" / "objects" / "info" / "alternates").exists()
+    assert not mirror.mirror_path_for("example.com", "org/repo").exists()
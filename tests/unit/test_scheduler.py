@@ -0,0 +1,158 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the scheduler that runs `stack prepare`'s containers, and a k8s deployment's
+objects, on a worker pool.
+
+The properties that matter: one worker reproduces the old serial order exactly, a
+prerequisite added by a running task (a wrapper base image) runs before its users and
+only once, and a failure stops the run and surfaces in the caller.
+"""
+
+import threading
+import time
+
+import pytest
+
+from stack.scheduler import TaskScheduler
+
+
+def test_single_worker_runs_in_insertion_order():
+    ran = []
+    scheduler = TaskScheduler(1)
+    for name in ["a", "b", "c"]:
+        scheduler.add(name, lambda name=name: ran.append(name) or name)
+    assert scheduler.run() == {"a": "a", "b": "b", "c": "c"}
+    assert ran == ["a", "b", "c"]
+
+
+def test_added_task_runs_before_the_next_container_with_one_worker():
+    # A task added by a running task, with that task's order, is the serial
+    # continuation of it: it must not be overtaken by the next container.
+    ran = []
+    scheduler = TaskScheduler(1)
+
+    def resolve(index):
+        ran.append(f"resolve-{index}")
+        scheduler.add(f"build-{index}", lambda: ran.append(f"build-{index}"), depends_on=[f"resolve-{index}"],
+                      order=(index, 1))
+
+    for index in range(2):
+        scheduler.add(f"resolve-{index}", lambda index=index: resolve(index), order=(index, 0))
+    scheduler.run()
+    assert ran == ["resolve-0", "build-0", "resolve-1", "build-1"]
+
+
+def test_shared_prerequisite_runs_once_and_first():
+    ran = []
+    lock = threading.Lock()
+    scheduler = TaskScheduler(4)
+
+    def record(name):
+        with lock:
+            ran.append(name)
+
+    def resolve(index):
+        scheduler.add("base", lambda: time.sleep(0.05) or record("base"), order=(index, 1))
+        scheduler.add(f"build-{index}", lambda: record(f"build-{index}"), depends_on=[f"resolve-{index}", "base"],
+                      order=(index, 2))
+
+    for index in range(3):
+        scheduler.add(f"resolve-{index}", lambda index=index: resolve(index), order=(index, 0))
+    scheduler.run()
+
+    assert ran.count("base") == 1
+    assert all(ran.index("base") < ran.index(f"build-{index}") for index in range(3))
+
+
+def test_tasks_run_concurrently_up_to_the_limit():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    scheduler = TaskScheduler(3)
+    for index in range(6):
+        scheduler.add(f"t{index}", work)
+    scheduler.run()
+    assert max(peak) == 3
+
+
+def test_failure_stops_the_run_and_is_raised():
+    started = []
+    scheduler = TaskScheduler(1)
+
+    def fail():
+        raise SystemExit(1)
+
+    scheduler.add("ok", lambda: started.append("ok"))
+    scheduler.add("fail", fail)
+    scheduler.add("never", lambda: started.append("never"))
+    with pytest.raises(SystemExit):
+        scheduler.run()
+    assert started == ["ok"]
+
+
+def test_missing_dependency_is_reported():
+    scheduler = TaskScheduler(2)
+    scheduler.add("a", lambda: None, depends_on=["nonexistent"])
+    with pytest.raises(RuntimeError, match="nonexistent"):
+        scheduler.run()
+
+
+def test_pool_runs_alongside_the_main_workers():
+    # One build worker, one publish worker: the first image's push overlaps the second's build.
+    events = []
+    lock = threading.Lock()
+    scheduler = TaskScheduler(1, pools={"publish": 1})
+
+    def record(name):
+        with lock:
+            events.append(name)
+
+    def build(index):
+        record(f"build-{index}-start")
+        time.sleep(0.1)
+        record(f"build-{index}-end")
+        scheduler.add(f"push-{index}", lambda: (record(f"push-{index}-start"), time.sleep(0.1), record(f"push-{index}-end")),
+                      order=(index, 1), pool="publish")
+
+    for index in range(2):
+        scheduler.add(f"build-{index}", lambda index=index: build(index), order=(index, 0))
+    scheduler.run()
+
+    assert events.index("push-0-start") < events.index("build-1-end")
+    assert events.index("push-0-end") < events.index("push-1-start")
+    assert events.count("push-1-end") == 1
+
+
+def test_unknown_pool_is_rejected():
+    with pytest.raises(ValueError):
+        TaskScheduler(1).add("a", lambda: None, pool="publish")
+
+
+def test_worker_threads_are_named_by_the_caller():
+    names = []
+    scheduler = TaskScheduler(2, thread_name_prefix="stack-k8s-apply")
+    scheduler.add("a", lambda: names.append(threading.current_thread().name))
+    scheduler.run()
+    assert names[0].startswith("stack-k8s-apply")
@@ -0,0 +1,122 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the on-disk index of the stacks beneath the dev root.
+
+Directories changed within the last couple of seconds are never trusted by mtime, so
+the tests age the directories they build: what is under test is that a settled tree is
+neither listed nor parsed again, and that each kind of change is still seen.
+"""
+
+import os
+import time
+
+import pytest
+
+from conftest import make_stack_fixture
+from stack.deploy import stack_index
+from stack.deploy.stack import locate_single_stack
+
+AN_HOUR_NS = 3600 * 1000 * 1000 * 1000
+
+
+def _age(root):
+    then = time.time_ns() - AN_HOUR_NS
+    # Directories only: a stack's own files are compared exactly, not by age.
+    for path, dirs, _ in os.walk(root):
+        for name in dirs:
+            os.utime(os.path.join(path, name), ns=(then, then), follow_symlinks=False)
+    os.utime(root, ns=(then, then))
+
+
+@pytest.fixture
+def dev_root(tmp_path, monkeypatch):
+    root = tmp_path / "dev-root"
+    root.mkdir()
+    monkeypatch.setenv("STACK_REPO_BASE_DIR", str(root))
+    stack_index.clear()
+    yield root
+    stack_index.clear()
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    calls = {"listed": [], "described": []}
+    real_list_dir, real_describe = stack_index._list_dir, stack_index._describe
+
+    def list_dir(path, st):
+        calls["listed"].append(path)
+        return real_list_dir(path, st)
+
+    def describe(stack_file):
+        calls["described"].append(stack_file)
+        return real_describe(stack_file)
+
+    monkeypatch.setattr(stack_index, "_list_dir", list_dir)
+    monkeypatch.setattr(stack_index, "_describe", describe)
+    return calls
+
+
+def test_settled_tree_is_neither_listed_nor_parsed_again(dev_root, counted):
+    make_stack_fixture(dev_root, name="alpha")
+    make_stack_fixture(dev_root, name="beta")
+    _age(dev_root)
+    assert sorted(e.name for e in stack_index.stacks_beneath(dev_root)) == ["alpha", "beta"]
+    assert len(counted["described"]) == 2
+    # Writing the index created its directory in the dev root: let that settle too.
+    _age(dev_root)
+    stack_index.stacks_beneath(dev_root)
+    assert len(counted["described"]) == 2
+
+    # A fresh process: only the file on disk is left.
+    stack_index.clear()
+    counted["listed"].clear()
+    counted["described"].clear()
+    entry = locate_single_stack("beta", search_path=dev_root)
+    assert entry.name == "beta"
+    assert counted == {"listed": [], "described": []}
+
+
+def test_changes_are_picked_up(dev_root, counted):
+    make_stack_fixture(dev_root, name="alpha")
+    _age(dev_root)
+    stack_index.stacks_beneath(dev_root)
+
+    # A new stack, in a new directory.
+    make_stack_fixture(dev_root, name="gamma")
+    # An edited stack file.
+    alpha_file = dev_root / "alpha" / "stack.yml"
+    alpha_file.write_text(alpha_file.read_text().replace("name: alpha", "name: renamed"))
+    assert sorted(e.name for e in stack_index.stacks_beneath(dev_root)) == ["gamma", "renamed"]
+
+    # A stack gone.
+    (dev_root / "gamma" / "stack.yml").unlink()
+    assert [e.name for e in stack_index.stacks_beneath(dev_root)] == ["renamed"]
+
+
+def test_subcommands_and_deployment_copies(dev_root):
+    stack_dir = make_stack_fixture(dev_root, name="alpha")
+    subcommands = stack_dir / "subcommands"
+    subcommands.mkdir()
+    (subcommands / "__init__.py").write_text("")
+    (subcommands / "hello.py").write_text("")
+    # A deployment's copy of the stack is not a stack of its own.
+    deployment = dev_root / "deployments" / "alpha-deployment"
+    make_stack_fixture(deployment, name="alpha")
+    (deployment / "deployment.yml").write_text("stack: alpha\n")
+
+    entries = stack_index.stacks_beneath(dev_root)
+    assert [(e.name, e.subcommand_files) for e in entries] == [("alpha", ["hello.py"])]
+    assert entries[0].repo_ref == "github.com/example/alpha"
@@ -21,9 +21,12 @@ the next block lands on the previous item -- so these behaviors are worth pinnin
 directly rather than inferring from whether a deployment came out right.
 """
 
+import os
+
 import pytest
 
 from conftest import make_multi_pod_stack, make_stack_from_compose
+from stack.deploy import stack as stack_module
 from stack.deploy.stack import Stack
 
 
@@ -577,6 +580,74 @@ def test_pod_list_empty(tmp_path):
     assert stack.get_pod_list() == []
 
 
+# ---------------------------------------------------------------------------
+# pod file cache
+# ---------------------------------------------------------------------------
+
+CACHED_COMPOSE = """\
+    services:
+      web:
+        image: nginx:local
+        ports:
+          - "80" # @stack http-proxy /
+        volumes:
+          - data:/data
+    volumes:
+      data:
+    """
+
+
+def _count_pod_file_parses(monkeypatch):
+    parses = []
+    real_entry = stack_module._PodFileEntry
+
+    def counting_entry(stamp, parsed):
+        parses.append(stamp)
+        return real_entry(stamp, parsed)
+
+    monkeypatch.setattr(stack_module, "_PodFileEntry", counting_entry)
+    return parses
+
+
+def test_pod_file_parsed_once_for_every_getter(tmp_path, monkeypatch):
+    stack = load_stack(tmp_path, CACHED_COMPOSE)
+    parses = _count_pod_file_parses(monkeypatch)
+    # Including by other Stacks loaded from the same file, as init and deploy load them.
+    for s in [stack, Stack("teststack").init_from_file(stack.file_path)]:
+        for _ in range(3):
+            s.get_services()
+            s.get_ports()
+            s.get_volumes()
+            s.get_http_proxy_targets()
+            s.get_backup_targets()
+            s.get_security_settings()
+            s.get_named_volumes()
+            s.load_pod_file("web")
+    assert len(parses) == 1
+
+
+def test_changed_pod_file_is_reparsed(tmp_path):
+    stack = load_stack(tmp_path, CACHED_COMPOSE)
+    assert stack.get_ports() == {"web": ["80"]}
+    pod_file = stack.get_pod_file_path("web")
+    with open(pod_file) as f:
+        content = f.read()
+    with open(pod_file, "w") as f:
+        f.write(content.replace('"80"', '"8080"'))
+    # Same size, so only the mtime tells the two apart.
+    stat = os.stat(pod_file)
+    os.utime(pod_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert stack.get_ports() == {"web": ["8080"]}
+
+
+def test_loaded_pod_file_is_the_callers_to_change(tmp_path):
+    stack = load_stack(tmp_path, CACHED_COMPOSE)
+    stack.load_pod_file("web")["services"]["web"]["image"] = "changed:local"
+    stack.get_services()["web"]["ports"].append("443")
+    assert stack.load_pod_file("web")["services"]["web"]["image"] == "nginx:local"
+    assert stack.get_ports() == {"web": ["80"]}
+
+
 # ---------------------------------------------------------------------------
 # plugin code paths
 # ---------------------------------------------------------------------------
@@ -0,0 +1,93 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Startup cost of the CLI: commands are imported only when they are invoked.
+
+Wrappers run `stack` hundreds of times per pipeline, so what a cold start imports
+matters.  Two checks, both in fresh interpreters: a cheap command must not pull in the
+heavy dependencies, and `python -X importtime` must show importing the CLI costing a
+small fraction of importing every command.  The second is a ratio measured within one
+process, not a wall-clock budget, so that it holds on slow and fast machines alike.
+"""
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["kubernetes", "python_on_whales", "git", "tqdm", "stack.deploy.deploy"]
+
+COMMAND_MODULES = [
+    "stack.build.build", "stack.build.prepare", "stack.chart.chart", "stack.checklist.checklist",
+    "stack.checklist.list_stack", "stack.complete.complete", "stack.config.config",
+    "stack.deploy.deployment", "stack.deploy.deployment_create", "stack.init.init", "stack.repos.fetch",
+    "stack.update", "stack.validate", "stack.version", "stack.webapp.webapp",
+]
+
+# Importing the CLI took about a tenth of the whole when commands became lazy, and
+# all of it before; this leaves room for growth while catching an eager import.
+MAX_STARTUP_SHARE = 0.35
+
+
+def _python(code, env, *flags):
+    result = subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def test_cheap_command_does_not_import_heavy_modules(isolated_env):
+    code = (
+        "import json, sys\n"
+        "from stack.main import cli\n"
+        "cli(['version'], standalone_mode=False)\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    loaded = json.loads(_python(code, isolated_env).stdout.splitlines()[-1])
+    assert loaded == []
+
+
+def test_commands_resolve_to_their_modules(isolated_env):
+    code = (
+        "import click, sys\n"
+        "from stack.main import cli\n"
+        "ctx = click.Context(cli)\n"
+        "for name in cli.list_commands(ctx):\n"
+        "    cmd = cli.get_command(ctx, name)\n"
+        "    assert isinstance(cmd, click.Command), name\n"
+        "    print(name, cmd.callback.__module__)\n"
+    )
+    modules = dict(line.split() for line in _python(code, isolated_env).stdout.splitlines())
+    assert modules["manage"] == "stack.deploy.deployment"
+    assert modules["version"] == "stack.version"
+    assert len(modules) == len(COMMAND_MODULES)
+
+
+def _top_level_import_times(stderr):
+    # Cumulative microseconds of each module imported directly by the script; nested
+    # imports are indented beneath, and already counted in their importer's time.
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_is_a_small_share_of_all_commands(isolated_env):
+    code = "import stack.main\n" + "".join(f"import {m}\n" for m in COMMAND_MODULES)
+    times = _top_level_import_times(_python(code, isolated_env, "-X", "importtime").stderr)
+    startup = times["stack.main"]
+    total = startup + sum(times.get(m, 0) for m in COMMAND_MODULES)
+    assert startup / total < MAX_STARTUP_SHARE, f"importing stack.main took {startup}us of {total}us"
@@ -0,0 +1,68 @@
+# Copyright © 2026 Bozeman Pass, Inc.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http:#www.gnu.org/licenses/>.
+
+"""Tests for the read-only YAML loader.
+
+It must read a file exactly as the round-trip loader does, less the comments: the
+same YAML 1.2 scalars (no `yes` booleans, no base-60 port numbers), whichever parser
+is underneath.
+"""
+
+import threading
+
+from stack.deploy.compose.helpers import add_env_var
+from stack.util import get_yaml, get_yaml_reader, read_yaml_file
+
+COMPOSE = """\
+services:
+  web:
+    image: "nginx:1.27"  # @stack http-proxy /
+    ports:
+      - 80:81
+      - "443"
+    environment:
+      FLAG: yes
+      MODE: 0755
+      RATIO: 1.5
+    volumes:
+      - data:/data:ro
+volumes:
+  data:
+"""
+
+
+def test_reads_what_the_round_trip_loader_reads(tmp_path):
+    pod_file = tmp_path / "composefile.yml"
+    pod_file.write_text(COMPOSE)
+    read = read_yaml_file(pod_file)
+    assert read == get_yaml().load(COMPOSE)
+    assert read["services"]["web"]["ports"] == ["80:81", "443"]
+    assert read["services"]["web"]["environment"] == {"FLAG": "yes", "MODE": 755, "RATIO": 1.5}
+    # Plain types: nothing to carry comments.
+    assert type(read["services"]) is dict and type(read["services"]["web"]["ports"]) is list
+
+
+def test_one_reader_per_thread():
+    readers = []
+    thread = threading.Thread(target=lambda: readers.append(get_yaml_reader()))
+    thread.start()
+    thread.join()
+    assert get_yaml_reader() is get_yaml_reader()
+    assert readers[0] is not get_yaml_reader()
+
+
+def test_env_list_from_either_loader():
+    for environment in [get_yaml_reader().load("- A=1\n"), get_yaml().load("- A=1\n")]:
+        assert add_env_var("B", 2, environment) == ["A=1", 'B="2"']